@@ -0,0 +1,255 @@
+"""
+Benchmark the model layer headless and compare against a stored baseline
+
+For each database size a reproducible fixture is built once with
+generate_benchmark_data.py (data/bench/), copied to a temporary working
+file and benchmarked in a fresh process: checkout (journaled and direct),
+order and register queries, employee balance, the statistics product
+summary and the query cache. No window is shown (QT_QPA_PLATFORM=offscreen)
+and receipts are not printed.
+
+Results are written as JSON; with --baseline each timing is compared with
+the baseline's and regressions beyond --threshold are listed.
+
+Usage:
+    python benchmark_models.py                              # 10k and 100k orders
+    python benchmark_models.py --sizes 10k 100k 1m --repeat 9
+    python benchmark_models.py --baseline data/bench/baseline.json --fail-on-regression
+    python benchmark_models.py --save-baseline              # Store this run as the baseline
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.join("data", "bench")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+FIXTURE_SEED = 42
+FIXTURE_END = "2025-06-30"  # Fixed so fixtures are identical on every machine
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+CHECKOUT_ITEMS = 3
+
+
+def measure(func, repeat, setup=None):
+    """Run func repeat times (setup before each run, untimed); return timings in ms"""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 4),
+        'min_ms': round(min(timings), 4),
+        'max_ms': round(max(timings), 4),
+        'runs': repeat,
+    }
+
+
+def run_benchmarks(db_path, repeat):
+    """Benchmark the model layer on db_path (call in a fresh process); returns {name: timings}"""
+    import config
+    import config_lowmem
+    config.DATABASE_PATH = db_path
+
+    from models import Employee, Order, Product, Register, Category, get_db
+    from controllers.order_controller import OrderController
+    from utils.cache import QueryCache, get_cache, invalidate_cache
+    from utils.checkout_journal import get_journal
+
+    db = get_db()
+    results = {}
+
+    last_date = db.execute("SELECT MAX(order_date) FROM orders").fetchone()[0]
+    week_start = (datetime.strptime(last_date, "%Y/%m/%d") - timedelta(days=6)).strftime("%Y/%m/%d")
+    month_start = last_date[:8] + "01"
+    register = Register.get_by_id(db.execute(
+        "SELECT register_id FROM orders WHERE order_date = ? GROUP BY register_id ORDER BY COUNT(*) DESC LIMIT 1",
+        (last_date,)
+    ).fetchone()[0])
+    employee = Employee.get_all(active_only=True)[0]
+    categories = {category.id: category.name for category in Category.get_all()}
+    products = Product.get_all()[:CHECKOUT_ITEMS]
+
+    # Read paths (the cache is cleared before each run so the query itself is timed)
+    clear = get_cache().invalidate_all
+    results['Order.get_by_register'] = measure(lambda: Order.get_by_register(register.id), repeat, clear)
+    results['Order.get_all (7 days)'] = measure(lambda: Order.get_all(week_start, last_date), repeat, clear)
+    results['Register.get_total_sales'] = measure(register.get_total_sales, repeat, clear)
+    results['Employee.calculate_balance (month)'] = measure(
+        lambda: employee.calculate_balance(month_start, last_date), repeat, clear
+    )
+
+    try:
+        from views.statistics_view import StatisticsView
+    except ImportError as e:
+        results['StatisticsView.get_register_product_summary'] = {'skipped': str(e)}
+    else:
+        # The method only reads the database, so it is timed without building the widget
+        results['StatisticsView.get_register_product_summary'] = measure(
+            lambda: StatisticsView.get_register_product_summary(None, register), repeat, clear
+        )
+
+    # Cache layer
+    results['cache hit (Order.get_by_register)'] = measure(
+        lambda: Order.get_by_register(register.id), repeat, lambda: Order.get_by_register(register.id)
+    )
+    cache = QueryCache(max_size=100)
+    keys = [((index,), {}) for index in range(1000)]
+
+    def cache_cycle():
+        for args, kwargs in keys:
+            cache.set('bench', args, kwargs, args)
+            cache.get('bench', args, kwargs)
+    results['QueryCache set+get x1000'] = measure(cache_cycle, repeat)
+    results['invalidate_cache(Order)'] = measure(lambda: invalidate_cache('Order'), repeat)
+
+    # Checkout on a freshly opened register
+    Register(shift_type='morning', employee_name=employee.name, opening_amount=100.0).save()
+    controller = OrderController()
+    controller.print_receipt = lambda order: None  # No printer
+
+    def fill_cart():
+        for product in products:
+            controller.add_item(product, category_name=categories.get(product.category_id, ''))
+
+    journal = get_journal()
+    journal.start()
+    config_lowmem.ENABLE_CHECKOUT_JOURNAL = True
+    results['OrderController.checkout (journal)'] = measure(controller.checkout, repeat, fill_cart)
+    results['CheckoutJournal.flush'] = measure(journal.flush, 1)
+    journal.stop()
+
+    config_lowmem.ENABLE_CHECKOUT_JOURNAL = False
+    results['OrderController.checkout (direct)'] = measure(controller.checkout, repeat, fill_cart)
+
+    db.close()
+    return results
+
+
+def ensure_fixture(orders):
+    """Build the fixture database for a size if it does not exist yet; returns its path"""
+    path = os.path.join(BENCH_DIR, f"pos-{orders}-seed{FIXTURE_SEED}-{FIXTURE_END}.db")
+    if not os.path.exists(path):
+        print(f"Building fixture {path}...")
+        subprocess.run(
+            [sys.executable, "generate_benchmark_data.py", "--orders", str(orders),
+             "--seed", str(FIXTURE_SEED), "--end", FIXTURE_END, "--db", path],
+            check=True
+        )
+    return path
+
+
+def benchmark_size(orders, repeat):
+    """Benchmark a working copy of a fixture in a child process"""
+    fixture = ensure_fixture(orders)
+    with tempfile.TemporaryDirectory(prefix="pos-bench-") as temp_dir:
+        working_copy = os.path.join(temp_dir, "restaurant.db")
+        shutil.copyfile(fixture, working_copy)
+        env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+        worker = subprocess.run(
+            [sys.executable, __file__, "--worker", working_copy, "--repeat", str(repeat)],
+            capture_output=True, text=True, env=env
+        )
+    if worker.returncode:
+        print(worker.stdout + worker.stderr)
+        raise SystemExit(f"Benchmark worker failed for {orders} orders")
+    # The worker prints its JSON result on the last line
+    return json.loads(worker.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print timings next to the baseline; return the list of regressions"""
+    regressions = []
+    print(f"\n{'size':>6}  {'benchmark':<45} {'median ms':>10} {'baseline':>10} {'change':>8}")
+    for size, benchmarks in results['sizes'].items():
+        for name, timing in benchmarks.items():
+            if 'skipped' in timing:
+                print(f"{size:>6}  {name:<45} {'skipped':>10}")
+                continue
+            base = baseline.get('sizes', {}).get(size, {}).get(name, {}) if baseline else {}
+            if 'median_ms' not in base:
+                print(f"{size:>6}  {name:<45} {timing['median_ms']:>10.3f} {'-':>10}")
+                continue
+            change = timing['median_ms'] / base['median_ms'] - 1 if base['median_ms'] else 0.0
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append((size, name, change))
+            print(f"{size:>6}  {name:<45} {timing['median_ms']:>10.3f} {base['median_ms']:>10.3f} {change:>+7.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", default=["10k", "100k"], choices=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark (median is reported)")
+    parser.add_argument("--output", help="Results file (default: data/bench/results-<commit>.json)")
+    parser.add_argument("--baseline", help=f"Baseline to compare with (default: {BASELINE_PATH} if present)")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown reported as a regression (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Exit with status 1 on regressions")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also write the results to {BASELINE_PATH}")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_benchmarks(args.worker, args.repeat)))
+        return
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    commit = git_commit()
+    results = {
+        'commit': commit,
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'sizes': {},
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} orders...")
+        results['sizes'][size] = benchmark_size(SIZES[size], args.repeat)
+
+    output = args.output or os.path.join(BENCH_DIR, f"results-{commit or 'local'}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+    baseline = None
+    baseline_path = args.baseline or (BASELINE_PATH if os.path.exists(BASELINE_PATH) else None)
+    if baseline_path:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"Baseline: {baseline_path} (commit {baseline.get('commit')})")
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        shutil.copyfile(output, BASELINE_PATH)
+        print(f"Baseline saved to {BASELINE_PATH}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark multi-month report generation (utils/reports.py) against worker count
+
+Builds a synthetic multi-year database in a temporary folder, archives old
+months like the app does, then times build_product_report() over the whole
+range with 1, 2, 4, ... worker processes and checks that every run returns
+the same totals.
+
+Usage:
+    python benchmark_reports.py [--years 3] [--orders-per-day 200] [--archive-days 90] [--workers 1 2 4]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+import config
+
+
+PRODUCTS = [
+    ("Pizza", "Margherita", 12.0), ("Pizza", "Jambon", 14.0), ("Pizza", "Thon", 14.0),
+    ("Sandwich", "Jambon", 6.0), ("Sandwich", "Thon", 6.5), ("Makloub", "Jambon", 7.0),
+    ("Makloub", "Poulet", 7.5), ("Drinks", "Water", 1.0), ("Drinks", "Coffee", 3.0),
+]
+
+
+def build_database(years, orders_per_day, seed=42):
+    """Fill the configured database with years of registers, orders and items"""
+    from models import get_db
+
+    rng = random.Random(seed)
+    db = get_db()
+    day = datetime.now() - timedelta(days=365 * years)
+    today = datetime.now()
+    order_id = 0
+
+    def fill(connection, day):
+        nonlocal order_id
+        date = day.strftime("%Y/%m/%d")
+        cursor = connection.execute(
+            """INSERT INTO registers (shift_type, employee_name, opening_amount, closing_amount,
+               opened_at, closed_at, is_open, last_order_number) VALUES (?, ?, 0, 0, ?, ?, 0, ?)""",
+            ("day", f"Employee {rng.randint(1, 5)}", f"{date} 08:00:00", f"{date} 23:00:00", orders_per_day)
+        )
+        register_id = cursor.lastrowid
+        orders, items = [], []
+        for number in range(1, orders_per_day + 1):
+            order_id += 1
+            total = 0.0
+            for _ in range(rng.randint(1, 4)):
+                category, product, price = rng.choice(PRODUCTS)
+                quantity = rng.randint(1, 3)
+                total += price * quantity
+                items.append((order_id, f"{category} {product}", quantity, price, 0.0, price * quantity, ''))
+            orders.append((order_id, number, date, f"{8 + number * 14 // orders_per_day:02d}:00:00",
+                           total, 0, register_id))
+        connection.executemany(
+            """INSERT INTO orders (id, order_number, order_date, order_time, total_amount, is_delivery, register_id)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""", orders)
+        connection.executemany(
+            """INSERT INTO order_items (order_id, product_name, quantity, unit_price, discount, final_price, notes)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""", items)
+        connection.commit()
+
+    while day <= today:
+        db.submit_write(fill, day).result()
+        day += timedelta(days=1)
+    db.execute("DELETE FROM change_log")
+    db.commit()
+    return order_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--orders-per-day", type=int, default=200)
+    parser.add_argument("--archive-days", type=int, default=90)
+    parser.add_argument("--workers", type=int, nargs="+", help="Worker counts to time (default: 1, 2, 4, ... up to the CPU count)")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="pos-report-bench-")
+    config.DATABASE_PATH = os.path.join(temp_dir, "restaurant.db")
+
+    try:
+        from utils.archive import archive_old_orders
+        from utils.reports import build_product_report
+
+        start = time.perf_counter()
+        orders = build_database(args.years, args.orders_per_day)
+        print(f"Built {orders} orders over {args.years} years in {time.perf_counter() - start:.1f}s ({temp_dir})")
+
+        start = time.perf_counter()
+        archived = archive_old_orders(args.archive_days)
+        print(f"Archived {archived} orders in {time.perf_counter() - start:.1f}s")
+
+        start_date = (datetime.now() - timedelta(days=365 * args.years)).strftime("%Y/%m/%d")
+        filter_config = {'categories': [], 'keywords': ['jambon', 'thon'], 'all_categories': True}
+
+        worker_counts = args.workers or [1]
+        while not args.workers and worker_counts[-1] * 2 <= (os.cpu_count() or 1):
+            worker_counts.append(worker_counts[-1] * 2)
+
+        baseline = None
+        reference = None
+        print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}")
+        for workers in worker_counts:
+            start = time.perf_counter()
+            report = build_product_report(start_date, filter_config=filter_config, workers=workers)
+            elapsed = time.perf_counter() - start
+
+            summary = (report['total_orders'], round(report['total_sales'], 2), report['products'])
+            if reference is None:
+                reference = summary
+            elif summary != reference:
+                print(f"Mismatch with {workers} workers!")
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {baseline / elapsed:>7.2f}x")
+
+        print(f"Orders: {reference[0]}  Sales: {reference[1]:.2f} dt  Product lines: {len(reference[2])}")
+    finally:
+        from models import get_db
+        get_db().close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
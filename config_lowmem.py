@@ -14,31 +14,120 @@ CACHE_TTL_SECONDS = 90  # Cache time-to-live in seconds (reduced from 120)
 STATISTICS_PAGE_SIZE = 15  # Items per page in statistics view
 HISTORY_PAGE_SIZE = 30  # Items per page in history view
 EMPLOYEE_PAGE_SIZE = 20  # Items per page in employee view
+CLIENT_PAGE_SIZE = 20  # Items per page in client view
 
 # UI settings - Reduce visual effects
 ENABLE_ANIMATIONS = False  # Disable animations to save CPU/memory
-TABLE_ICON_SIZE = 32  # Smaller icon size (default: 48)
 BUTTON_MIN_HEIGHT = 35  # Smaller buttons (default: 40)
 
 # Loading behavior
 LAZY_LOAD_ORDER_ITEMS = True  # Don't load order items unless explicitly needed
-PRELOAD_IMAGES = False  # Don't preload product images
+PRELOAD_IMAGES = False  # Don't decode every menu image at startup (thumbnails load as pages are shown)
+THUMBNAIL_CACHE_KB = 4096  # Memory for decoded product thumbnails (QPixmapCache)
+RELEASE_VIEWS_AFTER_MINUTES = 15  # Free settings/history/statistics/... screens unused this long (0 = keep them)
 
 # Auto-cleanup settings
 AUTO_CLEAR_OLD_CACHE = True  # Automatically clear old cache entries
 CACHE_CLEANUP_INTERVAL = 60  # Seconds between cache cleanups
+MEMORY_BUDGET_MB = 450  # Above this, caches are shrunk and garbage collected right away
+MEMORY_CHECK_SECONDS = 30  # How often memory is sampled
+MEMORY_IDLE_SECONDS = 60  # Full garbage collections wait until the till has been idle this long
+MEMORY_COLLECT_INTERVAL_MINUTES = 5  # ... and at least this long since the previous one
 
 # Date range limits (to prevent loading too much data)
-MAX_DATE_RANGE_DAYS = 90  # Maximum days that can be loaded at once
+MAX_DATE_RANGE_DAYS = 90  # Longest date range for employee balances
 DEFAULT_DATE_RANGE_DAYS = 30  # Default date range for reports
 
 # Database query optimization
-USE_INDEXED_QUERIES = True  # Ensure all queries use indexes
 BATCH_SIZE = 100  # Maximum records to process in a batch
+CHANGE_LOG_MAX_ROWS = 5000  # Change log entries kept for delta refresh of history/statistics
+DB_READER_CONNECTIONS = 3  # Read-only connections (one per thread: UI + background workers)
+DB_BACKGROUND_WORKERS = 2  # Threads running *_async model methods
 
 # Logging (reduce file I/O)
 LOG_LEVEL = "WARNING"  # Only log warnings and errors
 LOG_TO_FILE = False  # Don't write logs to file to save disk I/O
+LOG_FILE_MAX_MB = 5  # data/pos.log rotates at this size
+LOG_FILE_COUNT = 3  # Rotated log files kept
+SPANS_ENABLED = True  # Latency histograms of queries, loaders, checkout, printing and view refreshes (utils/spans.py)
+SPAN_SLOW_MS = 250  # Spans slower than this are logged at INFO
+SPAN_TRACE_SAMPLE = 0.01  # Share of the other spans logged at DEBUG
+STALL_DETECTOR_ENABLED = True  # Capture the UI thread's stack when the event loop stops responding
+STALL_THRESHOLD_MS = 150  # Event loop unresponsive this long counts as a stall
+STALL_LOG_INTERVAL_SECONDS = 60  # At most one stall logged per interval (all are counted)
+PROFILE_HOTKEY = "Ctrl+Shift+P"  # Starts/stops a profile capture on the order screen (utils/profiler.py)
+PROFILE_CAPTURE_SECONDS = 30  # Length of a hotkey capture
+PROFILE_MAX_SECONDS = 120  # Captures waiting for a checkout or screen opening stop after this
+PROFILE_SAMPLE_MS = 5  # Stack sampling interval for the flamegraph
+METRICS_ENABLED = False  # Serve Prometheus-format metrics at http://METRICS_HOST:METRICS_PORT/metrics
+METRICS_HOST = "127.0.0.1"  # "0.0.0.0" to let a Prometheus on the shop network scrape this till
+METRICS_PORT = 9464
+SQL_TRACE_ENABLED = False  # Record every statement to data/traces/ for replay (see utils/sql_trace.py)
+SQL_TRACE_MAX_MB = 5  # Size at which the trace file rotates
+SQL_TRACE_FILES = 5  # Rotated trace files kept
 
-# Print settings
-PRINT_QUEUE_SIZE = 5  # Maximum print jobs to queue
+# Checkout journal (sales are fsynced to a journal, then written to the database in batches)
+ENABLE_CHECKOUT_JOURNAL = True  # False writes each checkout to the database directly
+JOURNAL_GROUP_COMMIT_MS = 200  # Wait this long for more checkouts to join a batch
+JOURNAL_MAX_BATCH = 50  # Maximum checkouts applied in one transaction
+JOURNAL_FLUSH_TIMEOUT_SECONDS = 5  # Longest the UI waits for journaled sales before warning
+JOURNAL_MAX_ATTEMPTS = 5  # Tries (a second apart) before a rejected checkout is moved to restaurant.failed
+
+# Archive settings (see utils/archive.py)
+ARCHIVE_AFTER_DAYS = 180  # Orders of closed registers older than this move to monthly archives
+ARCHIVE_ATTACH_LIMIT = 8  # Archives attached per query group (SQLite allows 10 attachments)
+REPORT_WORKERS = 1  # Processes for multi-month reports (0 = one per CPU core, 1 = no extra processes)
+
+# Backup settings (see utils/backup.py)
+BACKUP_PAGES_PER_STEP = 256  # Database pages copied per backup step
+BACKUP_STEP_PAUSE_MS = 5  # Pause between steps so checkouts are not held up
+BACKUP_IDLE_MINUTES = 10  # Idle time before an automatic backup
+BACKUP_MIN_INTERVAL_HOURS = 6  # Minimum time between idle backups
+BACKUP_KEEP_DAILY = 7  # Newest backup of each of the last N days
+BACKUP_KEEP_WEEKLY = 4  # ... of the last N weeks
+BACKUP_KEEP_MONTHLY = 12  # ... of the last N months
+
+# Performance profiles (see utils/profiles.py)
+# The values above are the "lowmem" profile for 2GB tills; the other profiles
+# override some of them. Chosen at startup by `python main.py --profile NAME`,
+# otherwise by PERFORMANCE_PROFILE ("auto" picks one from the installed RAM).
+PERFORMANCE_PROFILE = "auto"
+PROFILE_OVERRIDES = {
+    'lowmem': {},
+    'standard': {  # 4-8GB RAM
+        'CACHE_MAX_SIZE': 100,
+        'CACHE_TTL_SECONDS': 300,
+        'STATISTICS_PAGE_SIZE': 25,
+        'HISTORY_PAGE_SIZE': 50,
+        'EMPLOYEE_PAGE_SIZE': 30,
+        'CLIENT_PAGE_SIZE': 30,
+        'PRELOAD_IMAGES': True,
+        'THUMBNAIL_CACHE_KB': 10240,
+        'RELEASE_VIEWS_AFTER_MINUTES': 60,
+        'MAX_DATE_RANGE_DAYS': 180,
+        'BATCH_SIZE': 500,
+        'DB_READER_CONNECTIONS': 4,
+        'REPORT_WORKERS': 2,
+        'MEMORY_BUDGET_MB': 900,
+    },
+    'high-throughput': {  # 8GB+ RAM, busy shops
+        'CACHE_MAX_SIZE': 200,
+        'CACHE_TTL_SECONDS': 300,
+        'STATISTICS_PAGE_SIZE': 50,
+        'HISTORY_PAGE_SIZE': 100,
+        'EMPLOYEE_PAGE_SIZE': 50,
+        'CLIENT_PAGE_SIZE': 50,
+        'ENABLE_ANIMATIONS': True,
+        'PRELOAD_IMAGES': True,
+        'THUMBNAIL_CACHE_KB': 20480,
+        'RELEASE_VIEWS_AFTER_MINUTES': 0,
+        'MAX_DATE_RANGE_DAYS': 366,
+        'BATCH_SIZE': 1000,
+        'DB_READER_CONNECTIONS': 4,
+        'DB_BACKGROUND_WORKERS': 4,
+        'REPORT_WORKERS': 0,
+        'JOURNAL_MAX_BATCH': 100,
+        'MEMORY_BUDGET_MB': 2000,
+    },
+}
+AUTO_PROFILE_MAX_RAM_GB = {'lowmem': 3, 'standard': 8}  # "auto": first profile whose limit the RAM is under
@@ -1,8 +1,13 @@
 """
 Order controller for managing cart and checkout
 """
+import time
 from models import Order, OrderItem, Register
 from datetime import datetime
+from utils.diagnostics import get_diagnostics
+from utils.profiler import get_profiler
+from utils.spans import timed
+import config_lowmem
 
 
 class OrderController:
@@ -19,7 +24,10 @@ class OrderController:
         if not current_register:
             return 0  # No register open
 
-        # Return the next order number (current last_order_number + 1)
+        # Return the next order number (current last_order_number + 1, counting journaled orders)
+        if config_lowmem.ENABLE_CHECKOUT_JOURNAL:
+            from utils.checkout_journal import get_journal
+            return get_journal().next_order_number(current_register)
         return current_register.last_order_number + 1
 
     def add_item(self, product, quantity=1, notes='', category_name='', toppings=None, custom_price=None):
@@ -89,10 +97,12 @@ class OrderController:
         self.cart_items = []
         self.current_order_number = None
 
+    @timed()
     def checkout(self, is_delivery=False, delivery_data=None, client_id=None):
         """Process checkout and create order"""
         if not self.cart_items:
             return False
+        start = time.perf_counter()
 
         # Get current register
         current_register = Register.get_current_register()
@@ -101,7 +111,14 @@ class OrderController:
 
         # Create order
         order = Order()
-        order.order_number = Order.get_next_order_number()  # This will get and increment from register
+        if config_lowmem.ENABLE_CHECKOUT_JOURNAL:
+            from utils.checkout_journal import get_journal
+            journal = get_journal()
+            # The register's counter is advanced when the journal entry is applied
+            order.order_number = journal.next_order_number(current_register)
+        else:
+            journal = None
+            order.order_number = Order.get_next_order_number()  # This will get and increment from register
         order.order_date = datetime.now().strftime("%Y/%m/%d")
         order.order_time = datetime.now().strftime("%H:%M:%S")
         order.register_id = current_register.id
@@ -156,22 +173,32 @@ class OrderController:
             order_item.calculate_final_price()
             order.add_item(order_item)
 
-        # Save order to database
-        order.save()
+        if journal:
+            # Durably journal the order (and the client balance change of a credit
+            # sale); the database write happens in the background
+            order.calculate_total()
+            journal.append_order(order)
+        else:
+            # Save order to database
+            order.save()
 
-        # Update client balance if credit sale
-        if client_id is not None and not order.is_paid:
-            from models import Client
-            client = Client.get_by_id(client_id)
-            if client:
-                client.add_to_balance(order.total_amount)
+            # Update client balance if credit sale
+            if client_id is not None and not order.is_paid:
+                from models import Client
+                client = Client.get_by_id(client_id)
+                if client:
+                    client.add_to_balance(order.total_amount)
 
         # Print receipt
+        print_start = time.perf_counter()
         self.print_receipt(order)
+        print_seconds = time.perf_counter() - print_start
 
         # Clear cart
         self.clear_cart()
 
+        get_diagnostics().record_checkout(time.perf_counter() - start, print_seconds)
+        get_profiler().notify('checkout')
         return True
 
     def print_receipt(self, order):
@@ -183,4 +210,5 @@ class OrderController:
             print_kitchen_receipt(order)
         except Exception as e:
             print(f"Printing error: {e}")
+            get_diagnostics().record_print_failure()
             # Continue even if printing fails
@@ -0,0 +1,384 @@
+"""
+Generate large, reproducible databases for performance testing
+
+Builds a separate database (never data/restaurant.db unless asked) with a
+seeded random generator, so the same size, seed and --end date always give
+the same rows. The catalog comes from menu.json; on top of it the generator models
+two registers per day (morning/evening shifts), a lunch and dinner rush,
+busier weekends, toppings, deliveries, credit clients, employees with
+expenses and days off.
+
+Rows are bulk-loaded with executemany, one transaction per day, on the
+database writer thread; change_log triggers are suspended during the load.
+
+Usage:
+    python generate_benchmark_data.py --size 100k
+    python generate_benchmark_data.py --orders 250000 --days 365 --seed 7 --end 2025-12-31 --db data/bench/custom.db
+"""
+import argparse
+import itertools
+import math
+import os
+import random
+import time
+from collections import deque
+from datetime import datetime, timedelta
+import config
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000, '10m': 10_000_000}
+
+# Relative order volume per hour of the day (lunch and dinner rush)
+HOURLY_WEIGHTS = {
+    8: 2, 9: 3, 10: 3, 11: 6, 12: 12, 13: 12, 14: 7, 15: 4,
+    16: 4, 17: 5, 18: 7, 19: 11, 20: 12, 21: 8, 22: 4, 23: 2,
+}
+WEEKDAY_WEIGHTS = (1.0, 0.9, 1.0, 1.0, 1.2, 1.4, 1.3)  # Monday .. Sunday
+SHIFTS = (('morning', 8, 16), ('evening', 16, 24))
+
+EMPLOYEES = (
+    ("Ahmed", 40.0), ("Sami", 35.0), ("Nour", 35.0), ("Yassine", 30.0),
+    ("Ines", 30.0), ("Karim", 45.0),
+)
+TOPPING_GROUPS = (
+    ("Sauce", (("Harissa", 0.0), ("Mayonnaise", 0.0), ("Algerienne", 0.5), ("Barbecue", 0.5))),
+    ("Supplement", (("Fromage", 1.5), ("Oeuf", 1.0), ("Frites", 1.0), ("Viande", 3.0))),
+)
+DELIVERY_STREETS = ("Rue de Marseille", "Avenue Habib Bourguiba", "Rue Ibn Khaldoun", "Route de la Marsa", "Cite Ennasr")
+DELIVERY_RATE = 0.25
+CREDIT_RATE = 0.04
+DISCOUNT_RATE = 0.08
+TOPPING_RATE = 0.5
+CLIENT_COUNT = 40
+PENDING_DAYS = 2  # Days generated ahead of the writer thread
+
+
+def default_days(orders):
+    """About 300 orders a day, between one month and three years"""
+    return max(30, min(3 * 365, math.ceil(orders / 300)))
+
+
+def split_orders(total, weights):
+    """Split total into integer counts proportional to weights (exact sum)"""
+    weight_sum = sum(weights)
+    counts = []
+    cumulative = 0.0
+    previous = 0
+    for weight in weights:
+        cumulative += weight
+        boundary = round(total * cumulative / weight_sum)
+        counts.append(boundary - previous)
+        previous = boundary
+    return counts
+
+
+def _drop_change_triggers(connection):
+    """Suspend change_log triggers for the bulk load (initialize_schema() recreates them)"""
+    for (name,) in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%_log'"
+    ).fetchall():
+        connection.execute(f"DROP TRIGGER {name}")
+    connection.execute("PRAGMA synchronous=OFF")
+    connection.commit()
+
+
+def _insert_rows(connection, day):
+    """Write one generated day in a single transaction (runs on the writer thread)"""
+    try:
+        register_ids = []
+        for register in day['registers']:
+            cursor = connection.execute(
+                """INSERT INTO registers (shift_type, employee_name, opening_amount, closing_amount,
+                   opened_at, closed_at, is_open, last_order_number) VALUES (?, ?, ?, ?, ?, ?, 0, ?)""",
+                register
+            )
+            register_ids.append(cursor.lastrowid)
+
+        connection.executemany(
+            """INSERT INTO orders (id, order_number, order_date, order_time, total_amount, is_delivery,
+               delivery_address, delivery_phone, delivery_price, register_id, client_id, is_paid, price_modified)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [order[:9] + (register_ids[order[9]],) + order[10:] for order in day['orders']]
+        )
+        connection.executemany(
+            """INSERT INTO order_items (order_id, product_name, quantity, unit_price, discount, final_price, notes)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            day['items']
+        )
+        connection.executemany(
+            """INSERT INTO employee_expenses (employee_id, amount, description, expense_date, expense_time, added_by)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            day['expenses']
+        )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+
+def _insert_days_off(connection, rows):
+    """Insert planned days off (runs on the writer thread)"""
+    connection.executemany(
+        """INSERT INTO employee_days_off (employee_id, start_date, end_date, reason, added_by)
+           VALUES (?, ?, ?, ?, ?)""",
+        rows
+    )
+    connection.commit()
+
+
+def _finish_load(connection, client_balances):
+    """Store credit balances and restore durable commits (runs on the writer thread)"""
+    connection.executemany(
+        "UPDATE clients SET current_balance = ? WHERE id = ?",
+        [(round(balance, 3), client_id) for client_id, balance in client_balances.items()]
+    )
+    connection.commit()
+    connection.execute("PRAGMA synchronous=FULL")
+
+
+def _setup_catalog(db, rng):
+    """Import menu.json and add topping groups, employees and clients; returns generator inputs"""
+    from utils.migrate_data import import_menu
+
+    import_menu("menu.json")
+
+    if not db.execute("SELECT COUNT(*) FROM topping_groups").fetchone()[0]:
+        for display_order, (group_name, options) in enumerate(TOPPING_GROUPS):
+            group_id = db.execute(
+                "INSERT INTO topping_groups (name, display_order) VALUES (?, ?)", (group_name, display_order)
+            ).lastrowid
+            for option_order, (option_name, price) in enumerate(options):
+                db.execute(
+                    "INSERT INTO topping_options (group_id, name, price, display_order) VALUES (?, ?, ?, ?)",
+                    (group_id, option_name, price, option_order)
+                )
+        db.commit()
+
+    categories = db.execute("SELECT id, name FROM categories WHERE is_active = 1 ORDER BY id").fetchall()
+    groups = db.execute("SELECT id FROM topping_groups ORDER BY id").fetchall()
+    for category in categories:
+        # About half the categories offer toppings
+        if rng.random() < 0.5:
+            for group in groups:
+                db.execute(
+                    "INSERT OR IGNORE INTO category_topping_groups (category_id, topping_group_id) VALUES (?, ?)",
+                    (category['id'], group['id'])
+                )
+    db.commit()
+
+    products = db.execute(
+        """SELECT c.name AS category, p.name, p.price,
+                  EXISTS (SELECT 1 FROM category_topping_groups ctg WHERE ctg.category_id = c.id) AS has_toppings
+           FROM products p JOIN categories c ON p.category_id = c.id
+           WHERE p.is_active = 1 AND c.is_active = 1 ORDER BY p.id"""
+    ).fetchall()
+    products = [(f"{row['category']} {row['name']}", row['price'], bool(row['has_toppings'])) for row in products]
+    # A few best sellers and a long tail
+    popularity = [1.0 / (rank + 1) ** 0.8 for rank in range(len(products))]
+    rng.shuffle(popularity)
+
+    toppings = [
+        (row['name'], row['price']) for row in db.execute("SELECT name, price FROM topping_options ORDER BY id").fetchall()
+    ]
+
+    employees = []
+    for name, salary in EMPLOYEES:
+        db.execute("INSERT OR IGNORE INTO employees (name, daily_salary) VALUES (?, ?)", (name, salary))
+    db.commit()
+    for row in db.execute("SELECT id, name FROM employees WHERE is_active = 1 ORDER BY id").fetchall():
+        employees.append((row['id'], row['name']))
+
+    clients = []
+    for number in range(CLIENT_COUNT):
+        cursor = db.execute(
+            "INSERT INTO clients (name, phone, credit_limit) VALUES (?, ?, ?)",
+            (f"Client {number + 1}", f"2{rng.randint(0, 9999999):07d}", rng.choice([100.0, 200.0, 500.0]))
+        )
+        clients.append(cursor.lastrowid)
+    db.commit()
+
+    return products, popularity, toppings, employees, clients
+
+
+def _plan_days_off(rng, employees, first_day, days):
+    """Two short leaves a month per employee: {employee_id: set of day indexes}, plus rows to insert"""
+    days_off = {employee_id: set() for employee_id, _ in employees}
+    rows = []
+    for employee_id, _ in employees:
+        for _ in range(max(1, days // 15)):
+            start = rng.randrange(days)
+            length = rng.choice((1, 1, 1, 2, 3))
+            days_off[employee_id].update(range(start, min(days, start + length)))
+            start_date = first_day + timedelta(days=start)
+            end_date = start_date + timedelta(days=length - 1)
+            rows.append((employee_id, start_date.strftime("%Y/%m/%d"), end_date.strftime("%Y/%m/%d"),
+                         rng.choice(("Repos", "Maladie", "Conge")), "generator"))
+    return days_off, rows
+
+
+def generate(orders, days=None, seed=42, db_path=None, end_date=None):
+    """Generate a database with the given number of orders; returns its path
+
+    History ends on end_date (a datetime, default today).
+    """
+    days = days or default_days(orders)
+    if db_path:
+        config.DATABASE_PATH = db_path
+
+    from models import get_db
+
+    rng = random.Random(seed)
+    db = get_db()
+    if db.execute("SELECT COUNT(*) FROM orders").fetchone()[0]:
+        raise SystemExit(f"{config.DATABASE_PATH} already has orders; use a new --db path")
+
+    products, popularity, toppings, employees, clients = _setup_catalog(db, rng)
+    product_weights = list(itertools.accumulate(popularity))
+    hours = list(HOURLY_WEIGHTS)
+    hour_weights = list(itertools.accumulate(HOURLY_WEIGHTS[hour] for hour in hours))
+    item_counts = list(itertools.accumulate((30, 35, 20, 10, 5)))
+    quantities = list(itertools.accumulate((80, 15, 5)))
+
+    end_date = (end_date or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = end_date - timedelta(days=days - 1)
+    days_off, days_off_rows = _plan_days_off(rng, employees, first_day, days)
+    db.submit_write(_insert_days_off, days_off_rows).result()
+
+    day_weights = [WEEKDAY_WEIGHTS[(first_day + timedelta(days=index)).weekday()] * rng.uniform(0.85, 1.15)
+                   for index in range(days)]
+    day_counts = split_orders(orders, day_weights)
+
+    db.submit_write(_drop_change_triggers).result()
+
+    client_balances = {}
+    order_id = 0
+    pending = deque()
+    start = time.perf_counter()
+    for day_index, day_count in enumerate(day_counts):
+        day = first_day + timedelta(days=day_index)
+        date = day.strftime("%Y/%m/%d")
+
+        # Time-sorted arrivals following the rush-hour curve
+        arrivals = sorted(
+            (hour, rng.randrange(60), rng.randrange(60))
+            for hour in rng.choices(hours, cum_weights=hour_weights, k=day_count)
+        )
+
+        on_duty = [employee for employee in employees if day_index not in days_off[employee[0]]] or employees
+        shift_employees = rng.sample(on_duty, 2) if len(on_duty) > 1 else on_duty * 2
+
+        day_orders = []
+        day_items = []
+        shift_totals = [[0, 0.0], [0, 0.0]]  # [last order number, cash sales]
+        for hour, minute, second in arrivals:
+            shift = 0 if hour < SHIFTS[0][2] else 1
+            order_id += 1
+            shift_totals[shift][0] += 1
+
+            total = 0.0
+            price_modified = False
+            for _ in range(rng.choices((1, 2, 3, 4, 5), cum_weights=item_counts)[0]):
+                name, price, has_toppings = rng.choices(products, cum_weights=product_weights)[0]
+                quantity = rng.choices((1, 2, 3), cum_weights=quantities)[0]
+                notes = ''
+                if has_toppings and rng.random() < TOPPING_RATE:
+                    chosen = rng.sample(toppings, rng.randint(1, 2))
+                    price += sum(option_price for _, option_price in chosen)
+                    notes = ', '.join(option_name for option_name, _ in chosen)
+                discount = 0.0
+                if rng.random() < DISCOUNT_RATE:
+                    discount = rng.choice((0.5, 1.0, 2.0))
+                    price_modified = True
+                final_price = (price - discount) * quantity
+                total += final_price
+                day_items.append((order_id, name, quantity, price, discount, final_price, notes))
+
+            delivery = (0, None, None, 0.0)
+            if rng.random() < DELIVERY_RATE:
+                delivery_price = rng.choice((2.0, 3.0, 5.0))
+                delivery = (1, f"{rng.randint(1, 200)} {rng.choice(DELIVERY_STREETS)}",
+                            f"9{rng.randint(0, 9999999):07d}", delivery_price)
+                total += delivery_price
+
+            client_id = None
+            is_paid = 1
+            if clients and rng.random() < CREDIT_RATE:
+                client_id = rng.choice(clients)
+                is_paid = 0
+                client_balances[client_id] = client_balances.get(client_id, 0.0) + total
+            else:
+                shift_totals[shift][1] += total
+
+            day_orders.append((order_id, shift_totals[shift][0], date, f"{hour:02d}:{minute:02d}:{second:02d}",
+                               total) + delivery + (shift, client_id, is_paid, int(price_modified)))
+
+        registers = []
+        for shift, (shift_type, open_hour, close_hour) in enumerate(SHIFTS):
+            opening_amount = 100.0
+            closed_at = day + timedelta(hours=close_hour)
+            registers.append((
+                shift_type, shift_employees[shift][1], opening_amount,
+                opening_amount + round(shift_totals[shift][1], 3),
+                f"{date} {open_hour:02d}:00:00", closed_at.strftime("%Y/%m/%d %H:%M:%S"),
+                shift_totals[shift][0],
+            ))
+
+        expenses = [
+            (employee_id, rng.choice((5.0, 10.0, 20.0)), rng.choice(("Avance", "Repas", "Transport")),
+             date, f"{rng.randint(9, 22):02d}:00:00", "generator")
+            for employee_id, _ in shift_employees if rng.random() < 0.1
+        ]
+
+        # Generate the next days while the writer thread inserts this one
+        pending.append(db.submit_write(_insert_rows, {
+            'registers': registers, 'orders': day_orders, 'items': day_items, 'expenses': expenses,
+        }))
+        while len(pending) > PENDING_DAYS:
+            pending.popleft().result()
+
+        if (day_index + 1) % 30 == 0 or day_index + 1 == days:
+            rate = order_id / max(time.perf_counter() - start, 1e-9)
+            print(f"  {date}: {order_id}/{orders} orders ({rate:,.0f} orders/s)")
+
+    while pending:
+        pending.popleft().result()
+
+    db.submit_write(_finish_load, client_balances).result()
+
+    # Recreate the change_log triggers, then refresh planner statistics
+    db.initialize_schema()
+    db.execute("DELETE FROM change_log")
+    db.commit()
+    db.execute("ANALYZE")
+    db.commit()
+    return config.DATABASE_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES, key=SIZES.get), help="Preset order count")
+    parser.add_argument("--orders", type=int, help="Number of orders (overrides --size)")
+    parser.add_argument("--days", type=int, help="Days of history (default: about 300 orders a day)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", help="Last day of history, YYYY-MM-DD (default: today)")
+    parser.add_argument("--db", help="Output database (default: data/bench/pos-<orders>-seed<seed>.db)")
+    args = parser.parse_args()
+
+    orders = args.orders or SIZES[args.size or '10k']
+    db_path = args.db or os.path.join("data", "bench", f"pos-{orders}-seed{args.seed}.db")
+    if os.path.exists(db_path):
+        parser.error(f"{db_path} already exists")
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    days = args.days or default_days(orders)
+    print(f"Generating {orders:,} orders over {days} days (seed {args.seed}) into {db_path}")
+    start = time.perf_counter()
+    end_date = datetime.strptime(args.end, "%Y-%m-%d") if args.end else None
+    generate(orders, days, args.seed, db_path, end_date)
+
+    from models import get_db
+    get_db().close()
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -137,14 +137,13 @@ def generate_mock_orders(num_orders=50, start_date=None, end_date=None):
 
     print(f"Found {len(product_list)} active products")
 
-    # Get or create a register
-    registers = Register.get_all()
+    # Use the most recent register (or create orders for closed registers)
+    registers = Register.page(limit=1)['items']
     if not registers:
         print("Error: No registers found. Please open a register first.")
         return
-
-    # Use the first register (or create orders for closed registers)
     register = registers[0]
+
     print(f"Using register #{register.id} ({register.employee_name})")
 
     # Date range
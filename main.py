@@ -1,24 +1,98 @@
 """
 Main entry point for the Restaurant POS System
 """
+import time
+STARTED = time.perf_counter()
+
+import os
 import sys
-from PyQt5.QtWidgets import QApplication
-from views.main_window import MainWindow
-from utils.styles import get_main_stylesheet
+from utils.profiles import apply_profile, apply_qt_settings, profile_from_args
 from models import get_db
 import config
+import config_lowmem
 
 
 def main():
     """Main application entry point"""
+    # The UI is imported here, not at module level: report worker processes
+    # (utils/reports.py) re-import this module and need none of it
+    from PyQt5.QtWidgets import QApplication
+    from views.main_window import MainWindow
+    from utils.styles import get_main_stylesheet
+    from utils.startup_timing import StartupTimer
+
+    timer = StartupTimer(STARTED)
+    timer.mark('imports')
+
+    # Apply the performance profile (--profile NAME, or PERFORMANCE_PROFILE in config_lowmem.py)
+    profile_name, argv = profile_from_args(sys.argv)
+    profile = apply_profile(profile_name)
+    print(f"Performance profile: {profile['name']} ({profile['source']})")
+
     # Create Qt application
-    app = QApplication(sys.argv)
+    app = QApplication(argv)
+    apply_qt_settings(app)
 
     # Apply stylesheet
     app.setStyleSheet(get_main_stylesheet())
 
-    # Initialize database
-    db = get_db()
+    # Initialize database (the full schema check waits for the first paint
+    # when the database is already at the current schema version)
+    db = get_db(defer_schema_check=True)
+
+    # Replay checkouts that were journaled but not written before the last shutdown
+    if config_lowmem.ENABLE_CHECKOUT_JOURNAL:
+        from utils.checkout_journal import get_journal
+        journal = get_journal()
+        journal.start()
+        app.aboutToQuit.connect(journal.stop)
+    timer.mark('database')
+
+    # Create and show main window
+    window = MainWindow()
+    timer.mark('main window')
+    window.showMaximized()
+
+    def after_first_paint():
+        timer.mark('first paint')
+        deferred_startup(window, db)
+        timer.mark('deferred startup')
+        timer.report()
+
+    timer.on_first_paint(window, after_first_paint)
+
+    # Run application
+    sys.exit(app.exec_())
+
+
+def deferred_startup(window, db):
+    """Startup work that does not need to hold up the first paint"""
+    from PyQt5.QtWidgets import QApplication
+
+    if not db.schema_checked:
+        db.initialize_schema()
+
+    # Watch the event loop for stalls once startup is over
+    if config_lowmem.STALL_DETECTOR_ENABLED:
+        from utils.stall_detector import get_stall_detector
+        detector = get_stall_detector()
+        detector.start()
+        QApplication.instance().aboutToQuit.connect(detector.stop)
+
+    # Local metrics endpoint for monitoring several tills
+    if config_lowmem.METRICS_ENABLED:
+        from utils.metrics_server import start_metrics_server
+        server = start_metrics_server()
+        if server:
+            QApplication.instance().aboutToQuit.connect(server.stop)
+
+    # Startup objects live for the whole session: keep them out of later full collections
+    from utils.memory_optimizer import get_optimizer
+    get_optimizer().freeze_startup_objects()
+
+    # Move old orders of closed registers into monthly archives (in the background)
+    from utils.archive import start_archiving
+    start_archiving()
 
     # Check if we need to migrate data
     from models import Category
@@ -29,20 +103,13 @@ def main():
         print("Attempting to migrate from menu.json or create sample data...")
 
         from utils.migrate_data import migrate_from_json, create_sample_data
-        import os
 
         if os.path.exists("menu.json"):
             migrate_from_json("menu.json")
         else:
             print("No menu.json found. Creating sample data...")
             create_sample_data()
-
-    # Create and show main window
-    window = MainWindow()
-    window.showMaximized()
-
-    # Run application
-    sys.exit(app.exec_())
+        window.load_categories()
 
 
 if __name__ == "__main__":
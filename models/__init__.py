@@ -1,7 +1,7 @@
 """
 Models package for database operations
 """
-from .database import Database, get_db
+from .database import Database, get_db, run_async
 from .category import Category
 from .product import Product
 from .order import Order, OrderItem
@@ -10,4 +10,4 @@ from .employee import Employee, EmployeeExpense, EmployeeDayOff
 from .client import Client
 from .topping import ToppingGroup, ToppingOption
 
-__all__ = ['Database', 'get_db', 'Category', 'Product', 'Order', 'OrderItem', 'Register', 'Employee', 'EmployeeExpense', 'EmployeeDayOff', 'Client', 'ToppingGroup', 'ToppingOption']
+__all__ = ['Database', 'get_db', 'run_async', 'Category', 'Product', 'Order', 'OrderItem', 'Register', 'Employee', 'EmployeeExpense', 'EmployeeDayOff', 'Client', 'ToppingGroup', 'ToppingOption']
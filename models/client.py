@@ -2,7 +2,8 @@
 Client model for managing customers with credit/monthly payment accounts
 """
 from datetime import datetime
-from .database import get_db
+from .database import get_db, like_pattern
+import config_lowmem
 from utils.cache import cached_query, invalidate_cache
 
 
@@ -21,6 +22,21 @@ class Client:
         self.is_active = is_active
         self.created_at = created_at or datetime.now().strftime("%Y/%m/%d %H:%M:%S")
 
+    @staticmethod
+    def _from_row(row):
+        """Build a Client from a clients table row"""
+        return Client(
+            id=row['id'],
+            name=row['name'],
+            phone=row['phone'],
+            address=row['address'],
+            credit_limit=row['credit_limit'],
+            current_balance=row['current_balance'],
+            notes=row['notes'],
+            is_active=bool(row['is_active']),
+            created_at=row['created_at']
+        )
+
     @staticmethod
     @cached_query()
     def get_all(active_only=True):
@@ -33,20 +49,63 @@ class Client:
 
         clients = []
         for row in cursor.fetchall():
-            client = Client(
-                id=row['id'],
-                name=row['name'],
-                phone=row['phone'],
-                address=row['address'],
-                credit_limit=row['credit_limit'],
-                current_balance=row['current_balance'],
-                notes=row['notes'],
-                is_active=bool(row['is_active']),
-                created_at=row['created_at']
-            )
-            clients.append(client)
+            clients.append(Client._from_row(row))
         return clients
 
+    @staticmethod
+    def _filter_conditions(filters):
+        """Translate a filters dict ('active_only', default True, and 'search': name or phone) into SQL"""
+        filters = filters or {}
+        conditions = []
+        params = []
+
+        if filters.get('active_only', True):
+            conditions.append("is_active = 1")
+
+        search = (filters.get('search') or '').strip()
+        if search:
+            pattern = like_pattern(search)
+            conditions.append("(name LIKE ? ESCAPE '\\' OR phone LIKE ? ESCAPE '\\')")
+            params.extend([pattern, pattern])
+
+        return conditions, params
+
+    @staticmethod
+    def page(after_key=None, limit=None, filters=None, backward=False):
+        """Get one page of clients ordered by name using keyset pagination
+
+        Args:
+            after_key: 'last_key' of the previous page (or 'first_key' with backward=True)
+            limit: Page size, defaults to config_lowmem.CLIENT_PAGE_SIZE
+            filters: Dict with 'active_only' (default True) and 'search' (name or phone)
+            backward: Get the page before after_key (the last page when after_key is None)
+
+        Returns:
+            Dict with 'items' (Client list), 'total', 'has_more', 'first_key' and 'last_key'
+        """
+        conditions, params = Client._filter_conditions(filters)
+        db = get_db()
+        result = db.keyset_page(
+            'clients', ('name', 'id'), conditions, params,
+            after_key=after_key,
+            limit=limit or config_lowmem.CLIENT_PAGE_SIZE,
+            backward=backward
+        )
+        result['items'] = [Client._from_row(row) for row in result.pop('rows')]
+        return result
+
+    @staticmethod
+    def totals(filters=None):
+        """Count the clients matching filters and add up their credit limits"""
+        db = get_db()
+        conditions, params = Client._filter_conditions(filters)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        row = db.execute(
+            f"SELECT COUNT(*) as count, COALESCE(SUM(credit_limit), 0) as credit_limit FROM clients{where}",
+            params
+        ).fetchone()
+        return {'count': row['count'], 'credit_limit': row['credit_limit']}
+
     @staticmethod
     @cached_query()
     def get_by_id(client_id):
@@ -55,17 +114,7 @@ class Client:
         cursor = db.execute("SELECT * FROM clients WHERE id = ?", (client_id,))
         row = cursor.fetchone()
         if row:
-            return Client(
-                id=row['id'],
-                name=row['name'],
-                phone=row['phone'],
-                address=row['address'],
-                credit_limit=row['credit_limit'],
-                current_balance=row['current_balance'],
-                notes=row['notes'],
-                is_active=bool(row['is_active']),
-                created_at=row['created_at']
-            )
+            return Client._from_row(row)
         return None
 
     def save(self):
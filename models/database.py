@@ -1,9 +1,29 @@
 """
 Database connection and initialization module
 """
-import sqlite3
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import config
+import config_lowmem
+from utils.diagnostics import get_diagnostics
+from utils import spans
+from .db_workers import QueryResult, ReaderPool, WriterThread
+
+
+# Tables whose changes are recorded in change_log, with the id column logged
+CHANGE_TRACKED_TABLES = (
+    ('orders', 'id'),
+    ('order_items', 'order_id'),
+    ('registers', 'id'),
+)
+
+# Stamped into PRAGMA user_version by initialize_schema(); bump it whenever
+# initialize_schema() or _run_migrations() change, so existing databases
+# get the full schema check before they are used
+SCHEMA_VERSION = 1
 
 
 class Database:
@@ -11,34 +31,299 @@ class Database:
 
     def __init__(self, db_path=None):
         self.db_path = db_path or config.DATABASE_PATH
-        self.connection = None
+        self.connection = None  # Write connection, only used on the writer thread
+        self.writer = None
+        self.readers = None
+        self.tracer = None  # SQL workload recorder (utils/sql_trace.py), when enabled
+        self.diagnostics = get_diagnostics()  # Per-statement timings for Settings > Diagnostics
+        self.schema_checked = False  # Whether initialize_schema() ran in this process
 
     def connect(self):
-        """Establish database connection"""
-        self.connection = sqlite3.connect(self.db_path)
-        self.connection.row_factory = sqlite3.Row  # Access columns by name
+        """Start the writer thread and the read-only connection pool"""
+        if self.writer:
+            return self.connection
+        self.writer = WriterThread(self.db_path)
+        self.connection = self.writer.connection
+        if str(self.db_path) != ':memory:':
+            self.readers = ReaderPool(self.db_path, config_lowmem.DB_READER_CONNECTIONS)
+            if config_lowmem.SQL_TRACE_ENABLED:
+                from utils.sql_trace import SqlTracer
+                self.tracer = SqlTracer(Path(self.db_path).parent / "traces", db_name=Path(self.db_path).name)
         return self.connection
 
     def close(self):
-        """Close database connection"""
-        if self.connection:
-            self.connection.close()
+        """Close database connections"""
+        if self.readers:
+            self.readers.close_all()
+            self.readers = None
+        if self.writer:
+            self.writer.stop()
+            self.writer = None
+            self.connection = None
+        if self.tracer:
+            self.tracer.close()
+            self.tracer = None
 
     def execute(self, query, params=None):
-        """Execute a query and return cursor"""
-        if not self.connection:
+        """Execute a query and return cursor
+
+        Reads run on the calling thread's read-only connection. Writes, and
+        reads while a write transaction is open (so they see it), run on the
+        writer thread and return a QueryResult with the same cursor methods.
+        """
+        if not self.writer:
             self.connect()
-        cursor = self.connection.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        return cursor
+
+        start = time.perf_counter()
+        result = self._execute(query, params)
+        elapsed = time.perf_counter() - start
+        self.diagnostics.record_query(query, elapsed)
+        spans.record('Database.execute', elapsed)
+        if self.tracer:
+            self.tracer.record(query, params, elapsed)
+        return result
+
+    def _execute(self, query, params):
+        """Run a statement on a reader connection or the writer thread (see execute)"""
+        if self.readers and not self.writer.in_transaction and _is_read_query(query):
+            connection = self.readers.connection()
+            if connection is not None:
+                return _run_query(connection, query, params)
+
+        return self.writer.call(_run_write, query, params)
+
+    def submit_write(self, func, *args):
+        """Run func(connection, *args) on the writer thread; returns a Future
+
+        For background work that writes several statements as one unit;
+        func is responsible for committing.
+        """
+        if not self.writer:
+            self.connect()
+        return self.writer.submit(func, *args)
+
+    def iter_batches(self, query, params=None, batch_size=None):
+        """Execute a query and yield lists of at most batch_size rows via fetchmany
+
+        Keeps memory bounded for large result sets: only one batch of rows is
+        held at a time. batch_size defaults to config_lowmem.BATCH_SIZE.
+        """
+        batch_size = batch_size or config_lowmem.BATCH_SIZE
+        cursor = self.execute(query, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def iter_rows(self, query, params=None, batch_size=None):
+        """Execute a query and yield rows one by one, fetching them in batches"""
+        for rows in self.iter_batches(query, params, batch_size):
+            yield from rows
+
+    @property
+    def archive_dir(self):
+        """Directory holding the monthly order archives (see utils/archive.py)"""
+        return Path(self.db_path).parent / "archive"
+
+    def archive_path(self, month):
+        """Archive file for a month ('YYYY-MM')"""
+        return self.archive_dir / f"orders-{month}.db"
+
+    def archive_months(self, start_date=None, end_date=None):
+        """List archived months ('YYYY-MM', newest first) overlapping a YYYY/MM/DD date range"""
+        if not self.readers or not self.archive_dir.exists():
+            return []
+
+        first = start_date[:7].replace('/', '-') if start_date else None
+        last = end_date[:7].replace('/', '-') if end_date else None
+        months = []
+        for path in self.archive_dir.glob("orders-*.db"):
+            month = path.stem[len("orders-"):]
+            if (first is None or month >= first) and (last is None or month <= last):
+                months.append(month)
+        return sorted(months, reverse=True)
+
+    def iter_archived(self, query, params=None, start_date=None, end_date=None, batch_size=None):
+        """Run a query over live and archived orders, yielding lists of rows
+
+        The query names its tables {orders} and {order_items}; they are
+        replaced by the live table UNION ALL the archives of the months
+        overlapping the date range (every archive when no range is given).
+        Archives are attached read-only in groups of ARCHIVE_ATTACH_LIMIT,
+        newest first: a query ordered by date descending yields rows in
+        order, and an aggregate query yields one row per group for the
+        caller to add up.
+        """
+        months = self.archive_months(start_date, end_date)
+        if not months:
+            yield from self.iter_batches(
+                query.format(orders='orders', order_items='order_items'), params, batch_size
+            )
+            return
+
+        batch_size = batch_size or config_lowmem.BATCH_SIZE
+        group_size = config_lowmem.ARCHIVE_ATTACH_LIMIT
+        # Nested archive queries (e.g. loading items while streaming orders) get their
+        # own connection, since the thread's connection already has archives attached
+        connection = self.readers.connection()
+        temporary = connection is None or len(connection.execute("PRAGMA database_list").fetchall()) > 1
+        if temporary:
+            connection = self.readers.open_connection()
+
+        try:
+            for start in range(0, len(months), group_size):
+                aliases = []
+                try:
+                    for month in months[start:start + group_size]:
+                        alias = f"archive_{next(_archive_aliases)}"
+                        uri = f"{self.archive_path(month).resolve().as_uri()}?mode=ro"
+                        connection.execute(f"ATTACH DATABASE ? AS {alias}", (uri,))
+                        aliases.append(alias)
+
+                    # Live rows are only read with the first (newest) group
+                    tables = {
+                        table: _union_source(connection, table, aliases, include_live=start == 0)
+                        for table in ('orders', 'order_items')
+                    }
+                    cursor = _run_query(connection, query.format(**tables), params)
+                    try:
+                        while True:
+                            rows = cursor.fetchmany(batch_size)
+                            if not rows:
+                                break
+                            yield rows
+                    finally:
+                        cursor.close()
+                finally:
+                    for alias in aliases:
+                        connection.execute(f"DETACH DATABASE {alias}")
+        finally:
+            if temporary:
+                connection.close()
+
+    def iter_archived_rows(self, query, params=None, start_date=None, end_date=None, batch_size=None):
+        """Row-by-row variant of iter_archived"""
+        for rows in self.iter_archived(query, params, start_date, end_date, batch_size):
+            yield from rows
+
+    def keyset_page(self, table, key_columns, conditions=None, params=(), descending=False,
+                    after_key=None, limit=None, backward=False):
+        """Fetch one page of a table using keyset pagination
+
+        Rows are ordered by key_columns (all ascending or all descending) and
+        the page starts right after after_key, so SQLite seeks through the
+        index instead of skipping OFFSET rows. With backward=True the page
+        ends right before after_key (or is the last page when after_key is
+        None); rows are still returned in display order.
+
+        Args:
+            table: Table name
+            key_columns: Unique, indexed ordering columns, e.g. ('opened_at', 'id')
+            conditions: List of SQL predicates (joined with AND) for filtering
+            params: Parameters for the predicates
+            descending: Display order of the key columns
+            after_key: Key tuple of the row the page starts after (or ends before)
+            limit: Page size
+            backward: Walk towards the start of the ordering
+
+        Returns:
+            Dict with 'rows', 'total' (rows matching conditions), 'has_more'
+            (more rows in the walking direction), 'first_key' and 'last_key'
+        """
+        conditions = list(conditions or [])
+        params = tuple(params or ())
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        cursor = self.execute(f"SELECT COUNT(*) as count FROM {table}{where}", params)
+        total = cursor.fetchone()['count']
+
+        walk_descending = descending != backward
+        page_conditions = list(conditions)
+        page_params = params
+        if after_key is not None:
+            columns = ", ".join(key_columns)
+            placeholders = ", ".join("?" for _ in key_columns)
+            operator = "<" if walk_descending else ">"
+            page_conditions.append(f"({columns}) {operator} ({placeholders})")
+            page_params = params + tuple(after_key)
+
+        page_where = f" WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
+        direction = "DESC" if walk_descending else "ASC"
+        order_by = ", ".join(f"{column} {direction}" for column in key_columns)
+
+        cursor = self.execute(
+            f"SELECT * FROM {table}{page_where} ORDER BY {order_by} LIMIT ?",
+            page_params + (limit + 1,)
+        )
+        rows = cursor.fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backward:
+            rows.reverse()
+
+        return {
+            'rows': rows,
+            'total': total,
+            'has_more': has_more,
+            'first_key': tuple(rows[0][column] for column in key_columns) if rows else None,
+            'last_key': tuple(rows[-1][column] for column in key_columns) if rows else None,
+        }
+
+    def change_seq(self):
+        """Get the latest change sequence number (0 if nothing was logged yet)"""
+        cursor = self.execute("SELECT COALESCE(MAX(seq), 0) AS seq FROM change_log")
+        return cursor.fetchone()['seq']
+
+    def changes_since(self, seq, tables):
+        """Get the ids changed in each table after change sequence seq
+
+        Returns {'seq': latest_seq, 'tables': {table: set_of_ids}}, or None when
+        the change log no longer covers seq (pruned, or the database was
+        replaced) and the caller has to reload everything.
+        """
+        if seq is None:
+            return None
+
+        cursor = self.execute("SELECT MIN(seq) AS first_seq, MAX(seq) AS last_seq FROM change_log")
+        bounds = cursor.fetchone()
+        last_seq = bounds['last_seq'] or 0
+        if seq > last_seq or (bounds['first_seq'] is not None and seq < bounds['first_seq'] - 1):
+            return None
+
+        changed = {table: set() for table in tables}
+        placeholders = ', '.join('?' * len(tables))
+        for row in self.iter_rows(
+            f"SELECT table_name, row_id FROM change_log WHERE seq > ? AND table_name IN ({placeholders})",
+            (seq, *tables)
+        ):
+            changed[row['table_name']].add(row['row_id'])
+
+        return {'seq': last_seq, 'tables': changed}
+
+    def prune_change_log(self, keep_rows=None):
+        """Delete the oldest change log entries, keeping the latest keep_rows"""
+        keep_rows = keep_rows or config_lowmem.CHANGE_LOG_MAX_ROWS
+        self.execute(
+            "DELETE FROM change_log WHERE seq <= (SELECT MAX(seq) FROM change_log) - ?",
+            (keep_rows,)
+        )
+        self.commit()
 
     def commit(self):
         """Commit transaction"""
-        if self.connection:
-            self.connection.commit()
+        if self.writer:
+            start = time.perf_counter()
+            self.writer.call(_commit)
+            elapsed = time.perf_counter() - start
+            self.diagnostics.record_query("COMMIT", elapsed)
+            spans.record('Database.commit', elapsed)
+            if self.tracer:
+                self.tracer.record("COMMIT", None, elapsed)
 
     def initialize_schema(self):
         """Create all database tables"""
@@ -205,6 +490,15 @@ class Database:
         self.execute("CREATE INDEX IF NOT EXISTS idx_clients_name ON clients(name)")
         self.execute("CREATE INDEX IF NOT EXISTS idx_clients_active ON clients(is_active)")
 
+        # Create indexes backing keyset pagination (see keyset_page)
+        self.execute("CREATE INDEX IF NOT EXISTS idx_registers_opened_at ON registers(opened_at)")
+        self.execute("CREATE INDEX IF NOT EXISTS idx_orders_date_time ON orders(order_date, order_time)")
+        self.execute("CREATE INDEX IF NOT EXISTS idx_orders_register ON orders(register_id, order_date, order_time)")
+        self.execute("CREATE INDEX IF NOT EXISTS idx_employees_name ON employees(name)")
+
+        # Checkout journal entries are applied at most once (see utils/checkout_journal.py)
+        self.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_journal_id ON orders(journal_id)")
+
         # Topping groups table (e.g., "Meat", "Sauces", "Pasta Type")
         self.execute("""
             CREATE TABLE IF NOT EXISTS topping_groups (
@@ -261,11 +555,43 @@ class Database:
         self.execute("CREATE INDEX IF NOT EXISTS idx_category_toppings_category ON category_topping_groups(category_id)")
         self.execute("CREATE INDEX IF NOT EXISTS idx_product_toppings_product ON product_topping_groups(product_id)")
 
+        # Change log for delta refresh (see changes_since)
+        self.execute("""
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                op TEXT NOT NULL
+            )
+        """)
+
+        # order_items changes are logged against their order_id so views can refetch the order
+        for table, id_column in CHANGE_TRACKED_TABLES:
+            for op, ref in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+                self.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_{op.lower()}_log
+                    AFTER {op} ON {table}
+                    BEGIN
+                        INSERT INTO change_log (table_name, row_id, op)
+                        VALUES ('{table}', {ref}.{id_column}, '{op[0]}');
+                    END
+                """)
+
         self.commit()
 
+        # Keep the change log bounded
+        self.prune_change_log()
+
         # Initialize default settings
         self._initialize_default_settings()
 
+        self.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.schema_checked = True
+
+    def schema_version(self):
+        """Schema version stamped in the database file (0 if never initialized)"""
+        return self.execute("PRAGMA user_version").fetchone()[0]
+
     def _run_migrations(self):
         """Run database migrations for schema updates"""
         # Check if register_id column exists in orders table
@@ -301,12 +627,8 @@ class Database:
             if 'day_off_date' in columns and 'start_date' not in columns:
                 print("Migration: Converting employee_days_off from single day to date range...")
 
-                # Get all existing days off
-                cursor = self.execute("SELECT * FROM employee_days_off")
-                old_data = cursor.fetchall()
-
-                # Drop the old table
-                self.execute("DROP TABLE employee_days_off")
+                # Keep the old table aside so rows can be copied without loading them into memory
+                self.execute("ALTER TABLE employee_days_off RENAME TO employee_days_off_old")
 
                 # Recreate with new schema
                 self.execute("""
@@ -323,13 +645,15 @@ class Database:
                 """)
 
                 # Migrate old data (single day becomes start_date = end_date)
-                for row in old_data:
-                    self.execute(
-                        """INSERT INTO employee_days_off (employee_id, start_date, end_date, reason, added_by, created_at)
-                           VALUES (?, ?, ?, ?, ?, ?)""",
-                        (row['employee_id'], row['day_off_date'], row['day_off_date'],
-                         row['reason'], row['added_by'], row['created_at'])
-                    )
+                cursor = self.execute(
+                    """INSERT INTO employee_days_off (employee_id, start_date, end_date, reason, added_by, created_at)
+                       SELECT employee_id, day_off_date, day_off_date, reason, added_by, created_at
+                       FROM employee_days_off_old"""
+                )
+                migrated_count = cursor.rowcount
+
+                # Drop the old table (its indexes go with it)
+                self.execute("DROP TABLE employee_days_off_old")
 
                 # Recreate indexes
                 self.execute("CREATE INDEX IF NOT EXISTS idx_employee_days_off_employee ON employee_days_off(employee_id)")
@@ -337,7 +661,7 @@ class Database:
                 self.execute("CREATE INDEX IF NOT EXISTS idx_employee_days_off_end_date ON employee_days_off(end_date)")
 
                 self.commit()
-                print(f"Migration: Migrated {len(old_data)} days off records to date range format")
+                print(f"Migration: Migrated {migrated_count} days off records to date range format")
         except Exception as e:
             print(f"Migration error for employee_days_off: {e}")
 
@@ -362,6 +686,10 @@ class Database:
                 self.execute("ALTER TABLE orders ADD COLUMN reprint_count INTEGER DEFAULT 0")
                 print("Migration: Added reprint_count column to orders table")
 
+            if 'journal_id' not in columns:
+                self.execute("ALTER TABLE orders ADD COLUMN journal_id TEXT")
+                print("Migration: Added journal_id column to orders table")
+
             self.commit()
         except Exception as e:
             print(f"Migration error for orders table: {e}")
@@ -381,13 +709,90 @@ class Database:
             self.commit()
 
 
+def like_pattern(text):
+    """Build a LIKE pattern matching text anywhere; use with ESCAPE '\\'"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def _is_read_query(query):
+    """Whether a statement only reads (safe for a read-only connection)"""
+    statement = query.lstrip()[:6].upper()
+    return statement == 'SELECT' or (statement == 'PRAGMA' and '=' not in query)
+
+
+def _run_query(connection, query, params):
+    """Execute a query on connection and return the cursor"""
+    cursor = connection.cursor()
+    if params:
+        cursor.execute(query, params)
+    else:
+        cursor.execute(query)
+    return cursor
+
+
+def _run_write(connection, query, params):
+    """Execute a statement on the writer thread and materialize its result"""
+    return QueryResult(_run_query(connection, query, params))
+
+
+def _commit(connection):
+    """Commit the write connection"""
+    connection.commit()
+
+
+_archive_aliases = itertools.count()  # Unique ATTACH names, so archive queries can nest
+
+
+def _union_source(connection, table, aliases, include_live):
+    """SQL subquery combining a table's live rows with its copies in attached archives"""
+    columns = [row[1] for row in connection.execute(f"PRAGMA main.table_info({table})")]
+    parts = []
+    if include_live:
+        parts.append(f"SELECT {', '.join(columns)} FROM main.{table}")
+    for alias in aliases:
+        # Archives made before a column was added read it as NULL
+        archived = {row[1] for row in connection.execute(f"PRAGMA {alias}.table_info({table})")}
+        selected = ', '.join(column if column in archived else f"NULL AS {column}" for column in columns)
+        parts.append(f"SELECT {selected} FROM {alias}.{table}")
+    return f"({' UNION ALL '.join(parts)})"
+
+
 # Singleton instance
 _db_instance = None
+_db_lock = threading.Lock()
+
+def get_db(defer_schema_check=False):
+    """Get database singleton instance
 
-def get_db():
-    """Get database singleton instance"""
+    With defer_schema_check, a database already stamped with the current
+    SCHEMA_VERSION is opened without running initialize_schema(); the
+    caller runs it later (main.py does so after the window is painted).
+    """
     global _db_instance
-    if _db_instance is None:
-        _db_instance = Database()
-        _db_instance.initialize_schema()
+    with _db_lock:
+        if _db_instance is None:
+            _db_instance = Database()
+            if not (defer_schema_check and _db_instance.schema_version() == SCHEMA_VERSION):
+                _db_instance.initialize_schema()
     return _db_instance
+
+
+# Background executor for the *_async model variants
+_executor = None
+
+
+def run_async(func, *args, **kwargs):
+    """Run a (model) function on a background thread and return a Future
+
+    Reads in the background use that thread's own read-only connection and
+    writes go through the writer thread, so any model method can be used.
+    """
+    global _executor
+    with _db_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=config_lowmem.DB_BACKGROUND_WORKERS,
+                thread_name_prefix='db-background'
+            )
+    return _executor.submit(func, *args, **kwargs)
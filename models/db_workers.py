@@ -0,0 +1,179 @@
+"""
+Database worker threads: a single writer thread and a pool of read-only connections
+"""
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+
+
+class QueryResult:
+    """Rows and metadata of a statement run on the writer thread
+
+    Behaves like a fetched cursor so callers of Database.execute() can use
+    fetchone/fetchall/lastrowid/rowcount whichever connection ran the query.
+    """
+
+    def __init__(self, cursor):
+        self.rows = cursor.fetchall()
+        self.lastrowid = cursor.lastrowid
+        self.rowcount = cursor.rowcount
+        self.description = cursor.description
+        self._position = 0
+        cursor.close()
+
+    def fetchone(self):
+        """Get next row or None"""
+        if self._position >= len(self.rows):
+            return None
+        row = self.rows[self._position]
+        self._position += 1
+        return row
+
+    def fetchmany(self, size=1):
+        """Get up to size next rows"""
+        rows = self.rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def fetchall(self):
+        """Get all remaining rows"""
+        rows = self.rows[self._position:]
+        self._position = len(self.rows)
+        return rows
+
+    def close(self):
+        """Release rows"""
+        self.rows = []
+        self._position = 0
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+
+class WriterThread:
+    """Owns the write connection and runs submitted work on it one task at a time"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.connection = None
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+
+    def _run(self):
+        """Writer loop: open the connection, then run tasks until stopped"""
+        try:
+            self.connection = sqlite3.connect(self.db_path, timeout=30)
+            self.connection.row_factory = sqlite3.Row  # Access columns by name
+            if str(self.db_path) != ':memory:':
+                # WAL lets the read-only connections query while a write is in progress
+                self.connection.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.Error as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        while True:
+            task = self._queue.get()
+            if task is None:
+                break
+            func, args, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(self.connection, *args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        self.connection.close()
+
+    @property
+    def in_transaction(self):
+        """Whether the write connection has uncommitted changes"""
+        return self.connection is not None and self.connection.in_transaction
+
+    def submit(self, func, *args):
+        """Queue func(connection, *args) on the writer thread and return a Future"""
+        future = Future()
+        self._queue.put((func, args, future))
+        return future
+
+    def pending(self):
+        """Number of tasks waiting for the writer thread"""
+        return self._queue.qsize()
+
+    def call(self, func, *args):
+        """Run func(connection, *args) on the writer thread and wait for its result"""
+        if threading.current_thread() is self._thread:
+            return func(self.connection, *args)
+        return self.submit(func, *args).result()
+
+    def stop(self):
+        """Finish queued work and close the write connection"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+class ReaderPool:
+    """Read-only connections, one per thread, at most size at a time
+
+    A connection is released when the pool is full and the thread that
+    opened it has ended, so short-lived threads (archiving, backups) do not
+    use up the pool.
+    """
+
+    def __init__(self, db_path, size):
+        self.uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self.size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = {}  # Connection -> thread that uses it
+
+    def open_connection(self):
+        """Open a standalone read-only connection (not managed by the pool)"""
+        # check_same_thread is off only so close_all() can run from another thread
+        connection = sqlite3.connect(self.uri, uri=True, timeout=30, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def connection(self):
+        """Get the calling thread's read-only connection, or None if the pool is full"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            with self._lock:
+                if len(self._connections) >= self.size:
+                    self._release_finished()
+                if len(self._connections) >= self.size:
+                    return None
+                connection = self.open_connection()
+                self._connections[connection] = threading.current_thread()
+            self._local.connection = connection
+        return connection
+
+    def _release_finished(self):
+        """Close the connections of threads that have ended (called with the lock held)"""
+        for connection, thread in list(self._connections.items()):
+            if not thread.is_alive():
+                connection.close()
+                del self._connections[connection]
+
+    def close_all(self):
+        """Close every reader connection"""
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = {}
+        self._local = threading.local()
@@ -2,7 +2,8 @@
 Employee model for managing employees and their expenses
 """
 from datetime import datetime
-from .database import get_db
+from .database import get_db, like_pattern
+import config_lowmem
 from utils.cache import cached_query, invalidate_cache
 
 
@@ -35,6 +36,49 @@ class Employee:
             ))
         return employees
 
+    @staticmethod
+    def page(after_key=None, limit=None, filters=None, backward=False):
+        """Get one page of employees ordered by name using keyset pagination
+
+        Args:
+            after_key: 'last_key' of the previous page (or 'first_key' with backward=True)
+            limit: Page size, defaults to config_lowmem.EMPLOYEE_PAGE_SIZE
+            filters: Dict with 'active_only' (default False) and 'search' (name)
+            backward: Get the page before after_key (the last page when after_key is None)
+
+        Returns:
+            Dict with 'items' (Employee list), 'total', 'has_more', 'first_key' and 'last_key'
+        """
+        filters = filters or {}
+        conditions = []
+        params = []
+
+        if filters.get('active_only', False):
+            conditions.append("is_active = 1")
+
+        search = (filters.get('search') or '').strip()
+        if search:
+            conditions.append("name LIKE ? ESCAPE '\\'")
+            params.append(like_pattern(search))
+
+        db = get_db()
+        result = db.keyset_page(
+            'employees', ('name', 'id'), conditions, params,
+            after_key=after_key,
+            limit=limit or config_lowmem.EMPLOYEE_PAGE_SIZE,
+            backward=backward
+        )
+        result['items'] = [
+            Employee(
+                id=row['id'],
+                name=row['name'],
+                daily_salary=row['daily_salary'],
+                is_active=bool(row['is_active'])
+            )
+            for row in result.pop('rows')
+        ]
+        return result
+
     @staticmethod
     @cached_query()
     def get_by_id(employee_id):
@@ -151,15 +195,7 @@ class Employee:
 
         expenses = []
         for row in cursor.fetchall():
-            expenses.append(EmployeeExpense(
-                id=row['id'],
-                employee_id=row['employee_id'],
-                amount=row['amount'],
-                description=row['description'],
-                expense_date=row['expense_date'],
-                expense_time=row['expense_time'],
-                added_by=row['added_by']
-            ))
+            expenses.append(EmployeeExpense._from_row(row))
         return expenses
 
     def get_days_off(self, start_date=None, end_date=None):
@@ -281,6 +317,19 @@ class EmployeeExpense:
         self.expense_time = expense_time
         self.added_by = added_by
 
+    @staticmethod
+    def _from_row(row):
+        """Build an EmployeeExpense from an employee_expenses row"""
+        return EmployeeExpense(
+            id=row['id'],
+            employee_id=row['employee_id'],
+            amount=row['amount'],
+            description=row['description'],
+            expense_date=row['expense_date'],
+            expense_time=row['expense_time'],
+            added_by=row['added_by']
+        )
+
     @staticmethod
     @cached_query()
     def get_all(start_date=None, end_date=None):
@@ -296,15 +345,7 @@ class EmployeeExpense:
 
         expenses = []
         for row in cursor.fetchall():
-            expenses.append(EmployeeExpense(
-                id=row['id'],
-                employee_id=row['employee_id'],
-                amount=row['amount'],
-                description=row['description'],
-                expense_date=row['expense_date'],
-                expense_time=row['expense_time'],
-                added_by=row['added_by']
-            ))
+            expenses.append(EmployeeExpense._from_row(row))
         return expenses
 
     def save(self):
@@ -2,8 +2,10 @@
 Order model for managing sales transactions
 """
 from datetime import datetime
-from .database import get_db
+from .database import get_db, like_pattern, run_async
+import config_lowmem
 from utils.cache import cached_query, invalidate_cache
+from utils.spans import timed
 
 
 class OrderItem:
@@ -25,6 +27,24 @@ class OrderItem:
         self.final_price = (self.unit_price - self.discount) * self.quantity
         return self.final_price
 
+    @staticmethod
+    def _from_row(row):
+        """Build an OrderItem from an order_items row (with optional category_name)"""
+        item = OrderItem(
+            id=row['id'],
+            order_id=row['order_id'],
+            product_name=row['product_name'],
+            quantity=row['quantity'],
+            unit_price=row['unit_price'],
+            discount=row['discount'],
+            final_price=row['final_price'],
+            notes=row['notes']
+        )
+        # Add category name as attribute for printing
+        if 'category_name' in row.keys():
+            item.category_name = row['category_name'] if row['category_name'] else ''
+        return item
+
 
 class Order:
     """Represents a customer order"""
@@ -50,6 +70,28 @@ class Order:
         self.items = []
 
     @staticmethod
+    def _from_row(row):
+        """Build an Order from an orders table row"""
+        keys = row.keys()
+        return Order(
+            id=row['id'],
+            order_number=row['order_number'],
+            order_date=row['order_date'],
+            order_time=row['order_time'],
+            total_amount=row['total_amount'],
+            is_delivery=bool(row['is_delivery']),
+            delivery_address=row['delivery_address'],
+            delivery_phone=row['delivery_phone'],
+            delivery_price=row['delivery_price'],
+            register_id=row['register_id'] if 'register_id' in keys else None,
+            client_id=row['client_id'] if 'client_id' in keys else None,
+            is_paid=bool(row['is_paid']) if 'is_paid' in keys else True,
+            price_modified=bool(row['price_modified']) if 'price_modified' in keys else False,
+            reprint_count=row['reprint_count'] if 'reprint_count' in keys else 0
+        )
+
+    @staticmethod
+    @timed()
     def get_next_order_number():
         """Get the next order number from the current register"""
         from .register import Register
@@ -61,100 +103,218 @@ class Order:
         return current_register.get_next_order_number()
 
     @staticmethod
+    @timed()
     @cached_query()
-    def get_all(start_date=None, end_date=None, load_items=False):
-        """Get all orders, optionally filtered by date range"""
+    def get_all(start_date=None, end_date=None, load_items=None):
+        """Get all orders, optionally filtered by date range (archived months included)
+
+        Items are loaded when load_items is True, or by default when
+        config_lowmem.LAZY_LOAD_ORDER_ITEMS is off.
+        """
+        if load_items is None:
+            load_items = not config_lowmem.LAZY_LOAD_ORDER_ITEMS
         db = get_db()
         if start_date and end_date:
-            cursor = db.execute(
-                "SELECT * FROM orders WHERE order_date BETWEEN ? AND ? ORDER BY order_date DESC, order_time DESC",
-                (start_date, end_date)
+            rows = db.iter_archived_rows(
+                "SELECT * FROM {orders} WHERE order_date BETWEEN ? AND ? ORDER BY order_date DESC, order_time DESC",
+                (start_date, end_date),
+                start_date, end_date
             )
         else:
-            cursor = db.execute("SELECT * FROM orders ORDER BY order_date DESC, order_time DESC")
+            rows = db.iter_archived_rows("SELECT * FROM {orders} ORDER BY order_date DESC, order_time DESC")
 
-        orders = []
+        orders = [Order._from_row(row) for row in rows]
+        if load_items:
+            Order.load_items_for(orders)
+        return orders
+
+    @staticmethod
+    @timed()
+    def load_items_for(orders):
+        """Load items for several orders with a single query"""
+        by_id = {order.id: order for order in orders if order.id}
+        if not by_id:
+            return
+
+        for order in by_id.values():
+            order.items = []
+
+        db = get_db()
+        placeholders = ", ".join("?" for _ in by_id)
+        cursor = db.execute(f"""
+            SELECT oi.*,
+                   c.name as category_name
+            FROM order_items oi
+            LEFT JOIN products p ON oi.product_name = p.name
+            LEFT JOIN categories c ON p.category_id = c.id
+            WHERE oi.order_id IN ({placeholders})
+            ORDER BY oi.id
+        """, tuple(by_id))
         for row in cursor.fetchall():
-            order = Order(
-                id=row['id'],
-                order_number=row['order_number'],
-                order_date=row['order_date'],
-                order_time=row['order_time'],
-                total_amount=row['total_amount'],
-                is_delivery=bool(row['is_delivery']),
-                delivery_address=row['delivery_address'],
-                delivery_phone=row['delivery_phone'],
-                delivery_price=row['delivery_price'],
-                register_id=row['register_id'] if 'register_id' in row.keys() else None,
-                client_id=row['client_id'] if 'client_id' in row.keys() else None,
-                is_paid=bool(row['is_paid']) if 'is_paid' in row.keys() else True,
-                price_modified=bool(row['price_modified']) if 'price_modified' in row.keys() else False,
-                reprint_count=row['reprint_count'] if 'reprint_count' in row.keys() else 0
+            by_id[row['order_id']].items.append(OrderItem._from_row(row))
+
+        # Orders moved to a monthly archive have their items there too
+        archived = [order for order in by_id.values() if not order.items and order.order_date]
+        if archived and db.archive_months():
+            dates = [order.order_date for order in archived]
+            placeholders = ", ".join("?" for _ in archived)
+            for row in db.iter_archived_rows(f"""
+                SELECT oi.*,
+                       c.name as category_name
+                FROM {{order_items}} oi
+                LEFT JOIN products p ON oi.product_name = p.name
+                LEFT JOIN categories c ON p.category_id = c.id
+                WHERE oi.order_id IN ({placeholders})
+                ORDER BY oi.id
+            """, tuple(order.id for order in archived), min(dates), max(dates)):
+                by_id[row['order_id']].items.append(OrderItem._from_row(row))
+
+    @staticmethod
+    def _filter_conditions(filters):
+        """Translate a filters dict into SQL predicates and parameters
+
+        Supported filters:
+            register_id: Only orders of this register
+            start_date, end_date: Order date range (YYYY/MM/DD, inclusive)
+            search: Text matched against the order number or any item's product name
+        """
+        filters = filters or {}
+        conditions = []
+        params = []
+
+        if filters.get('register_id') is not None:
+            conditions.append("register_id = ?")
+            params.append(filters['register_id'])
+
+        if filters.get('start_date') and filters.get('end_date'):
+            conditions.append("order_date BETWEEN ? AND ?")
+            params.extend([filters['start_date'], filters['end_date']])
+
+        search = (filters.get('search') or '').strip()
+        if search:
+            pattern = like_pattern(search)
+            conditions.append(
+                "(CAST(order_number AS TEXT) LIKE ? ESCAPE '\\' OR EXISTS ("
+                "SELECT 1 FROM order_items oi WHERE oi.order_id = orders.id "
+                "AND oi.product_name LIKE ? ESCAPE '\\'))"
             )
-            # Only load items if explicitly requested (saves memory)
-            if load_items:
-                order.load_items()
-            orders.append(order)
-        return orders
+            params.extend([pattern, pattern])
+
+        return conditions, params
+
+    @staticmethod
+    @timed()
+    def page(after_key=None, limit=None, filters=None, backward=False, load_items=False):
+        """Get one page of orders, newest first, using keyset pagination
+
+        Args:
+            after_key: 'last_key' of the previous page (or 'first_key' with backward=True)
+            limit: Page size, defaults to config_lowmem.HISTORY_PAGE_SIZE
+            filters: See _filter_conditions
+            backward: Get the page before after_key (the last page when after_key is None)
+            load_items: Also load the items of the orders on this page
+
+        Returns:
+            Dict with 'items' (Order list), 'total', 'has_more', 'first_key' and 'last_key'
+        """
+        db = get_db()
+        conditions, params = Order._filter_conditions(filters)
+        result = db.keyset_page(
+            'orders', ('order_date', 'order_time', 'id'), conditions, params,
+            descending=True,
+            after_key=after_key,
+            limit=limit or config_lowmem.HISTORY_PAGE_SIZE,
+            backward=backward
+        )
+        orders = [Order._from_row(row) for row in result.pop('rows')]
+        if load_items:
+            Order.load_items_for(orders)
+        result['items'] = orders
+        return result
 
     @staticmethod
+    @timed()
+    def totals(filters=None):
+        """Count the orders matching filters (see _filter_conditions), their deliveries and items sold"""
+        db = get_db()
+        conditions, params = Order._filter_conditions(filters)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        row = db.execute(f"""
+            SELECT COUNT(*) as orders,
+                   COALESCE(SUM(is_delivery), 0) as delivery_orders,
+                   COALESCE(SUM((SELECT SUM(quantity) FROM order_items WHERE order_id = orders.id)), 0) as items
+            FROM orders{where}
+        """, params).fetchone()
+        return {'orders': row['orders'], 'delivery_orders': row['delivery_orders'], 'items': row['items']}
+
+    @staticmethod
+    def page_async(after_key=None, limit=None, filters=None, backward=False, load_items=False):
+        """Background variant of page(); returns a Future"""
+        return run_async(Order.page, after_key, limit, filters, backward, load_items)
+
+    @staticmethod
+    @timed()
     @cached_query()
     def get_by_register(register_id, load_items=True):
-        """Get all orders for a specific register"""
+        """Get all orders for a specific register (archived months included)"""
         db = get_db()
-        cursor = db.execute(
-            "SELECT * FROM orders WHERE register_id = ? ORDER BY order_date DESC, order_time DESC",
-            (register_id,)
+        # Closed registers' orders may have been moved to monthly archives
+        register = db.execute(
+            "SELECT opened_at, closed_at FROM registers WHERE id = ?", (register_id,)
+        ).fetchone()
+        start_date = register['opened_at'][:10] if register and register['opened_at'] else None
+        end_date = register['closed_at'][:10] if register and register['closed_at'] else None
+        rows = db.iter_archived_rows(
+            "SELECT * FROM {orders} WHERE register_id = ? ORDER BY order_date DESC, order_time DESC",
+            (register_id,), start_date, end_date
         )
 
+        orders = [Order._from_row(row) for row in rows]
+        # Load order items only if requested
+        if load_items:
+            Order.load_items_for(orders)
+        return orders
+
+    @staticmethod
+    def get_by_register_async(register_id, load_items=True):
+        """Background variant of get_by_register(); returns a Future"""
+        return run_async(Order.get_by_register, register_id, load_items)
+
+    @staticmethod
+    @timed()
+    def get_by_ids(order_ids, register_id=None, load_items=True):
+        """Get the orders with the given IDs (missing ones are skipped), optionally of one register"""
+        order_ids = list(order_ids)
+        db = get_db()
         orders = []
-        for row in cursor.fetchall():
-            order = Order(
-                id=row['id'],
-                order_number=row['order_number'],
-                order_date=row['order_date'],
-                order_time=row['order_time'],
-                total_amount=row['total_amount'],
-                is_delivery=bool(row['is_delivery']),
-                delivery_address=row['delivery_address'],
-                delivery_phone=row['delivery_phone'],
-                delivery_price=row['delivery_price'],
-                register_id=row['register_id'],
-                client_id=row['client_id'] if 'client_id' in row.keys() else None,
-                is_paid=bool(row['is_paid']) if 'is_paid' in row.keys() else True,
-                price_modified=bool(row['price_modified']) if 'price_modified' in row.keys() else False,
-                reprint_count=row['reprint_count'] if 'reprint_count' in row.keys() else 0
-            )
-            # Load order items only if requested
+        for start in range(0, len(order_ids), config_lowmem.BATCH_SIZE):
+            chunk = order_ids[start:start + config_lowmem.BATCH_SIZE]
+            conditions = [f"id IN ({', '.join('?' for _ in chunk)})"]
+            params = list(chunk)
+            if register_id is not None:
+                conditions.append("register_id = ?")
+                params.append(register_id)
+            cursor = db.execute(f"SELECT * FROM orders WHERE {' AND '.join(conditions)}", params)
+            batch = [Order._from_row(row) for row in cursor.fetchall()]
             if load_items:
-                order.load_items()
-            orders.append(order)
+                Order.load_items_for(batch)
+            orders.extend(batch)
         return orders
 
     @staticmethod
+    @timed()
     @cached_query()
     def get_by_id(order_id):
-        """Get order by ID"""
+        """Get order by ID (archived months included)"""
         db = get_db()
         cursor = db.execute("SELECT * FROM orders WHERE id = ?", (order_id,))
         row = cursor.fetchone()
+        if row is None and db.archive_months():
+            # The order may have been moved to a monthly archive
+            rows = list(db.iter_archived_rows("SELECT * FROM {orders} WHERE id = ?", (order_id,)))
+            row = rows[0] if rows else None
         if row:
-            order = Order(
-                id=row['id'],
-                order_number=row['order_number'],
-                order_date=row['order_date'],
-                order_time=row['order_time'],
-                total_amount=row['total_amount'],
-                is_delivery=bool(row['is_delivery']),
-                delivery_address=row['delivery_address'],
-                delivery_phone=row['delivery_phone'],
-                delivery_price=row['delivery_price'],
-                register_id=row['register_id'] if 'register_id' in row.keys() else None,
-                client_id=row['client_id'] if 'client_id' in row.keys() else None,
-                is_paid=bool(row['is_paid']) if 'is_paid' in row.keys() else True,
-                price_modified=bool(row['price_modified']) if 'price_modified' in row.keys() else False,
-                reprint_count=row['reprint_count'] if 'reprint_count' in row.keys() else 0
-            )
+            order = Order._from_row(row)
             order.load_items()
             return order
         return None
@@ -230,33 +390,11 @@ class Order:
 
         return self
 
+    @timed()
     def load_items(self):
-        """Load order items from database"""
+        """Load order items from database (or the order's monthly archive)"""
         if self.id:
-            db = get_db()
-            cursor = db.execute("""
-                SELECT oi.*,
-                       c.name as category_name
-                FROM order_items oi
-                LEFT JOIN products p ON oi.product_name = p.name
-                LEFT JOIN categories c ON p.category_id = c.id
-                WHERE oi.order_id = ?
-            """, (self.id,))
-            self.items = []
-            for row in cursor.fetchall():
-                item = OrderItem(
-                    id=row['id'],
-                    order_id=row['order_id'],
-                    product_name=row['product_name'],
-                    quantity=row['quantity'],
-                    unit_price=row['unit_price'],
-                    discount=row['discount'],
-                    final_price=row['final_price'],
-                    notes=row['notes']
-                )
-                # Add category name as attribute for printing
-                item.category_name = row['category_name'] if row['category_name'] else ''
-                self.items.append(item)
+            Order.load_items_for([self])
 
     def delete(self):
         """Delete order and its items from database"""
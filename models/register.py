@@ -2,7 +2,9 @@
 Register model for managing shift sessions
 """
 from datetime import datetime
-from .database import get_db
+from .database import get_db, like_pattern, run_async
+import config_lowmem
+from utils.spans import timed
 
 
 class Register:
@@ -23,6 +25,23 @@ class Register:
         self.last_order_number = last_order_number
 
     @staticmethod
+    def _from_row(row):
+        """Build a Register from a registers table row"""
+        return Register(
+            id=row['id'],
+            shift_type=row['shift_type'],
+            employee_name=row['employee_name'],
+            opening_amount=row['opening_amount'],
+            closing_amount=row['closing_amount'],
+            opened_at=row['opened_at'],
+            closed_at=row['closed_at'],
+            is_open=bool(row['is_open']),
+            notes=row['notes'],
+            last_order_number=row['last_order_number'] if 'last_order_number' in row.keys() else 0
+        )
+
+    @staticmethod
+    @timed()
     def get_current_register():
         """Get the currently open register"""
         db = get_db()
@@ -31,21 +50,11 @@ class Register:
         )
         row = cursor.fetchone()
         if row:
-            return Register(
-                id=row['id'],
-                shift_type=row['shift_type'],
-                employee_name=row['employee_name'],
-                opening_amount=row['opening_amount'],
-                closing_amount=row['closing_amount'],
-                opened_at=row['opened_at'],
-                closed_at=row['closed_at'],
-                is_open=bool(row['is_open']),
-                notes=row['notes'],
-                last_order_number=row['last_order_number'] if 'last_order_number' in row.keys() else 0
-            )
+            return Register._from_row(row)
         return None
 
     @staticmethod
+    @timed()
     def get_all(limit=None):
         """Get all registers"""
         db = get_db()
@@ -56,41 +65,115 @@ class Register:
         cursor = db.execute(query)
         registers = []
         for row in cursor.fetchall():
-            registers.append(Register(
-                id=row['id'],
-                shift_type=row['shift_type'],
-                employee_name=row['employee_name'],
-                opening_amount=row['opening_amount'],
-                closing_amount=row['closing_amount'],
-                opened_at=row['opened_at'],
-                closed_at=row['closed_at'],
-                is_open=bool(row['is_open']),
-                notes=row['notes'],
-                last_order_number=row['last_order_number'] if 'last_order_number' in row.keys() else 0
-            ))
+            registers.append(Register._from_row(row))
         return registers
 
     @staticmethod
+    def iter_all(filters=None, batch_size=None):
+        """Stream registers matching filters, newest first, in batches of config_lowmem.BATCH_SIZE"""
+        db = get_db()
+        conditions, params = Register._filter_conditions(filters)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        for row in db.iter_rows(
+            f"SELECT * FROM registers{where} ORDER BY opened_at DESC, id DESC",
+            params,
+            batch_size
+        ):
+            yield Register._from_row(row)
+
+    @staticmethod
+    def _filter_conditions(filters):
+        """Translate a filters dict into SQL predicates and parameters
+
+        Supported filters:
+            search: Text matched against employee name, shift type, opened and closed dates
+            is_open: Only open (True) or closed (False) registers
+        """
+        filters = filters or {}
+        conditions = []
+        params = []
+
+        search = (filters.get('search') or '').strip()
+        if search:
+            pattern = like_pattern(search)
+            conditions.append(
+                "(employee_name LIKE ? ESCAPE '\\' OR shift_type LIKE ? ESCAPE '\\' "
+                "OR opened_at LIKE ? ESCAPE '\\' OR closed_at LIKE ? ESCAPE '\\')"
+            )
+            params.extend([pattern] * 4)
+
+        if filters.get('is_open') is not None:
+            conditions.append("is_open = ?")
+            params.append(int(filters['is_open']))
+
+        return conditions, params
+
+    @staticmethod
+    @timed()
+    def page(after_key=None, limit=None, filters=None, backward=False):
+        """Get one page of registers, newest first, using keyset pagination
+
+        Args:
+            after_key: 'last_key' of the previous page (or 'first_key' with backward=True)
+            limit: Page size, defaults to config_lowmem.STATISTICS_PAGE_SIZE
+            filters: See _filter_conditions
+            backward: Get the page before after_key (the last page when after_key is None)
+
+        Returns:
+            Dict with 'items' (Register list), 'total', 'has_more', 'first_key' and 'last_key'
+        """
+        db = get_db()
+        conditions, params = Register._filter_conditions(filters)
+        result = db.keyset_page(
+            'registers', ('opened_at', 'id'), conditions, params,
+            descending=True,
+            after_key=after_key,
+            limit=limit or config_lowmem.STATISTICS_PAGE_SIZE,
+            backward=backward
+        )
+        result['items'] = [Register._from_row(row) for row in result.pop('rows')]
+        return result
+
+    @staticmethod
+    def page_async(after_key=None, limit=None, filters=None, backward=False):
+        """Background variant of page(); returns a Future"""
+        return run_async(Register.page, after_key, limit, filters, backward)
+
+    @staticmethod
+    @timed()
+    def count(filters=None):
+        """Count registers matching filters"""
+        db = get_db()
+        conditions, params = Register._filter_conditions(filters)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = db.execute(f"SELECT COUNT(*) as count FROM registers{where}", params)
+        return cursor.fetchone()['count']
+
+    @staticmethod
+    @timed()
     def get_by_id(register_id):
         """Get register by ID"""
         db = get_db()
         cursor = db.execute("SELECT * FROM registers WHERE id = ?", (register_id,))
         row = cursor.fetchone()
         if row:
-            return Register(
-                id=row['id'],
-                shift_type=row['shift_type'],
-                employee_name=row['employee_name'],
-                opening_amount=row['opening_amount'],
-                closing_amount=row['closing_amount'],
-                opened_at=row['opened_at'],
-                closed_at=row['closed_at'],
-                is_open=bool(row['is_open']),
-                notes=row['notes'],
-                last_order_number=row['last_order_number'] if 'last_order_number' in row.keys() else 0
-            )
+            return Register._from_row(row)
         return None
 
+    @staticmethod
+    @timed()
+    def get_by_ids(register_ids):
+        """Get the registers with the given IDs (missing ones are skipped)"""
+        register_ids = list(register_ids)
+        db = get_db()
+        registers = []
+        for start in range(0, len(register_ids), config_lowmem.BATCH_SIZE):
+            chunk = register_ids[start:start + config_lowmem.BATCH_SIZE]
+            placeholders = ', '.join('?' for _ in chunk)
+            cursor = db.execute(f"SELECT * FROM registers WHERE id IN ({placeholders})", chunk)
+            registers.extend(Register._from_row(row) for row in cursor.fetchall())
+        return registers
+
     def save(self):
         """Save register to database"""
         db = get_db()
@@ -114,7 +197,8 @@ class Register:
             db.execute(
                 """UPDATE registers SET shift_type = ?, employee_name = ?,
                    opening_amount = ?, closing_amount = ?, opened_at = ?,
-                   closed_at = ?, is_open = ?, notes = ?, last_order_number = ? WHERE id = ?""",
+                   closed_at = ?, is_open = ?, notes = ?,
+                   last_order_number = MAX(last_order_number, ?) WHERE id = ?""",
                 (self.shift_type, self.employee_name, self.opening_amount,
                  self.closing_amount, self.opened_at, self.closed_at,
                  int(self.is_open), self.notes, self.last_order_number, self.id)
@@ -131,32 +215,42 @@ class Register:
         self.notes = notes
         self.save()
 
+    def get_date_range(self):
+        """Get (start_date, end_date) of this register's orders as YYYY/MM/DD (end None while open)"""
+        start_date = self.opened_at[:10] if self.opened_at else None
+        end_date = self.closed_at[:10] if self.closed_at else None
+        return start_date, end_date
+
+    @timed()
     def get_total_sales(self):
         """Get total sales for this register"""
         if not self.id:
             return 0.0
 
+        # Closed registers' orders may have been moved to monthly archives
         db = get_db()
-        cursor = db.execute(
-            "SELECT SUM(total_amount) as total FROM orders WHERE register_id = ?",
-            (self.id,)
+        start_date, end_date = self.get_date_range()
+        rows = db.iter_archived_rows(
+            "SELECT SUM(total_amount) as total FROM {orders} WHERE register_id = ?",
+            (self.id,), start_date, end_date
         )
-        result = cursor.fetchone()
-        return result['total'] if result['total'] else 0.0
+        return sum(row['total'] or 0.0 for row in rows)
 
+    @timed()
     def get_orders_count(self):
         """Get number of orders for this register"""
         if not self.id:
             return 0
 
         db = get_db()
-        cursor = db.execute(
-            "SELECT COUNT(*) as count FROM orders WHERE register_id = ?",
-            (self.id,)
+        start_date, end_date = self.get_date_range()
+        rows = db.iter_archived_rows(
+            "SELECT COUNT(*) as count FROM {orders} WHERE register_id = ?",
+            (self.id,), start_date, end_date
         )
-        result = cursor.fetchone()
-        return result['count'] if result else 0
+        return sum(row['count'] for row in rows)
 
+    @timed()
     def get_expected_amount(self):
         """Get expected cash amount (opening + sales)"""
         return self.opening_amount + self.get_total_sales()
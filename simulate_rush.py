@@ -0,0 +1,489 @@
+"""
+Rush-hour load simulator driving the real MainWindow offscreen
+
+Opens the POS on a scratch copy of a database, with fake printers attached,
+and replays a simulated shift through the UI with QTest: tapping
+categories and products, picking toppings in the topping dialog, editing
+quantities, ticking delivery and checking out. Order arrivals follow the
+lunch/dinner rush curve at --orders-per-minute on average. The shift's
+timers (memory cleanup, idle backup) are fired on the simulated clock.
+
+While it runs it records per-action latency (including the event-loop
+work the action queues), event-loop stalls seen by a heartbeat timer and
+process memory, then prints a summary per simulated hour and writes JSON.
+
+Usage:
+    python simulate_rush.py                                   # 8h evening shift, 2 orders/min
+    python simulate_rush.py --hours 8 --start-hour 16 --orders-per-minute 4 --printer-ms 150
+    python simulate_rush.py --hours 0.25                      # quick 15-minute check
+    python simulate_rush.py --db data/restaurant.db --output data/bench/rush.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import config
+import config_lowmem
+from generate_benchmark_data import HOURLY_WEIGHTS
+
+HEARTBEAT_MS = 10
+STALL_MS = 100  # Heartbeat gaps longer than this count as a stall
+MEMORY_SAMPLE_MINUTES = 15
+CLEANUP_MINUTES = 1  # MainWindow.cleanup_timer (every MEMORY_CHECK_SECONDS, at most once a simulated minute here)
+BACKUP_CHECK_MINUTES = 1  # MainWindow.backup_timer
+EDIT_RATE = 0.2
+DELIVERY_RATE = 0.2
+TOPPING_PICK_RATE = 0.5
+
+
+class FakeWin32Print:
+    """Stands in for win32print: keeps receipts in memory, optionally slow like a real printer"""
+
+    def __init__(self, delay_ms=0):
+        self.delay = delay_ms / 1000
+        self.jobs = 0
+        self.bytes_written = 0
+
+    def OpenPrinter(self, name):
+        return name
+
+    def StartDocPrinter(self, printer, level, info):
+        self.jobs += 1
+        return self.jobs
+
+    def StartPagePrinter(self, printer):
+        pass
+
+    def WritePrinter(self, printer, data):
+        self.bytes_written += len(data)
+        return len(data)
+
+    def EndPagePrinter(self, printer):
+        pass
+
+    def EndDocPrinter(self, printer):
+        if self.delay:
+            time.sleep(self.delay)
+
+    def ClosePrinter(self, printer):
+        pass
+
+
+def rss_mb():
+    """Resident memory of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        from utils.memory_optimizer import get_optimizer
+        return get_optimizer().get_memory_usage()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(values):
+    """Latency summary in ms"""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'p50_ms': round(statistics.median(values), 2),
+        'p95_ms': round(percentile(values, 0.95), 2),
+        'p99_ms': round(percentile(values, 0.99), 2),
+        'max_ms': round(max(values), 2),
+    }
+
+
+def shift_hours(hours):
+    """Indexes of the simulated hours in a shift (the last one may be partial)"""
+    return range(math.ceil(hours))
+
+
+def arrival_minutes(rng, hours, start_hour, orders_per_minute):
+    """Simulated minutes (from shift start) at which customers order, following the rush curve"""
+    # (weight, minutes) per hour; a fractional --hours ends with a partial hour
+    curve = [(HOURLY_WEIGHTS.get((start_hour + hour) % 24, 1), min(60.0, (hours - hour) * 60))
+             for hour in shift_hours(hours)]
+    scale = orders_per_minute * sum(length for _, length in curve) / sum(weight * length for weight, length in curve)
+    arrivals = []
+    for hour, (weight, length) in enumerate(curve):
+        rate = weight * scale  # Orders per minute this hour
+        minute = 0.0
+        while True:
+            minute += rng.expovariate(rate)
+            if minute >= length:
+                break
+            arrivals.append(hour * 60 + minute)
+    return arrivals
+
+
+class RushSimulator:
+    """Drives MainWindow through a simulated shift and records latency, stalls and memory"""
+
+    def __init__(self, app, window, args):
+        from PyQt5.QtCore import QTimer
+
+        self.app = app
+        self.window = window
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.arrivals = arrival_minutes(self.rng, args.hours, args.start_hour, args.orders_per_minute)
+        self.latencies = {}  # {action: [(hour, ms)]}
+        self.stalls = []  # [(hour, gap ms)]
+        self.memory = []  # [(minute, MB)]
+        self.sim_minute = 0.0
+        self.next_cleanup = CLEANUP_MINUTES
+        self.next_backup_check = BACKUP_CHECK_MINUTES
+        self.next_memory_sample = 0
+        self.orders_done = 0
+        self.wall_start = None
+
+        self.heartbeat = QTimer()
+        self.heartbeat.timeout.connect(self.on_heartbeat)
+        self.last_beat = None
+        self.modal_token = 0  # Modal handlers only act during the action that set them up
+        self.modal_expected = False
+        self.unexpected_dialogs = []
+
+    # Measurement
+
+    def on_heartbeat(self):
+        from PyQt5.QtWidgets import QApplication
+
+        now = time.perf_counter()
+        if self.last_beat is not None:
+            gap = (now - self.last_beat) * 1000
+            if gap > STALL_MS:
+                self.stalls.append((int(self.sim_minute // 60), gap))
+        self.last_beat = now
+
+        # An error box nobody handles would block the shift: note it and close it
+        dialog = QApplication.activeModalWidget()
+        if dialog is not None and not self.modal_expected:
+            self.unexpected_dialogs.append(f"{self.clock(self.sim_minute)} {dialog.windowTitle()}")
+            dialog.reject()
+
+    def timed(self, action, func):
+        """Run a UI action and the event-loop work it queued; record its latency"""
+        start = time.perf_counter()
+        func()
+        self.app.processEvents()
+        elapsed = (time.perf_counter() - start) * 1000
+        self.modal_token += 1
+        self.modal_expected = False
+        self.latencies.setdefault(action, []).append((int(self.sim_minute // 60), elapsed))
+
+    def on_modal(self, handler):
+        """Run handler on the next modal dialog (QDialog.exec_ blocks the caller)"""
+        from PyQt5.QtCore import QTimer
+        from PyQt5.QtWidgets import QApplication
+
+        token = self.modal_token
+        self.modal_expected = True
+
+        def poll():
+            if token != self.modal_token:
+                return  # The action finished without opening a dialog
+            dialog = QApplication.activeModalWidget()
+            if dialog is None:
+                QTimer.singleShot(1, poll)
+                return
+            self.modal_expected = False
+            handler(dialog)
+        QTimer.singleShot(0, poll)
+
+    # UI actions
+
+    def tap_category(self):
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtTest import QTest
+
+        buttons = list(self.window.category_view.category_buttons.values())
+        if buttons:
+            QTest.mouseClick(self.rng.choice(buttons), Qt.LeftButton)
+
+    def tap_product(self):
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtTest import QTest
+        from views.topping_selection_dialog import ToppingSelectionDialog
+
+        grid = self.window.product_view.grid_layout
+        widgets = [grid.itemAt(index).widget() for index in range(grid.count())]
+        widgets = [widget for widget in widgets if widget is not None and widget.isVisible()]
+        if not widgets:
+            return
+
+        def pick_toppings(dialog):
+            if not isinstance(dialog, ToppingSelectionDialog):
+                dialog.reject()
+                return
+            for entry in getattr(dialog, 'topping_buttons', {}).values():
+                if self.rng.random() < TOPPING_PICK_RATE:
+                    QTest.mouseClick(entry['button'], Qt.LeftButton)
+            dialog.accept()
+
+        self.on_modal(pick_toppings)
+        QTest.mouseClick(self.rng.choice(widgets), Qt.LeftButton)
+
+    def edit_quantity(self):
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtTest import QTest
+
+        layout = self.window.cart_view.scroll_layout
+        items = [layout.itemAt(index).widget() for index in range(layout.count())]
+        items = [item for item in items if item is not None]
+        if not items:
+            return
+
+        def set_quantity(dialog):
+            if hasattr(dialog, 'quantity_input'):
+                dialog.quantity_input.setValue(self.rng.randint(2, 4))
+                dialog.accept()
+            else:
+                dialog.reject()
+
+        self.on_modal(set_quantity)
+        QTest.mouseClick(self.rng.choice(items), Qt.LeftButton)
+
+    def tick_delivery(self):
+        def fill(dialog):
+            if hasattr(dialog, 'address_input'):
+                dialog.address_input.setText(f"{self.rng.randint(1, 200)} Rue de Marseille")
+                dialog.phone_input.setText(f"9{self.rng.randint(0, 9999999):07d}")
+                dialog.price_input.setValue(3.0)
+                dialog.accept()
+            else:
+                dialog.reject()
+
+        self.on_modal(fill)
+        self.window.cart_view.delivery_checkbox.setChecked(True)
+
+    def checkout(self):
+        from PyQt5.QtCore import Qt
+        from PyQt5.QtTest import QTest
+
+        QTest.mouseClick(self.window.cart_view.checkout_btn, Qt.LeftButton)
+
+    # Shift
+
+    def advance_clock(self, minute):
+        """Move the simulated clock, firing the window's periodic timers on the way"""
+        self.sim_minute = minute
+        while self.next_backup_check <= minute:
+            self.timed('idle backup check', self.window.check_idle_backup)
+            self.next_backup_check += BACKUP_CHECK_MINUTES
+        while self.next_cleanup <= minute:
+            self.timed('memory cleanup', self.window.periodic_memory_cleanup)
+            self.next_cleanup += CLEANUP_MINUTES
+        while self.next_memory_sample <= minute:
+            self.memory.append((self.next_memory_sample, round(rss_mb(), 1)))
+            self.next_memory_sample += MEMORY_SAMPLE_MINUTES
+
+    def serve_order(self):
+        """One customer: browse, add items, maybe edit and deliver, pay"""
+        for _ in range(self.rng.choices((1, 2, 3, 4), weights=(35, 35, 20, 10))[0]):
+            if self.rng.random() < 0.6:
+                self.timed('tap category', self.tap_category)
+            self.timed('tap product', self.tap_product)
+        if self.rng.random() < EDIT_RATE:
+            self.timed('edit quantity', self.edit_quantity)
+        if self.rng.random() < DELIVERY_RATE:
+            self.timed('delivery', self.tick_delivery)
+        self.timed('checkout', self.checkout)
+        self.orders_done += 1
+
+    def run(self):
+        """Run the whole shift; returns the results dict"""
+        from PyQt5.QtCore import QTimer
+
+        self.wall_start = time.perf_counter()
+        self.heartbeat.start(HEARTBEAT_MS)
+        pending = list(self.arrivals)
+
+        def step():
+            if not pending:
+                self.advance_clock(self.args.hours * 60)
+                self.app.quit()
+                return
+            minute = pending.pop(0)
+            self.advance_clock(minute)
+            self.serve_order()
+            if self.orders_done % 100 == 0:
+                print(f"  {self.clock(minute)}: {self.orders_done}/{len(self.arrivals)} orders, {rss_mb():.0f} MB")
+
+            delay = 0
+            if self.args.speed and pending:
+                # Wait for the next arrival, compressed by --speed
+                delay = int((pending[0] - minute) * 60 * 1000 / self.args.speed)
+            QTimer.singleShot(max(0, delay), step)
+
+        QTimer.singleShot(0, step)
+        self.app.exec_()
+        self.heartbeat.stop()
+        return self.results()
+
+    def clock(self, minute):
+        hour = (self.args.start_hour + int(minute // 60)) % 24
+        return f"{hour:02d}:{int(minute % 60):02d}"
+
+    def results(self):
+        by_hour = []
+        for hour in shift_hours(self.args.hours):
+            checkout = [ms for h, ms in self.latencies.get('checkout', []) if h == hour]
+            taps = [ms for h, ms in self.latencies.get('tap product', []) if h == hour]
+            stalls = [gap for h, gap in self.stalls if h == hour]
+            by_hour.append({
+                'hour': self.clock(hour * 60),
+                'orders': len(checkout),
+                'checkout': summarize(checkout),
+                'tap_product': summarize(taps),
+                'stalls': len(stalls),
+                'max_stall_ms': round(max(stalls), 1) if stalls else 0,
+            })
+
+        memory_values = [mb for _, mb in self.memory]
+        return {
+            'settings': {
+                'hours': self.args.hours, 'start_hour': self.args.start_hour,
+                'orders_per_minute': self.args.orders_per_minute, 'seed': self.args.seed,
+                'speed': self.args.speed, 'printer_ms': self.args.printer_ms,
+            },
+            'orders': self.orders_done,
+            'wall_seconds': round(time.perf_counter() - self.wall_start, 1),
+            'actions': {action: summarize([ms for _, ms in values]) for action, values in self.latencies.items()},
+            'by_hour': by_hour,
+            'stalls': {'count': len(self.stalls), 'max_ms': round(max((gap for _, gap in self.stalls), default=0), 1)},
+            'unexpected_dialogs': self.unexpected_dialogs,
+            'memory_mb': {
+                'start': memory_values[0] if memory_values else None,
+                'end': memory_values[-1] if memory_values else None,
+                'peak': max(memory_values) if memory_values else None,
+                'samples': [{'time': self.clock(minute), 'mb': mb} for minute, mb in self.memory],
+            },
+        }
+
+
+def prepare_database(args, work_dir):
+    """Point the app at a scratch database: a copy of --db, or a generated one"""
+    db_path = os.path.join(work_dir, "restaurant.db")
+    config.BACKUP_DIR = os.path.join(work_dir, "backups")
+    if args.db:
+        shutil.copyfile(args.db, db_path)
+        config.DATABASE_PATH = db_path
+    else:
+        from generate_benchmark_data import generate
+        print(f"Generating {args.history:,} orders of history...")
+        generate(args.history, seed=args.seed, db_path=db_path)
+
+    from models import Register
+    if not Register.get_current_register():
+        Register(shift_type='evening' if args.start_hour >= 16 else 'morning',
+                 employee_name="Simulator", opening_amount=100.0).save()
+
+
+def print_summary(results):
+    print(f"\n{results['orders']} orders in {results['wall_seconds']}s wall time")
+    print(f"\n{'action':<20} {'count':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for action, summary in sorted(results['actions'].items()):
+        if summary['count']:
+            print(f"{action:<20} {summary['count']:>7} {summary['p50_ms']:>8.1f} {summary['p95_ms']:>8.1f} "
+                  f"{summary['p99_ms']:>8.1f} {summary['max_ms']:>8.1f}")
+
+    print(f"\n{'hour':<6} {'orders':>7} {'checkout p95':>13} {'tap p95':>8} {'stalls':>7} {'max stall':>10}")
+    for hour in results['by_hour']:
+        checkout_p95 = hour['checkout'].get('p95_ms', 0)
+        tap_p95 = hour['tap_product'].get('p95_ms', 0)
+        print(f"{hour['hour']:<6} {hour['orders']:>7} {checkout_p95:>13.1f} {tap_p95:>8.1f} "
+              f"{hour['stalls']:>7} {hour['max_stall_ms']:>10.1f}")
+
+    if results['unexpected_dialogs']:
+        print(f"\nUnexpected dialogs (closed): {', '.join(results['unexpected_dialogs'][:10])}")
+
+    memory = results['memory_mb']
+    if memory['start'] is not None:
+        print(f"\nMemory: {memory['start']:.0f} MB at start, {memory['end']:.0f} MB at end "
+              f"({memory['end'] - memory['start']:+.0f} MB), peak {memory['peak']:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hours", type=float, default=8, help="Shift length in simulated hours (0.25 = 15 minutes)")
+    parser.add_argument("--start-hour", type=int, default=16, help="Hour the shift starts (rush curve)")
+    parser.add_argument("--orders-per-minute", type=float, default=2.0, help="Average order rate over the shift")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="Simulated seconds per real second (0 = no waiting between orders)")
+    parser.add_argument("--printer-ms", type=float, default=0, help="Time each fake print job takes")
+    parser.add_argument("--db", help="Database to copy (default: a generated one)")
+    parser.add_argument("--history", type=int, default=10_000, help="Orders in the generated database")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="pos-rush-")
+    try:
+        prepare_database(args, work_dir)
+
+        # Fake printers: receipts are formatted and "sent" like in production
+        import utils.printer
+        fake_printer = FakeWin32Print(args.printer_ms)
+        utils.printer.win32print = fake_printer
+        utils.printer.PRINTING_AVAILABLE = True
+        config.ENABLE_PRINTING = True
+
+        from PyQt5.QtCore import qInstallMessageHandler
+        from PyQt5.QtWidgets import QApplication
+        from utils.styles import get_main_stylesheet
+
+        # The offscreen platform warns on every dialog it shows
+        qInstallMessageHandler(
+            lambda mode, context, message: None if "propagateSizeHints" in message else print(message)
+        )
+        app = QApplication(sys.argv)
+        app.setStyleSheet(get_main_stylesheet())
+
+        if config_lowmem.ENABLE_CHECKOUT_JOURNAL:
+            from utils.checkout_journal import get_journal
+            journal = get_journal()
+            journal.start()
+            app.aboutToQuit.connect(journal.flush)
+
+        from views.main_window import MainWindow
+        window = MainWindow()
+        window.resize(1366, 768)
+        window.show()
+        app.processEvents()
+
+        simulator = RushSimulator(app, window, args)
+        print(f"Simulating {len(simulator.arrivals)} orders over {args.hours:g}h from {args.start_hour:02d}:00...")
+        results = simulator.run()
+        results['printer_jobs'] = fake_printer.jobs
+
+        if config_lowmem.ENABLE_CHECKOUT_JOURNAL:
+            get_journal().stop()
+
+        print_summary(results)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+            print(f"Results written to {args.output}")
+    finally:
+        from models import get_db
+        get_db().close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
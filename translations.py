@@ -18,6 +18,10 @@ MAIN_WINDOW = {
     'register_closed': 'Caisse Fermée',
     'register_opened': 'Caisse Ouverte',
     'difference': 'Différence',
+    'journal_error': 'Ventes non enregistrées',
+    'journal_not_written': "{count} vente(s) n'ont pas encore pu être écrites dans la base de données.\n"
+                           "Les chiffres affichés peuvent être incomplets et la caisse ne peut pas être fermée.\n"
+                           "Réessayez dans un instant ; si le problème persiste, consultez data/restaurant.failed.",
 }
 
 # Cart view
@@ -92,6 +96,11 @@ SETTINGS = {
     'restaurant_name': 'Nom du Restaurant',
     'phone_number': 'Numéro de Téléphone',
     'security': 'Sécurité',
+    'performance_profile': 'Profil de Performance',
+    'profile_name': 'Profil actif',
+    'profile_overrides': 'Réglages modifiés',
+    'profile_no_overrides': 'Aucun (réglages de config_lowmem.py)',
+    'profile_hint': 'Changer avec: python main.py --profile lowmem|standard|high-throughput',
     'admin_password': 'Mot de Passe Admin',
     'save_general': 'Enregistrer Paramètres Généraux',
     'category': 'Catégorie',
@@ -169,6 +178,8 @@ STATISTICS = {
     'keywords_help': 'Séparer par virgules (ex: chawarma, mayonnaise)',
     'all_categories': 'Toutes les Catégories',
     'generate_report': 'Générer Rapport',
+    'report_running': 'Un rapport est déjà en préparation, veuillez patienter.',
+    'report_failed': 'Le rapport n\'a pas pu être généré : {error}',
 }
 
 # Employee view
@@ -237,6 +248,43 @@ ADMIN = {
     'try_again': 'Le mot de passe est incorrect. Veuillez réessayer.',
 }
 
+# Diagnostics (Settings > Diagnostics)
+DIAGNOSTICS = {
+    'diagnostics': 'Diagnostics',
+    'metric': 'Mesure',
+    'value': 'Valeur',
+    'slowest': 'Requêtes les plus lentes',
+    'statement': 'Requête',
+    'count': 'Nombre',
+    'avg_ms': 'Moy. ms',
+    'max_ms': 'Max ms',
+    'refresh': 'Actualiser',
+    'export': 'Exporter (JSON)',
+    'exported': 'Instantané enregistré:\n{path}',
+    'profile': 'Profil de performance',
+    'checkout': 'Encaissement p50 / p95 / p99',
+    'printing': 'Impression p50 / p95',
+    'orders_per_minute': "Commandes / min sur 5 min (échecs d'impression)",
+    'queries': 'Requêtes SQL',
+    'screen': 'Écran {name}',
+    'screen_value': '{queries_per_visit} requêtes, {sql_ms_per_visit} ms par ouverture ({visits} ouvertures)',
+    'span': 'Durée {name} (p50 / p95 / max)',
+    'stalls': 'Blocages interface (> {threshold} ms)',
+    'profiler': 'Profilage',
+    'profile_seconds': 'Profiler {seconds} s',
+    'profile_checkout': 'Profiler le prochain encaissement',
+    'profile_screen': "Profiler la prochaine ouverture d'écran",
+    'profile_started': 'Profilage démarré. Les fichiers seront enregistrés dans data/profiles/.',
+    'profile_running': 'Un profilage est déjà en cours.',
+    'profile_in_progress': 'En cours ({trigger})',
+    'query_cache': 'Cache des requêtes (taux de succès)',
+    'thumbnails': 'Miniatures en mémoire',
+    'memory': 'Mémoire (RSS / budget)',
+    'gc_pauses': 'Pauses GC p50 / max',
+    'write_queues': "Files d'écriture (base / journal)",
+    'files': 'Fichiers',
+}
+
 # Common
 COMMON = {
     'yes': 'Oui',
@@ -0,0 +1,153 @@
+"""
+Archive old orders into monthly database files
+
+Orders (and their items) of closed registers older than
+config_lowmem.ARCHIVE_AFTER_DAYS are moved, one whole month at a time, into
+data/archive/orders-YYYY-MM.db. Queries that go through
+Database.iter_archived() still see them, so reports cover the full history
+while restaurant.db stays small.
+
+Usage:
+    python -m utils.archive            # Archive with the configured horizon
+    python -m utils.archive --days 90  # Archive orders older than 90 days
+"""
+import threading
+from datetime import datetime, timedelta
+from models import get_db
+from utils.cache import invalidate_cache
+import config_lowmem
+
+ARCHIVED_TABLES = ('orders', 'order_items')
+
+# Orders that may be archived: their register is closed (or they have none)
+ARCHIVABLE_ORDERS = """
+    SELECT id FROM main.orders
+    WHERE order_date BETWEEN ? AND ?
+      AND (register_id IS NULL
+           OR register_id IN (SELECT id FROM main.registers WHERE is_open = 0))
+"""
+
+
+def _month_bounds(month):
+    """First and last YYYY/MM/DD date strings of a 'YYYY-MM' month"""
+    year, month_number = month.split('-')
+    return f"{year}/{month_number}/01", f"{year}/{month_number}/31"
+
+
+def _prepare_archive(connection, alias):
+    """Create the archive tables like the live ones and add any columns they lack"""
+    for table in ARCHIVED_TABLES:
+        row = connection.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        create_sql = row['sql'].replace(
+            f"CREATE TABLE {table}", f"CREATE TABLE IF NOT EXISTS {alias}.{table}", 1
+        )
+        connection.execute(create_sql)
+
+        archived = {info['name'] for info in connection.execute(f"PRAGMA {alias}.table_info({table})")}
+        for info in connection.execute(f"PRAGMA main.table_info({table})"):
+            if info['name'] not in archived:
+                connection.execute(f"ALTER TABLE {alias}.{table} ADD COLUMN {info['name']} {info['type']}")
+
+    connection.execute(f"CREATE INDEX IF NOT EXISTS {alias}.idx_orders_date ON orders(order_date)")
+    connection.execute(f"CREATE INDEX IF NOT EXISTS {alias}.idx_orders_register ON orders(register_id)")
+    connection.execute(f"CREATE INDEX IF NOT EXISTS {alias}.idx_order_items_order ON order_items(order_id)")
+
+
+def _archive_month(connection, archive_path, month):
+    """Move one month of archivable orders into its archive (runs on the writer thread)
+
+    Copy and delete are separate commits (the live database uses WAL, so a
+    transaction cannot span both files). Both steps are idempotent: if the
+    app stops in between, the next run skips copied rows and finishes the
+    delete.
+    """
+    if connection.in_transaction:
+        # Another caller has uncommitted writes; try again next run
+        return 0
+
+    first_day, last_day = _month_bounds(month)
+    connection.execute("ATTACH DATABASE ? AS archive", (str(archive_path),))
+    try:
+        _prepare_archive(connection, 'archive')
+
+        columns = {
+            table: ', '.join(info['name'] for info in connection.execute(f"PRAGMA main.table_info({table})"))
+            for table in ARCHIVED_TABLES
+        }
+        cursor = connection.execute(
+            f"""INSERT OR IGNORE INTO archive.orders ({columns['orders']})
+                SELECT {columns['orders']} FROM main.orders WHERE id IN ({ARCHIVABLE_ORDERS})""",
+            (first_day, last_day)
+        )
+        moved = cursor.rowcount
+        connection.execute(
+            f"""INSERT OR IGNORE INTO archive.order_items ({columns['order_items']})
+                SELECT {columns['order_items']} FROM main.order_items
+                WHERE order_id IN ({ARCHIVABLE_ORDERS})""",
+            (first_day, last_day)
+        )
+        connection.commit()
+
+        # Only rows now safely in the archive are removed from the live database
+        connection.execute(
+            "DELETE FROM main.order_items WHERE order_id IN (SELECT id FROM archive.orders)"
+        )
+        connection.execute("DELETE FROM main.orders WHERE id IN (SELECT id FROM archive.orders)")
+        connection.commit()
+        return moved
+    finally:
+        connection.execute("DETACH DATABASE archive")
+
+
+def archive_old_orders(days=None):
+    """Move orders older than days (default ARCHIVE_AFTER_DAYS) into monthly archives
+
+    Only whole months before the horizon are archived. Returns the number of
+    orders moved.
+    """
+    days = days if days is not None else config_lowmem.ARCHIVE_AFTER_DAYS
+    db = get_db()
+
+    # Archive whole months: everything before the first day of the horizon's month
+    horizon = datetime.now() - timedelta(days=days)
+    cutoff = horizon.strftime("%Y/%m/01")
+
+    cursor = db.execute(
+        """SELECT DISTINCT substr(order_date, 1, 7) as month FROM orders
+           WHERE order_date < ? ORDER BY month""",
+        (cutoff,)
+    )
+    months = [row['month'].replace('/', '-') for row in cursor.fetchall()]
+    if not months:
+        return 0
+
+    db.archive_dir.mkdir(parents=True, exist_ok=True)
+    total = 0
+    for month in months:
+        # One writer task per month so other writes can run in between
+        moved = db.submit_write(_archive_month, db.archive_path(month), month).result()
+        if moved:
+            print(f"Archive: moved {moved} orders from {month} to {db.archive_path(month).name}")
+        total += moved
+
+    invalidate_cache('Order')
+    return total
+
+
+def start_archiving():
+    """Run archive_old_orders() on a background thread"""
+    thread = threading.Thread(target=archive_old_orders, name='order-archive', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 2 and sys.argv[1] == "--days":
+        moved = archive_old_orders(int(sys.argv[2]))
+    else:
+        moved = archive_old_orders()
+    print(f"Archived {moved} orders")
@@ -0,0 +1,291 @@
+"""
+Online database backup and restore
+
+Backups are taken with the SQLite backup API in small page steps, so the
+app keeps taking orders while a backup runs. Each backup is verified with
+PRAGMA quick_check, gzip-compressed into config.BACKUP_DIR and rotated
+(newest backup of each of the last days, weeks and months is kept).
+
+Monthly order archives (data/archive/, see utils/archive.py) are not in
+those backups: each archive gets one verified, compressed copy in
+BACKUP_DIR/archive/, taken again only when the archive file has changed.
+
+Usage:
+    python -m utils.backup              # Take a backup now
+    python -m utils.backup list         # List backups
+    python -m utils.backup restore FILE # Restore a backup (close the app first)
+"""
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+import config
+import config_lowmem
+
+BACKUP_PREFIX = "restaurant-"
+BACKUP_SUFFIX = ".db.gz"
+ARCHIVE_BACKUP_DIR = "archive"  # Under the backup directory
+TIMESTAMP_FORMAT = "%Y%m%d-%H%M%S"
+
+_backup_lock = threading.Lock()  # One backup at a time
+_last_backup_time = None
+
+
+def _copy_database(source_path, dest_path, pause=True):
+    """Copy a database with the backup API, a few pages per step"""
+    pages = config_lowmem.BACKUP_PAGES_PER_STEP
+    pause_seconds = config_lowmem.BACKUP_STEP_PAUSE_MS / 1000 if pause else 0
+
+    def progress(status, remaining, total):
+        # Give writers a chance between steps
+        if pause_seconds and remaining:
+            time.sleep(pause_seconds)
+
+    source = sqlite3.connect(str(source_path), timeout=30)
+    dest = sqlite3.connect(str(dest_path))
+    try:
+        source.backup(dest, pages=pages, progress=progress)
+    finally:
+        dest.close()
+        source.close()
+
+
+def _quick_check(db_path):
+    """Return True if PRAGMA quick_check reports the database as ok"""
+    connection = sqlite3.connect(str(db_path))
+    try:
+        result = connection.execute("PRAGMA quick_check").fetchone()
+        return result is not None and result[0] == 'ok'
+    except sqlite3.Error:
+        return False
+    finally:
+        connection.close()
+
+
+def _compressed_copy(source_path, dest_path):
+    """Copy a database to a verified gzip file; returns False if the copy fails quick_check"""
+    with tempfile.TemporaryDirectory(dir=dest_path.parent) as temp_dir:
+        snapshot_path = Path(temp_dir) / "snapshot.db"
+        _copy_database(source_path, snapshot_path)
+
+        if not _quick_check(snapshot_path):
+            print(f"Backup error: quick_check failed for snapshot of {source_path}")
+            return False
+
+        # Compress next to the final name, then move into place
+        compressed_path = Path(temp_dir) / "snapshot.db.gz"
+        with open(snapshot_path, 'rb') as source, gzip.open(compressed_path, 'wb') as dest:
+            shutil.copyfileobj(source, dest)
+        os.replace(compressed_path, dest_path)
+    return True
+
+
+def backup_archives(archive_dir, archive_backup_dir):
+    """Back up the monthly archives changed since their last backup; returns how many were copied
+
+    A backup carries the modification time of the archive it was taken
+    from, so an unchanged archive is skipped.
+    """
+    archive_dir = Path(archive_dir)
+    archive_backup_dir = Path(archive_backup_dir)
+    copied = 0
+    for archive_path in sorted(archive_dir.glob("orders-*.db")):
+        backup_path = archive_backup_dir / f"{archive_path.name}.gz"
+        archive_mtime = archive_path.stat().st_mtime
+        if backup_path.exists() and backup_path.stat().st_mtime == archive_mtime:
+            continue
+        archive_backup_dir.mkdir(parents=True, exist_ok=True)
+        if _compressed_copy(archive_path, backup_path):
+            os.utime(backup_path, (archive_mtime, archive_mtime))
+            copied += 1
+    return copied
+
+
+def create_backup(reason="manual", db_path=None, backup_dir=None):
+    """Take a verified, compressed backup of the database (and of the archives that changed)
+
+    Returns the path of the backup file, or None if it failed or another
+    backup is already running.
+    """
+    global _last_backup_time
+    db_path = Path(db_path or config.DATABASE_PATH)
+    backup_dir = Path(backup_dir or config.BACKUP_DIR)
+
+    if not _backup_lock.acquire(blocking=False):
+        return None
+
+    try:
+        backup_dir.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now()
+        backup_path = backup_dir / f"{BACKUP_PREFIX}{timestamp.strftime(TIMESTAMP_FORMAT)}-{reason}{BACKUP_SUFFIX}"
+
+        if not _compressed_copy(db_path, backup_path):
+            return None
+        backup_archives(db_path.parent / "archive", backup_dir / ARCHIVE_BACKUP_DIR)
+
+        _last_backup_time = timestamp
+        rotate_backups(backup_dir)
+        return backup_path
+    except (OSError, sqlite3.Error) as e:
+        print(f"Backup error: {e}")
+        return None
+    finally:
+        _backup_lock.release()
+
+
+def start_backup(reason):
+    """Take a backup on a background thread"""
+    thread = threading.Thread(target=create_backup, args=(reason,), name='db-backup', daemon=True)
+    thread.start()
+    return thread
+
+
+def backup_due(idle_seconds):
+    """Whether an idle-time backup should run
+
+    True once the app has been idle for BACKUP_IDLE_MINUTES and the last
+    backup is older than BACKUP_MIN_INTERVAL_HOURS.
+    """
+    if idle_seconds < config_lowmem.BACKUP_IDLE_MINUTES * 60:
+        return False
+
+    last_backup = _last_backup_time
+    if last_backup is None:
+        backups = list_backups()
+        last_backup = backups[0][1] if backups else None
+    if last_backup is None:
+        return True
+    return (datetime.now() - last_backup).total_seconds() >= config_lowmem.BACKUP_MIN_INTERVAL_HOURS * 3600
+
+
+def list_backups(backup_dir=None):
+    """List (path, timestamp) of backups, newest first"""
+    backup_dir = Path(backup_dir or config.BACKUP_DIR)
+    backups = []
+    for path in backup_dir.glob(f"{BACKUP_PREFIX}*{BACKUP_SUFFIX}"):
+        stamp = path.name[len(BACKUP_PREFIX):len(BACKUP_PREFIX) + len("YYYYmmdd-HHMMSS")]
+        try:
+            backups.append((path, datetime.strptime(stamp, TIMESTAMP_FORMAT)))
+        except ValueError:
+            continue
+    backups.sort(key=lambda backup: backup[1], reverse=True)
+    return backups
+
+
+def rotate_backups(backup_dir=None):
+    """Delete backups outside the daily/weekly/monthly retention
+
+    The newest backup of each of the last BACKUP_KEEP_DAILY days,
+    BACKUP_KEEP_WEEKLY weeks and BACKUP_KEEP_MONTHLY months is kept.
+    """
+    periods = (
+        (lambda stamp: stamp.date(), config_lowmem.BACKUP_KEEP_DAILY),
+        (lambda stamp: stamp.isocalendar()[:2], config_lowmem.BACKUP_KEEP_WEEKLY),
+        (lambda stamp: (stamp.year, stamp.month), config_lowmem.BACKUP_KEEP_MONTHLY),
+    )
+
+    keep = set()
+    backups = list_backups(backup_dir)
+    for period_key, count in periods:
+        seen = set()
+        for path, stamp in backups:
+            key = period_key(stamp)
+            if key in seen:
+                continue
+            if len(seen) >= count:
+                break
+            seen.add(key)
+            keep.add(path)
+
+    removed = 0
+    for path, stamp in backups:
+        if path not in keep:
+            try:
+                path.unlink()
+                removed += 1
+            except OSError as e:
+                print(f"Backup rotation error: {e}")
+    return removed
+
+
+def restore_backup(backup_path, db_path=None):
+    """Restore the database from a backup file
+
+    The current database is backed up first (reason 'pre-restore'). Monthly
+    archives that are missing or damaged are restored from the archive
+    backups next to the backup file; an intact archive is kept, since
+    archives only gain orders. Run with the application closed.
+    """
+    backup_path = Path(backup_path)
+    db_path = Path(db_path or config.DATABASE_PATH)
+    if not backup_path.exists():
+        print(f"Backup file not found: {backup_path}")
+        return False
+
+    with tempfile.TemporaryDirectory(dir=backup_path.parent) as temp_dir:
+        snapshot_path = Path(temp_dir) / "restore.db"
+        with gzip.open(backup_path, 'rb') as source, open(snapshot_path, 'wb') as dest:
+            shutil.copyfileobj(source, dest)
+
+        if not _quick_check(snapshot_path):
+            print(f"Restore error: {backup_path} failed quick_check")
+            return False
+
+        if db_path.exists() and not create_backup("pre-restore", db_path=db_path):
+            print("Restore error: could not back up the current database first")
+            return False
+
+        # The backup API writes through SQLite, so WAL files stay consistent
+        _copy_database(snapshot_path, db_path, pause=False)
+
+    restored = restore_archives(backup_path.parent / ARCHIVE_BACKUP_DIR, db_path.parent / "archive")
+    print(f"Restored {db_path} from {backup_path}" + (f" and {restored} archive(s)" if restored else ""))
+    return True
+
+
+def restore_archives(archive_backup_dir, archive_dir):
+    """Restore the archives that are missing or fail quick_check; returns how many were restored
+
+    Orders of a restored month that are also in the restored database are
+    moved out of it again by the next archive run (utils/archive.py).
+    """
+    archive_backup_dir = Path(archive_backup_dir)
+    archive_dir = Path(archive_dir)
+    restored = 0
+    for backup_path in sorted(archive_backup_dir.glob("orders-*.db.gz")):
+        archive_path = archive_dir / backup_path.name[:-len(".gz")]
+        if archive_path.exists() and _quick_check(archive_path):
+            continue
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=archive_dir) as temp_dir:
+            snapshot_path = Path(temp_dir) / archive_path.name
+            with gzip.open(backup_path, 'rb') as source, open(snapshot_path, 'wb') as dest:
+                shutil.copyfileobj(source, dest)
+            if not _quick_check(snapshot_path):
+                print(f"Restore error: {backup_path} failed quick_check")
+                continue
+            os.replace(snapshot_path, archive_path)
+        restored += 1
+    return restored
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "list":
+        for path, stamp in list_backups():
+            print(f"{stamp:%Y-%m-%d %H:%M:%S}  {path.stat().st_size / 1024:8.1f} KB  {path.name}")
+    elif len(sys.argv) > 2 and sys.argv[1] == "restore":
+        sys.exit(0 if restore_backup(sys.argv[2]) else 1)
+    elif len(sys.argv) > 1:
+        print("Usage: python -m utils.backup [list | restore FILE]")
+        sys.exit(2)
+    else:
+        path = create_backup()
+        print(f"Backup written to {path}" if path else "Backup failed")
+        sys.exit(0 if path else 1)
@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 from functools import wraps
 import hashlib
 import json
+import threading
+import config_lowmem
 
 
 class QueryCache:
@@ -16,6 +18,9 @@ class QueryCache:
         self.func_names = {}  # Map hash -> func_name for pattern matching
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
+        self.lock = threading.RLock()  # Models may be queried from background threads
+        self.hits = 0
+        self.misses = 0
 
     def _generate_key(self, func_name, args, kwargs):
         """Generate cache key from function name and arguments"""
@@ -48,47 +53,91 @@ class QueryCache:
 
     def get(self, func_name, args, kwargs):
         """Get cached result"""
-        key = self._generate_key(func_name, args, kwargs)
+        with self.lock:
+            key = self._generate_key(func_name, args, kwargs)
 
-        if key not in self.cache or self._is_expired(key):
-            return None
+            if key not in self.cache or self._is_expired(key):
+                self.misses += 1
+                return None
 
-        self.access_times[key] = datetime.now()
-        return self.cache[key]
+            self.hits += 1
+            self.access_times[key] = datetime.now()
+            return self.cache[key]
 
     def set(self, func_name, args, kwargs, result):
         """Cache a result"""
-        key = self._generate_key(func_name, args, kwargs)
+        with self.lock:
+            key = self._generate_key(func_name, args, kwargs)
 
-        # Evict oldest if cache is full
-        if len(self.cache) >= self.max_size:
-            self._evict_oldest()
+            # Evict oldest if cache is full
+            if len(self.cache) >= self.max_size:
+                self._evict_oldest()
 
-        self.cache[key] = result
-        self.access_times[key] = datetime.now()
+            self.cache[key] = result
+            self.access_times[key] = datetime.now()
 
     def invalidate_all(self):
         """Clear entire cache"""
-        self.cache.clear()
-        self.access_times.clear()
-        self.func_names.clear()
+        with self.lock:
+            self.cache.clear()
+            self.access_times.clear()
+            self.func_names.clear()
+
+    def configure(self, max_size, ttl_seconds):
+        """Change the size and TTL (e.g. for a performance profile), evicting entries over the new size"""
+        with self.lock:
+            self.max_size = max_size
+            self.ttl_seconds = ttl_seconds
+        self.shrink(max_size)
+
+    def stats(self):
+        """Size, hits, misses and hit ratio since startup"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.cache),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+            }
+
+    def remove_expired(self):
+        """Drop expired entries; returns how many were dropped"""
+        with self.lock:
+            expired = [key for key in self.cache if self._is_expired(key)]
+            for key in expired:
+                self.cache.pop(key, None)
+                self.access_times.pop(key, None)
+                self.func_names.pop(key, None)
+            return len(expired)
+
+    def shrink(self, keep):
+        """Evict the least recently used entries down to keep; returns how many were dropped"""
+        with self.lock:
+            dropped = 0
+            while len(self.cache) > keep and self.access_times:
+                self._evict_oldest()
+                dropped += 1
+            return dropped
 
     def invalidate_pattern(self, pattern):
         """Invalidate cache entries matching a pattern (e.g., 'Order', 'Employee', 'Client')"""
-        keys_to_remove = []
-        for key, func_name in self.func_names.items():
-            if pattern in func_name:
-                keys_to_remove.append(key)
+        with self.lock:
+            keys_to_remove = []
+            for key, func_name in self.func_names.items():
+                if pattern in func_name:
+                    keys_to_remove.append(key)
 
-        for key in keys_to_remove:
-            self.cache.pop(key, None)
-            self.access_times.pop(key, None)
-            self.func_names.pop(key, None)
+            for key in keys_to_remove:
+                self.cache.pop(key, None)
+                self.access_times.pop(key, None)
+                self.func_names.pop(key, None)
 
 
-# Global cache instance
-# Reduced for low-memory systems (2GB RAM)
-_cache = QueryCache(max_size=50, ttl_seconds=120)  # 50 items, 2 minutes TTL
+# Global cache instance, sized by config_lowmem (the active profile resizes it)
+_cache = QueryCache(max_size=config_lowmem.CACHE_MAX_SIZE, ttl_seconds=config_lowmem.CACHE_TTL_SECONDS)
 
 
 def cached_query(cache_instance=None):
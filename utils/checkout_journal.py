@@ -0,0 +1,328 @@
+"""
+Crash-safe checkout journal with background group commit
+
+Checkout appends each sale to an append-only journal file with a single
+fsync; a background thread hands journaled sales to the database writer
+thread in batches (one transaction per batch). Sales that were journaled but not applied
+when the app stopped are replayed on the next start.
+
+A credit sale's client balance change is part of its journal entry and is
+applied in the same transaction as the order.
+
+Record format: 4-byte big-endian payload length, 4-byte CRC32 of the
+payload, then the payload (UTF-8 JSON). A torn or corrupt tail record
+(power cut during a write) is ignored and truncated on replay.
+"""
+import json
+import os
+import sqlite3
+import struct
+import threading
+import uuid
+import zlib
+from pathlib import Path
+import config
+import config_lowmem
+from models import get_db
+from utils.cache import invalidate_cache
+
+RECORD_HEADER = struct.Struct('>II')  # payload length, CRC32
+
+ORDER_FIELDS = (
+    'order_number', 'order_date', 'order_time', 'total_amount', 'is_delivery',
+    'delivery_address', 'delivery_phone', 'delivery_price', 'register_id',
+    'client_id', 'is_paid', 'price_modified', 'reprint_count'
+)
+ITEM_FIELDS = ('product_name', 'quantity', 'unit_price', 'discount', 'final_price', 'notes')
+
+
+class CheckoutJournal:
+    """Durable append-only log of checkouts applied to the database in the background"""
+
+    def __init__(self, journal_path=None, db_path=None):
+        self.db_path = db_path or config.DATABASE_PATH
+        self.journal_path = Path(journal_path or Path(self.db_path).with_suffix('.journal'))
+        self.failed_path = self.journal_path.with_suffix('.failed')
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._pending = []  # Journaled entries not yet applied, in append order
+        self._last_order_numbers = {}  # register_id -> highest journaled order number
+        self._file = None
+        self._thread = None
+        self._running = False  # Whether the committer thread is still applying entries
+        self._stopping = False
+        self._attempts = {}  # journal_id -> failed tries, for entries that failed on their own
+
+    @staticmethod
+    def encode_record(entry):
+        """Encode an entry as a length-prefixed, checksummed record"""
+        payload = json.dumps(entry, separators=(',', ':')).encode('utf-8')
+        return RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    @staticmethod
+    def read_records(path):
+        """Read valid entries from a journal file
+
+        Returns (entries, valid_length); reading stops at the first truncated
+        or corrupt record, which is where a crash interrupted a write.
+        """
+        entries = []
+        valid_length = 0
+        if not os.path.exists(path):
+            return entries, valid_length
+
+        with open(path, 'rb') as journal_file:
+            while True:
+                header = journal_file.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    break
+                length, checksum = RECORD_HEADER.unpack(header)
+                payload = journal_file.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                try:
+                    entries.append(json.loads(payload.decode('utf-8')))
+                except ValueError:
+                    break
+                valid_length += RECORD_HEADER.size + length
+
+        return entries, valid_length
+
+    def start(self):
+        """Replay unapplied entries, then start the background committer"""
+        if self._thread:
+            return
+
+        replayed = self.replay()
+        if replayed:
+            print(f"Checkout journal: replayed {replayed} unapplied order(s)")
+
+        self._stopping = False
+        self._running = True
+        self._file = open(self.journal_path, 'ab')
+        self._thread = threading.Thread(target=self._run, name='checkout-journal', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Apply pending entries and stop the background committer"""
+        if not self._thread:
+            return
+
+        self.flush(timeout)
+        with self._lock:
+            self._stopping = True
+            self._changed.notify_all()
+        self._thread.join(timeout)
+        self._thread = None
+        self._file.close()
+        self._file = None
+
+    def replay(self):
+        """Apply every journaled entry missing from the database, then empty the journal
+
+        If the database rejects them, the entries stay journaled and queued
+        for the committer, which retries them one at a time.
+        """
+        entries, valid_length = self.read_records(self.journal_path)
+        applied = 0
+        keep_length = 0
+        if entries:
+            try:
+                applied = get_db().submit_write(self._apply, entries).result()
+            except Exception as e:
+                print(f"Checkout journal error: {e}")
+                keep_length = valid_length
+                with self._lock:
+                    self._pending = entries
+                    for entry in entries:
+                        register_id = entry['order']['register_id']
+                        self._last_order_numbers[register_id] = max(
+                            self._last_order_numbers.get(register_id, 0), entry['order']['order_number']
+                        )
+            invalidate_cache()
+
+        if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) != keep_length:
+            # Drop what is now in the database along with any torn tail
+            with open(self.journal_path, 'r+b') as journal_file:
+                journal_file.truncate(keep_length)
+                journal_file.flush()
+                os.fsync(journal_file.fileno())
+
+        return applied
+
+    def next_order_number(self, register):
+        """Get the next order number for a register, counting orders not yet applied"""
+        with self._lock:
+            journaled = self._last_order_numbers.get(register.id, 0)
+        return max(register.last_order_number, journaled) + 1
+
+    def append_order(self, order):
+        """Durably record a new order; it is written to the database in the background
+
+        A credit sale (client set, not paid) also records the amount added to
+        the client's balance, applied in the same transaction as the order.
+        """
+        entry = {
+            'journal_id': uuid.uuid4().hex,
+            'order': {field: getattr(order, field) for field in ORDER_FIELDS},
+            'items': [{field: getattr(item, field) for field in ITEM_FIELDS} for item in order.items],
+        }
+        if order.client_id is not None and not order.is_paid:
+            entry['balance_delta'] = order.total_amount
+        record = self.encode_record(entry)
+
+        with self._lock:
+            self._file.write(record)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+            self._pending.append(entry)
+            register_id = order.register_id
+            self._last_order_numbers[register_id] = max(
+                self._last_order_numbers.get(register_id, 0), order.order_number
+            )
+            self._changed.notify_all()
+
+        return entry['journal_id']
+
+    def pending_count(self):
+        """Get number of journaled entries not yet applied"""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self, timeout=None):
+        """Wait until every journaled entry is applied; returns False on timeout"""
+        with self._lock:
+            done = self._changed.wait_for(lambda: not self._pending or not self._running, timeout)
+            done = done and not self._pending
+
+        # Caches are only touched from the calling (UI) thread
+        invalidate_cache('Order')
+        invalidate_cache('Register')
+        invalidate_cache('Client')
+        return done
+
+    def _run(self):
+        """Background committer: apply pending entries in group-committed batches"""
+        window = config_lowmem.JOURNAL_GROUP_COMMIT_MS / 1000
+
+        try:
+            while True:
+                with self._lock:
+                    self._changed.wait_for(lambda: self._pending or self._stopping)
+                    if self._stopping and not self._pending:
+                        return
+
+                    # Let more checkouts join this batch
+                    if not self._stopping and len(self._pending) < config_lowmem.JOURNAL_MAX_BATCH:
+                        self._changed.wait(window)
+                    batch = self._pending[:config_lowmem.JOURNAL_MAX_BATCH]
+
+                done = self._commit_batch(batch)
+
+                with self._lock:
+                    done_ids = {entry['journal_id'] for entry in done}
+                    self._pending = [entry for entry in self._pending if entry['journal_id'] not in done_ids]
+                    if not self._pending:
+                        # Everything journaled is in the database; start the journal over
+                        self._file.truncate(0)
+                        self._file.flush()
+                        os.fsync(self._file.fileno())
+                    self._changed.notify_all()
+                    if len(done) < len(batch) and not self._stopping:
+                        # Entries stay journaled; retry after a pause
+                        self._changed.wait(1)
+        except Exception as e:
+            print(f"Checkout journal stopped: {e}")
+        finally:
+            # Wake up flush() callers, whether or not everything was applied
+            with self._lock:
+                self._running = False
+                self._changed.notify_all()
+
+    def _commit_batch(self, batch):
+        """Apply a batch; returns the entries that left the queue (applied or moved aside)"""
+        db = get_db()
+        try:
+            # One writer for the whole app: the batch runs on the database writer thread
+            db.submit_write(self._apply, batch).result()
+            return batch
+        except Exception as e:
+            print(f"Checkout journal error: {e}")
+
+        # Apply the batch one order at a time so a bad entry cannot hold back the others
+        done = []
+        for entry in batch:
+            journal_id = entry['journal_id']
+            try:
+                db.submit_write(self._apply, [entry]).result()
+            except Exception as e:
+                attempts = self._attempts[journal_id] = self._attempts.get(journal_id, 0) + 1
+                if attempts < config_lowmem.JOURNAL_MAX_ATTEMPTS:
+                    continue
+                self._move_aside(entry, e)
+            self._attempts.pop(journal_id, None)
+            done.append(entry)
+        return done
+
+    def _move_aside(self, entry, error):
+        """Append an entry the database keeps rejecting to the .failed file"""
+        print(f"Checkout journal: order {entry['order']['order_number']} moved to {self.failed_path}: {error}")
+        with open(self.failed_path, 'ab') as failed_file:
+            failed_file.write(self.encode_record(dict(entry, error=str(error))))
+            failed_file.flush()
+            os.fsync(failed_file.fileno())
+
+    @staticmethod
+    def _apply(connection, entries):
+        """Insert journaled orders and their client balance changes in one transaction,
+        skipping already applied ones (writer thread)"""
+        applied = 0
+        try:
+            for entry in entries:
+                cursor = connection.execute(
+                    "SELECT 1 FROM orders WHERE journal_id = ?", (entry['journal_id'],)
+                )
+                if cursor.fetchone():
+                    continue
+
+                order = entry['order']
+                cursor = connection.execute(
+                    f"""INSERT INTO orders ({', '.join(ORDER_FIELDS)}, journal_id)
+                        VALUES ({', '.join('?' for _ in ORDER_FIELDS)}, ?)""",
+                    [order[field] for field in ORDER_FIELDS] + [entry['journal_id']]
+                )
+                order_id = cursor.lastrowid
+                connection.executemany(
+                    f"""INSERT INTO order_items (order_id, {', '.join(ITEM_FIELDS)})
+                        VALUES (?, {', '.join('?' for _ in ITEM_FIELDS)})""",
+                    [[order_id] + [item[field] for field in ITEM_FIELDS] for item in entry['items']]
+                )
+                connection.execute(
+                    "UPDATE registers SET last_order_number = MAX(last_order_number, ?) WHERE id = ?",
+                    (order['order_number'], order['register_id'])
+                )
+                if entry.get('balance_delta'):
+                    connection.execute(
+                        "UPDATE clients SET current_balance = current_balance + ? WHERE id = ?",
+                        (entry['balance_delta'], order['client_id'])
+                    )
+                applied += 1
+
+            connection.commit()
+        except sqlite3.Error:
+            connection.rollback()
+            raise
+        return applied
+
+
+# Global journal instance
+_journal = None
+
+
+def get_journal():
+    """Get the checkout journal instance"""
+    global _journal
+    if _journal is None:
+        _journal = CheckoutJournal()
+    return _journal
@@ -0,0 +1,306 @@
+"""
+Live performance diagnostics
+
+Counters kept in memory while the POS runs, shown in Settings >
+Diagnostics and exportable as a JSON snapshot: checkout latency, SQL
+statements per screen visit and the slowest statements, timing spans
+(utils/spans.py), UI stalls (utils/stall_detector.py), query cache hit
+ratio, thumbnail cache usage, memory and garbage collection pauses,
+background write queues and database file sizes. Recording costs a few
+dictionary updates per query; nothing is written to disk unless a
+snapshot is exported.
+"""
+import gc
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+import config
+from utils import spans
+
+CHECKOUT_SAMPLES = 500  # Most recent checkouts kept for percentiles
+GC_SAMPLES = 200  # Most recent garbage collections kept
+MAX_STATEMENTS = 300  # Distinct statements tracked (the fastest are dropped beyond this)
+SLOWEST_COUNT = 10
+DIAGNOSTICS_DIR = Path(config.DATABASE_PATH).parent / "diagnostics"
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list (0.0 if empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def latency_summary(values):
+    """Count and p50/p95/p99/max of timings in ms"""
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50), 2),
+        'p95_ms': round(percentile(values, 0.95), 2),
+        'p99_ms': round(percentile(values, 0.99), 2),
+        'max_ms': round(max(values), 2) if values else 0.0,
+    }
+
+
+def file_size(path):
+    """Size of a file in bytes (0 if it does not exist)"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def to_mb(size):
+    return round(size / 1024 / 1024, 2)
+
+
+class Diagnostics:
+    """Collects timings from the database layer, checkout, screen switches and the garbage collector"""
+
+    def __init__(self):
+        self.lock = threading.Lock()  # Queries run on background threads too
+        self.started = time.time()
+        self.checkouts = deque(maxlen=CHECKOUT_SAMPLES)  # (total ms, printing ms)
+        self.checkout_times = deque(maxlen=CHECKOUT_SAMPLES)  # time.monotonic() of each checkout
+        self.checkout_count = 0
+        self.print_failures = 0
+        self.gc_pauses = deque(maxlen=GC_SAMPLES)  # (generation, ms, objects collected)
+        self.statements = {}  # SQL text -> [count, total ms, max ms]
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.screens = {}  # Screen name -> visit totals
+        self.screen = None
+        self._screen_start = (0, 0.0)  # Query count and SQL ms when the current screen was opened
+        self._gc_start = None
+
+    def record_query(self, query, seconds):
+        """Account one statement (called by Database.execute/commit)"""
+        ms = seconds * 1000
+        with self.lock:
+            self.query_count += 1
+            self.query_ms += ms
+            stats = self.statements.get(query)
+            if stats is None:
+                if len(self.statements) >= MAX_STATEMENTS:
+                    fastest = min(self.statements, key=lambda text: self.statements[text][2])
+                    del self.statements[fastest]
+                stats = self.statements[query] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += ms
+            if ms > stats[2]:
+                stats[2] = ms
+
+    def record_checkout(self, total_seconds, print_seconds):
+        """Account one checkout and the part of it spent printing"""
+        self.checkouts.append((total_seconds * 1000, print_seconds * 1000))
+        self.checkout_times.append(time.monotonic())
+        self.checkout_count += 1
+
+    def record_print_failure(self):
+        """Count a receipt that could not be printed"""
+        self.print_failures += 1
+
+    def orders_per_minute(self, minutes=5):
+        """Average checkouts per minute over the last minutes"""
+        since = time.monotonic() - minutes * 60
+        return sum(1 for checkout_time in list(self.checkout_times) if checkout_time >= since) / minutes
+
+    def screen_opened(self, name):
+        """A screen was shown: close the previous screen's visit and start counting for this one"""
+        with self.lock:
+            if self.screen is not None:
+                queries = self.query_count - self._screen_start[0]
+                sql_ms = self.query_ms - self._screen_start[1]
+                visits = self.screens.setdefault(self.screen, {'visits': 0, 'queries': 0, 'sql_ms': 0.0})
+                visits['visits'] += 1
+                visits['queries'] += queries
+                visits['sql_ms'] += sql_ms
+                visits['last_queries'] = queries
+                visits['last_sql_ms'] = sql_ms
+            self.screen = name
+            self._screen_start = (self.query_count, self.query_ms)
+
+    def install_gc_hook(self):
+        """Time every garbage collection"""
+        if self._on_gc not in gc.callbacks:
+            gc.callbacks.append(self._on_gc)
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+        elif self._gc_start is not None:
+            ms = (time.perf_counter() - self._gc_start) * 1000
+            self.gc_pauses.append((info['generation'], ms, info['collected']))
+            self._gc_start = None
+
+    def snapshot(self):
+        """All metrics as a JSON-serializable dict"""
+        with self.lock:
+            statements = [(text, list(stats)) for text, stats in self.statements.items()]
+            query_count, query_ms = self.query_count, self.query_ms
+            screens = {name: dict(visits) for name, visits in self.screens.items()}
+            current = (self.screen, self.query_count - self._screen_start[0], self.query_ms - self._screen_start[1])
+        checkouts = list(self.checkouts)
+        pauses = list(self.gc_pauses)
+
+        statements.sort(key=lambda item: item[1][1], reverse=True)  # Most total time first
+        return {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'uptime_minutes': round((time.time() - self.started) / 60, 1),
+            'profile': _profile(),
+            'checkout': {
+                **latency_summary([total for total, _ in checkouts]),
+                'printing': latency_summary([printing for _, printing in checkouts]),
+                'total': self.checkout_count,
+                'per_minute': round(self.orders_per_minute(), 2),
+                'print_failures': self.print_failures,
+            },
+            'sql': {
+                'queries': query_count,
+                'total_ms': round(query_ms, 1),
+                'current_screen': {'name': current[0], 'queries': current[1], 'sql_ms': round(current[2], 1)},
+                'screens': {
+                    name: {
+                        'visits': visits['visits'],
+                        'queries_per_visit': round(visits['queries'] / visits['visits'], 1),
+                        'sql_ms_per_visit': round(visits['sql_ms'] / visits['visits'], 1),
+                        'last_queries': visits['last_queries'],
+                        'last_sql_ms': round(visits['last_sql_ms'], 1),
+                    }
+                    for name, visits in screens.items()
+                },
+                'slowest': [
+                    {
+                        'statement': " ".join(text.split())[:300],
+                        'count': count,
+                        'avg_ms': round(total / count, 3),
+                        'max_ms': round(worst, 3),
+                        'total_ms': round(total, 1),
+                    }
+                    for text, (count, total, worst) in statements[:SLOWEST_COUNT]
+                ],
+            },
+            'spans': spans.histograms(),
+            'stalls': _stall_stats(),
+            'profiler': _profiler_stats(),
+            'query_cache': _query_cache_stats(),
+            'thumbnails': _thumbnail_stats(),
+            'memory': _memory_stats(pauses),
+            'queues': queue_stats(),
+            'files': file_stats(),
+        }
+
+    def export(self, path=None):
+        """Write a snapshot to path (default data/diagnostics/diagnostics-<time>.json); returns the path"""
+        path = Path(path or DIAGNOSTICS_DIR / f"diagnostics-{datetime.now():%Y%m%d-%H%M%S}.json")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, indent=2, ensure_ascii=False)
+        return path
+
+
+def _profile():
+    from utils.profiles import active_profile
+    profile = active_profile()
+    return {'name': profile['name'], 'source': profile['source']}
+
+
+def _query_cache_stats():
+    from utils.cache import get_cache
+    return get_cache().stats()
+
+
+def _stall_stats():
+    """UI stalls (None when the stall detector is not running)"""
+    detector_module = sys.modules.get('utils.stall_detector')
+    if detector_module is None or detector_module._detector is None:
+        return None
+    return detector_module._detector.summary()
+
+
+def _profiler_stats():
+    """Running profile capture and the last files written (None if never used)"""
+    profiler_module = sys.modules.get('utils.profiler')
+    if profiler_module is None or profiler_module._capture is None:
+        return None
+    return profiler_module._capture.status()
+
+
+def _thumbnail_stats():
+    """Thumbnail cache usage (None when no thumbnails were loaded in this process)"""
+    if 'utils.thumbnails' not in sys.modules:
+        return None
+    from utils.thumbnails import get_thumbnails
+    return get_thumbnails().usage()
+
+
+def _memory_stats(pauses):
+    from utils.memory_optimizer import get_governor
+    governor = get_governor()
+    full_pauses = [ms for generation, ms, _ in pauses if generation == 2]
+    return {
+        'rss_mb': round(governor.optimizer.get_memory_usage(), 1),
+        'budget_mb': governor.budget_mb,
+        'gc_counts': gc.get_count(),
+        'gc_frozen_objects': gc.get_freeze_count(),
+        'gc_pauses': {
+            **latency_summary([ms for _, ms, _ in pauses]),
+            'full_collections': len(full_pauses),
+            'full_max_ms': round(max(full_pauses), 2) if full_pauses else 0.0,
+        },
+        'governor_collections': list(governor.reports)[-5:],
+    }
+
+
+def queue_stats():
+    """Work waiting in the background writers (receipts are printed synchronously, so there is no print queue)"""
+    from models.database import get_db
+    db = get_db()
+    queues = {'db_writer': db.writer.pending() if db.writer else 0, 'checkout_journal': None}
+    journal_module = sys.modules.get('utils.checkout_journal')
+    if journal_module and journal_module._journal is not None:
+        queues['checkout_journal'] = journal_module._journal.pending_count()
+    return queues
+
+
+def database_files():
+    """Sizes in bytes of the database, its WAL, the checkout journal and the monthly archives, and the archive count"""
+    from models.database import get_db
+    db = get_db()
+    path = Path(db.db_path)
+    archives = list(db.archive_dir.glob("orders-*.db")) if db.archive_dir.exists() else []
+    return {
+        'database': file_size(path),
+        'wal': file_size(f"{path}-wal"),
+        'journal': file_size(path.with_suffix('.journal')),
+        'archives': sum(file_size(archive) for archive in archives),
+    }, len(archives)
+
+
+def file_stats():
+    sizes, archive_count = database_files()
+    return {
+        'database_mb': to_mb(sizes['database']),
+        'wal_mb': to_mb(sizes['wal']),
+        'journal_mb': to_mb(sizes['journal']),
+        'archives': archive_count,
+        'archives_mb': to_mb(sizes['archives']),
+    }
+
+
+_diagnostics = None
+
+
+def get_diagnostics():
+    """Get the global diagnostics collector"""
+    global _diagnostics
+    if _diagnostics is None:
+        _diagnostics = Diagnostics()
+        _diagnostics.install_gc_hook()
+    return _diagnostics
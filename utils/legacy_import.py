@@ -0,0 +1,329 @@
+"""
+Import the legacy app.py order history (historique/data.json) into the database
+
+The legacy file is one JSON object {date: {order_number: [items, time,
+livraisonData]}} that can grow to hundreds of MB. It is parsed
+incrementally, one order at a time, so memory stays bounded. Orders are
+written in batches with executemany on the writer thread; each legacy day
+gets a closed 'legacy' register so the statistics views show it.
+
+The change_log triggers are suspended during the import; afterwards the
+change log is cleared and its sequence bumped once, so open history and
+statistics views reload instead of merging every imported order.
+
+Every imported order carries journal_id 'legacy:<date>:<number>' (unique),
+so a re-run skips what is already there: an interrupted import is resumed
+by simply running it again.
+
+Usage:
+    python -m utils.legacy_import                       # historique/data.json
+    python -m utils.legacy_import path/to/data.json
+"""
+import json
+import os
+from models import get_db
+from utils.cache import invalidate_cache
+import config_lowmem
+
+LEGACY_HISTORY_PATH = os.path.join("historique", "data.json")
+LEGACY_SHIFT = "legacy"
+LEGACY_EMPLOYEE = "Legacy import"
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class JsonObjectStream:
+    """Incrementally read (key, value) pairs of a JSON object from a file
+
+    Only the current chunk and the value being decoded are kept in memory.
+    Values that are themselves objects can be streamed with iter_object().
+    """
+
+    def __init__(self, file, chunk_size=READ_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Read the next chunk; return False at end of file"""
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def _peek(self):
+        """Next non-whitespace character, or '' at end of file"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in ' \t\r\n':
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ''
+
+    def _expect(self, character):
+        if self._peek() != character:
+            raise ValueError(f"Expected '{character}' at offset {self.position} of the current chunk")
+        self.position += 1
+
+    def _value(self):
+        """Decode one complete JSON value, reading more chunks as needed"""
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.position = end
+            return value
+
+    def iter_object(self):
+        """Yield (key, None) for the object's keys, positioned before each value
+
+        The caller must consume the value with value() or iter_object()
+        before asking for the next key.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self.position += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(':')
+            yield key, None
+            separator = self._peek()
+            self.position += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"Expected ',' or '}}' after value of {key!r}")
+
+    def value(self):
+        """Decode the value at the current position"""
+        return self._value()
+
+
+def _price(value):
+    """Parse a legacy price ('12.5dt', '2', 3.0) into a float"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace('dt', '').strip() or 0)
+    except ValueError:
+        return 0.0
+
+
+def legacy_order(date, number, entry):
+    """Map one legacy [items, time, livraisonData] entry to (order, items) tuples
+
+    Legacy item prices are the unit price after discount.
+    """
+    items_data = entry[0] if len(entry) > 0 else []
+    order_time = entry[1] if len(entry) > 1 else "00:00:00"
+    delivery = entry[2] if len(entry) > 2 and isinstance(entry[2], dict) else {}
+
+    items = []
+    total = 0.0
+    for item in items_data:
+        quantity = int(item.get("quantity", 1) or 1)
+        discount = _price(item.get("discount", 0))
+        final_unit = _price(item.get("price", 0))
+        final_price = final_unit * quantity
+        total += final_price
+        items.append((item.get("name", ""), quantity, final_unit + discount, discount,
+                      final_price, item.get("description", "") or ""))
+
+    delivery_price = _price(delivery.get("price", 0))
+    is_delivery = bool(delivery.get("place") or delivery.get("num") or delivery_price)
+    total += delivery_price
+
+    order = {
+        'order_number': int(number),
+        'order_date': date,
+        'order_time': order_time,
+        'total_amount': total,
+        'is_delivery': int(is_delivery),
+        'delivery_address': delivery.get("place", "") or None,
+        'delivery_phone': delivery.get("num", "") or None,
+        'delivery_price': delivery_price,
+        'journal_id': f"legacy:{date}:{number}",
+    }
+    return order, items
+
+
+def iter_legacy_orders(path):
+    """Stream (order, items) from a legacy history file"""
+    with open(path, "r", encoding="utf-8") as f:
+        stream = JsonObjectStream(f)
+        for date, _ in stream.iter_object():
+            for number, _ in stream.iter_object():
+                entry = stream.value()
+                try:
+                    yield legacy_order(date, number, entry)
+                except (TypeError, ValueError, AttributeError) as e:
+                    print(f"Legacy import: skipping order {date} #{number}: {e}")
+
+
+def _legacy_register(connection, date):
+    """Get or create the closed register holding a legacy day's orders"""
+    row = connection.execute(
+        "SELECT id FROM registers WHERE shift_type = ? AND opened_at = ?",
+        (LEGACY_SHIFT, f"{date} 00:00:00")
+    ).fetchone()
+    if row:
+        return row['id']
+    cursor = connection.execute(
+        """INSERT INTO registers (shift_type, employee_name, opening_amount, closing_amount,
+           opened_at, closed_at, is_open, notes) VALUES (?, ?, 0, 0, ?, ?, 0, ?)""",
+        (LEGACY_SHIFT, LEGACY_EMPLOYEE, f"{date} 00:00:00", f"{date} 23:59:59",
+         "Imported from historique/data.json")
+    )
+    return cursor.lastrowid
+
+
+def _suspend_change_log(connection):
+    """Drop the change_log triggers for the import (initialize_schema() recreates them)"""
+    for (name,) in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%_log'"
+    ).fetchall():
+        connection.execute(f"DROP TRIGGER {name}")
+    connection.commit()
+
+
+def _reset_change_log(connection):
+    """Replace the change log by a single entry after a gap in the sequence (writer thread)
+
+    Views holding an older change sequence then find it no longer covered
+    (Database.changes_since returns None) and reload once, instead of
+    merging every imported order.
+    """
+    try:
+        connection.execute("DELETE FROM change_log")
+        connection.execute(
+            """INSERT INTO change_log (seq, table_name, row_id, op)
+               VALUES ((SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'change_log') + 2,
+                       'legacy_import', 0, 'I')"""
+        )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+
+def _write_batch(connection, batch):
+    """Insert a batch of new legacy orders and their items in one transaction (writer thread)"""
+    try:
+        registers = {}
+        for order, _ in batch:
+            date = order['order_date']
+            if date not in registers:
+                registers[date] = _legacy_register(connection, date)
+
+        fields = list(batch[0][0]) + ['register_id']
+        connection.executemany(
+            f"""INSERT OR IGNORE INTO orders ({', '.join(fields)})
+                VALUES ({', '.join('?' for _ in fields)})""",
+            [list(order.values()) + [registers[order['order_date']]] for order, _ in batch]
+        )
+
+        journal_ids = [order['journal_id'] for order, _ in batch]
+        order_ids = {
+            row['journal_id']: row['id'] for row in connection.execute(
+                f"SELECT id, journal_id FROM orders WHERE journal_id IN ({', '.join('?' for _ in journal_ids)})",
+                journal_ids
+            )
+        }
+        connection.executemany(
+            """INSERT INTO order_items (order_id, product_name, quantity, unit_price, discount, final_price, notes)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            [(order_ids[order['journal_id']],) + item for order, items in batch for item in items]
+        )
+
+        # Keep each legacy register's totals in line with its orders
+        connection.executemany(
+            """UPDATE registers SET
+                   closing_amount = (SELECT COALESCE(SUM(total_amount), 0) FROM orders WHERE register_id = registers.id),
+                   last_order_number = (SELECT COALESCE(MAX(order_number), 0) FROM orders WHERE register_id = registers.id)
+               WHERE id = ?""",
+            [(register_id,) for register_id in registers.values()]
+        )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return len(batch)
+
+
+def _existing_journal_ids(db, batch):
+    """journal_ids of a batch that are already imported (live or archived)"""
+    journal_ids = [order['journal_id'] for order, _ in batch]
+    dates = [order['order_date'] for order, _ in batch]
+    rows = db.iter_archived_rows(
+        f"SELECT journal_id FROM {{orders}} WHERE journal_id IN ({', '.join('?' for _ in journal_ids)})",
+        journal_ids, min(dates), max(dates)
+    )
+    return {row['journal_id'] for row in rows}
+
+
+def import_legacy_history(path=LEGACY_HISTORY_PATH, batch_size=None):
+    """Import a legacy history file; returns {'imported', 'skipped'} counts"""
+    if not os.path.exists(path):
+        print(f"Legacy history not found: {path}")
+        return None
+
+    db = get_db()
+    batch_size = batch_size or config_lowmem.BATCH_SIZE
+    counts = {'imported': 0, 'skipped': 0}
+
+    def flush(batch):
+        existing = _existing_journal_ids(db, batch)
+        new_orders = {}
+        for order, items in batch:
+            if order['journal_id'] not in existing:
+                new_orders[order['journal_id']] = (order, items)
+        new_orders = list(new_orders.values())
+        counts['skipped'] += len(batch) - len(new_orders)
+        if new_orders:
+            counts['imported'] += db.submit_write(_write_batch, new_orders).result()
+
+    # Imported rows are not logged one by one; the change sequence is bumped once at the end
+    db.submit_write(_suspend_change_log).result()
+    try:
+        batch = []
+        for order, items in iter_legacy_orders(path):
+            batch.append((order, items))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    finally:
+        # Recreate the change_log triggers
+        db.initialize_schema()
+        if counts['imported']:
+            db.submit_write(_reset_change_log).result()
+
+    invalidate_cache('Order')
+    invalidate_cache('Register')
+    return counts
+
+
+if __name__ == "__main__":
+    import sys
+
+    result = import_legacy_history(sys.argv[1] if len(sys.argv) > 1 else LEGACY_HISTORY_PATH)
+    if result is None:
+        sys.exit(1)
+    print(f"Legacy import: {result['imported']} orders imported, {result['skipped']} already present")
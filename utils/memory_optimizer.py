@@ -1,8 +1,21 @@
 """
 Memory optimization utilities for low-spec systems
+
+MemoryGovernor replaces a fixed full garbage collection every few
+minutes: it samples the process's resident memory and only runs a full
+collection while the till is idle, or when memory is over budget, in
+which case the query and image caches are shrunk first.
 """
 import gc
+import os
 import sys
+import time
+from collections import deque
+import config_lowmem
+from utils.cache import get_cache
+
+PRESSURE_MIN_GAP_SECONDS = 60
+PRESSURE_MIN_FREED_MB = 5
 
 
 class MemoryOptimizer:
@@ -15,14 +28,21 @@ class MemoryOptimizer:
 
     @staticmethod
     def get_memory_usage():
-        """Get approximate memory usage in MB"""
+        """Resident memory of this process in MB (0.0 if it cannot be measured)"""
         try:
             import psutil
-            process = psutil.Process()
-            return process.memory_info().rss / 1024 / 1024  # Convert to MB
+            return psutil.Process().memory_info().rss / 1024 / 1024  # Convert to MB
         except ImportError:
-            # psutil not available, return estimate
-            return sys.getsizeof(gc.get_objects()) / 1024 / 1024
+            pass
+        try:
+            # Linux: resident pages are the second field of /proc/self/statm
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+        except (OSError, ValueError, AttributeError):
+            pass
+        if sys.platform == 'win32':
+            return _windows_working_set_mb()
+        return 0.0
 
     @staticmethod
     def optimize_for_low_memory():
@@ -36,30 +56,23 @@ class MemoryOptimizer:
 
     @staticmethod
     def clear_unused_cache():
-        """Clear Python's internal caches"""
-        # Clear method cache
-        if hasattr(sys, 'getrefcount'):
-            gc.collect()
-
-        # Clear import cache for unused modules
-        modules_to_clear = []
-        for module_name in list(sys.modules.keys()):
-            # Don't clear core modules
-            if module_name.startswith('_') or module_name in ['sys', 'gc', 'os']:
-                continue
-
-            module = sys.modules.get(module_name)
-            if module and hasattr(module, '__file__'):
-                ref_count = sys.getrefcount(module)
-                # If only referenced by sys.modules and this function
-                if ref_count <= 3:
-                    modules_to_clear.append(module_name)
-
-        for module_name in modules_to_clear:
-            try:
-                del sys.modules[module_name]
-            except:
-                pass
+        """Drop expired query cache entries and collect garbage
+
+        Loaded modules are left alone: the views are imported on first use
+        and removing modules from sys.modules only forces them to load again.
+        """
+        get_cache().remove_expired()
+        gc.collect()
+
+    @staticmethod
+    def freeze_startup_objects():
+        """Move everything allocated so far out of the collector's reach
+
+        Objects created at startup (modules, classes, widgets) live for the
+        whole session; freezing them makes later full collections shorter.
+        """
+        gc.collect()
+        gc.freeze()
 
     @staticmethod
     def periodic_cleanup():
@@ -69,6 +82,113 @@ class MemoryOptimizer:
         gc.collect(2)
 
 
+
+
+class MemoryGovernor:
+    """Decides when to collect garbage and shrink caches, and reports what was freed"""
+
+    def __init__(self, optimizer=None, budget_mb=None, idle_seconds=None, collect_interval_minutes=None):
+        self.optimizer = optimizer or _optimizer
+        self.budget_mb = budget_mb or config_lowmem.MEMORY_BUDGET_MB
+        self.idle_seconds = idle_seconds or config_lowmem.MEMORY_IDLE_SECONDS
+        self.collect_interval = (collect_interval_minutes or config_lowmem.MEMORY_COLLECT_INTERVAL_MINUTES) * 60
+        self.last_collection = None  # time.monotonic() of the last full collection
+        self.last_rss_mb = None
+        self.reports = deque(maxlen=20)  # Most recent collections, newest last
+
+    def check(self, idle_seconds):
+        """Sample memory and collect if over budget, or idle and due; returns a report or None"""
+        self.last_rss_mb = self.optimizer.get_memory_usage()
+        since_last = time.monotonic() - self.last_collection if self.last_collection else float('inf')
+        if self.last_rss_mb > self.budget_mb and since_last >= self.pressure_gap():
+            return self.collect('pressure', shrink_caches=True)
+        if idle_seconds >= self.idle_seconds and since_last >= self.collect_interval:
+            return self.collect('idle')
+        return None
+
+    def pressure_gap(self):
+        """Seconds between collections while over budget
+
+        Once a minute, but if the last one freed almost nothing (memory the
+        process keeps rather than garbage) wait the normal interval instead
+        of stalling the UI for nothing.
+        """
+        last = self.reports[-1] if self.reports else None
+        if last and last['reason'] == 'pressure' and last['freed_mb'] < PRESSURE_MIN_FREED_MB:
+            return self.collect_interval
+        return PRESSURE_MIN_GAP_SECONDS
+
+    def collect(self, reason, shrink_caches=False):
+        """Run a full collection (after shrinking caches under pressure) and record what it freed"""
+        start = time.perf_counter()
+        before = self.optimizer.get_memory_usage()
+        cache = get_cache()
+        cache_entries = cache.remove_expired() if config_lowmem.AUTO_CLEAR_OLD_CACHE else 0
+        pixmaps_cleared = False
+        if shrink_caches:
+            cache_entries += cache.shrink(cache.max_size // 2)
+            pixmaps_cleared = _clear_pixmap_cache()
+        objects = gc.collect()
+        after = self.optimizer.get_memory_usage()
+        self.last_collection = time.monotonic()
+        self.last_rss_mb = after
+
+        report = {
+            'time': time.strftime('%H:%M:%S'),
+            'reason': reason,
+            'rss_before_mb': round(before, 1),
+            'rss_after_mb': round(after, 1),
+            'freed_mb': round(before - after, 1),
+            'objects_collected': objects,
+            'cache_entries_dropped': cache_entries,
+            'pixmap_cache_cleared': pixmaps_cleared,
+            'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+        }
+        self.reports.append(report)
+        if reason == 'pressure':
+            print(f"Memory over budget ({before:.0f} MB > {self.budget_mb} MB): freed {before - after:.1f} MB, "
+                  f"{objects} objects, {cache_entries} cached queries")
+        return report
+
+
+def _clear_pixmap_cache():
+    """Empty Qt's pixmap cache (product thumbnails are decoded again as needed)"""
+    qt_gui = sys.modules.get('PyQt5.QtGui')  # No pixmaps if Qt is not loaded (headless tools)
+    if qt_gui is None:
+        return False
+    qt_gui.QPixmapCache.clear()
+    return True
+
+
+def _windows_working_set_mb():
+    """Working set of this process on Windows, without psutil"""
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ('cb', wintypes.DWORD),
+            ('PageFaultCount', wintypes.DWORD),
+            ('PeakWorkingSetSize', ctypes.c_size_t),
+            ('WorkingSetSize', ctypes.c_size_t),
+            ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+            ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+            ('PagefileUsage', ctypes.c_size_t),
+            ('PeakPagefileUsage', ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.WorkingSetSize / 1024 / 1024
+    except (AttributeError, OSError):
+        pass
+    return 0.0
+
 # Global optimizer instance
 _optimizer = MemoryOptimizer()
 
@@ -76,3 +196,14 @@ _optimizer = MemoryOptimizer()
 def get_optimizer():
     """Get the memory optimizer instance"""
     return _optimizer
+
+
+_governor = None
+
+
+def get_governor():
+    """Get the memory governor instance"""
+    global _governor
+    if _governor is None:
+        _governor = MemoryGovernor()
+    return _governor
@@ -0,0 +1,189 @@
+"""
+Local metrics endpoint in the Prometheus text format
+
+With METRICS_ENABLED, a background thread serves GET /metrics on
+METRICS_HOST:METRICS_PORT, so a Prometheus on the shop network (or a
+curl loop) can watch several tills from one place. It binds to localhost
+by default; set METRICS_HOST = "0.0.0.0" to allow scraping from the LAN.
+Only counters already kept for Settings > Diagnostics are read; the UI
+thread is never involved.
+
+    curl http://localhost:9464/metrics
+"""
+import http.server
+import logging
+import sys
+import threading
+from datetime import datetime
+import config_lowmem
+from utils import spans
+from utils.diagnostics import database_files, get_diagnostics, queue_stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+logger = logging.getLogger('pos.metrics')
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsWriter:
+    """Builds an exposition-format page, one metric family at a time"""
+
+    def __init__(self):
+        self.lines = []
+
+    def add(self, name, kind, help_text, samples):
+        """Add a family; samples is a list of (labels dict, value) or a single value"""
+        if not isinstance(samples, list):
+            samples = [({}, samples)]
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.sample(name, labels, value)
+
+    def sample(self, name, labels, value):
+        if labels:
+            label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels.items())
+            self.lines.append(f"{name}{{{label_text}}} {value}")
+        else:
+            self.lines.append(f"{name} {value}")
+
+    def histogram(self, name, help_text, histograms):
+        """Add a histogram family from spans.export() entries {label value: (bucket counts, count, total ms)}"""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for span_name, (counts, count, total_ms) in histograms.items():
+            cumulative = 0
+            for bound_ms, bucket_count in zip(spans.BUCKETS_MS, counts):
+                cumulative += bucket_count
+                self.sample(f"{name}_bucket", {'span': span_name, 'le': bound_ms / 1000}, cumulative)
+            self.sample(f"{name}_bucket", {'span': span_name, 'le': '+Inf'}, count)
+            self.sample(f"{name}_sum", {'span': span_name}, round(total_ms / 1000, 6))
+            self.sample(f"{name}_count", {'span': span_name}, count)
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+
+def register_open_seconds():
+    """Seconds since the open register was opened (0 when none is open)"""
+    from models import Register
+    register = Register.get_current_register()
+    if not register or not register.opened_at:
+        return 0
+    try:
+        opened = datetime.strptime(register.opened_at, "%Y/%m/%d %H:%M:%S")
+    except ValueError:
+        return 0
+    return int((datetime.now() - opened).total_seconds())
+
+
+def render_metrics():
+    """All metrics as an exposition-format page"""
+    from utils.cache import get_cache
+    from utils.memory_optimizer import get_optimizer
+    diagnostics = get_diagnostics()
+    metrics = MetricsWriter()
+
+    metrics.add("pos_checkouts_total", "counter", "Checkouts completed since the POS started.",
+                diagnostics.checkout_count)
+    metrics.add("pos_orders_per_minute", "gauge", "Average checkouts per minute over the last 5 minutes.",
+                diagnostics.orders_per_minute())
+    metrics.add("pos_print_failures_total", "counter", "Receipts that could not be printed.",
+                diagnostics.print_failures)
+    queues = queue_stats()
+    metrics.add("pos_write_queue_depth", "gauge",
+                "Writes waiting for the database writer thread and the checkout journal (receipts print synchronously).",
+                [({'queue': name}, depth or 0) for name, depth in queues.items()])
+    metrics.add("pos_register_open_seconds", "gauge", "Age of the open register (0 when none is open).",
+                register_open_seconds())
+
+    cache = get_cache().stats()
+    metrics.add("pos_query_cache_hits_total", "counter", "Query cache hits.", cache['hits'])
+    metrics.add("pos_query_cache_misses_total", "counter", "Query cache misses.", cache['misses'])
+    metrics.add("pos_query_cache_entries", "gauge", "Entries in the query cache.", cache['size'])
+    metrics.add("pos_query_cache_hit_ratio", "gauge", "Query cache hits per lookup since startup.",
+                cache['hit_ratio'] or 0)
+
+    sizes, archive_count = database_files()
+    metrics.add("pos_database_size_bytes", "gauge", "Size of the database files.",
+                [({'file': name}, size) for name, size in sizes.items()])
+    metrics.add("pos_archive_files", "gauge", "Monthly order archives.", archive_count)
+    metrics.add("process_resident_memory_bytes", "gauge", "Resident memory of the POS process.",
+                int(get_optimizer().get_memory_usage() * 1024 * 1024))
+    metrics.add("process_start_time_seconds", "gauge", "Start time of the POS process since the epoch.",
+                round(diagnostics.started, 3))
+
+    detector_module = sys.modules.get('utils.stall_detector')
+    if detector_module and detector_module._detector is not None:
+        metrics.add("pos_ui_stalls_total", "counter", "Times the UI thread did not respond within the stall threshold.",
+                    detector_module._detector.count)
+
+    metrics.histogram("pos_span_duration_seconds",
+                      "Duration of timed operations (checkout: span=\"OrderController.checkout\").",
+                      spans.export())
+    return metrics.text()
+
+
+class MetricsHandler(http.server.BaseHTTPRequestHandler):
+    """Serves /metrics; everything else is 404"""
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        try:
+            body = render_metrics().encode('utf-8')
+        except Exception as e:
+            logger.warning("Metrics error: %s", e)
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s " + format, self.address_string(), *args)
+
+
+class MetricsServer:
+    """HTTP server for /metrics on a background thread"""
+
+    def __init__(self, host=None, port=None):
+        self.address = (host or config_lowmem.METRICS_HOST, port if port is not None else config_lowmem.METRICS_PORT)
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """Start serving; returns False if the port cannot be bound"""
+        try:
+            self.server = http.server.HTTPServer(self.address, MetricsHandler)
+        except OSError as e:
+            print(f"Metrics endpoint not started on {self.address[0]}:{self.address[1]}: {e}")
+            return False
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics', daemon=True)
+        self.thread.start()
+        print(f"Metrics endpoint: http://{self.address[0]}:{self.server.server_port}/metrics")
+        return True
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+_server = None
+
+
+def start_metrics_server():
+    """Start the global metrics endpoint (once)"""
+    global _server
+    if _server is None:
+        _server = MetricsServer()
+        if not _server.start():
+            _server = None
+    return _server
@@ -6,77 +6,163 @@ import os
 from models import Category, Product, get_db
 
 
-def migrate_from_json(json_path="menu.json"):
-    """Migrate menu data from JSON file to database"""
+def _menu_rows(categories_list):
+    """Flatten menu.json categories into {category: is_active} and {(category, product): row}"""
+    categories = {}
+    products = {}
+    for category_data in categories_list:
+        category_name = category_data.get("name", "").strip()
+        if not category_name:
+            continue
+        categories[category_name] = category_data.get("status", "Active") == "Active"
+
+        for product_data in category_data.get("products", []):
+            product_name = product_data.get("name", "").strip()
+            if not product_name:
+                continue
+            try:
+                price = float(product_data.get("price", 0.0))
+            except (TypeError, ValueError):
+                print(f"  Skipping product {category_name} / {product_name}: invalid price")
+                continue
+            products[(category_name, product_name)] = (
+                price,
+                product_data.get("image", ""),
+                product_data.get("status", "Active") == "Active",
+            )
+    return categories, products
+
+
+def _apply_menu(connection, categories, products, deactivate_missing):
+    """Diff the menu against the catalog and apply it in one transaction (runs on the writer thread)"""
+    summary = {key: 0 for key in (
+        'categories_added', 'categories_updated', 'categories_deactivated',
+        'products_added', 'products_updated', 'products_deactivated', 'products_unchanged',
+    )}
+
+    try:
+        current_categories = {
+            row['name']: (row['id'], bool(row['is_active']))
+            for row in connection.execute("SELECT id, name, is_active FROM categories")
+        }
+
+        # Categories: insert new ones, update status of existing ones
+        new_categories = [(name, int(active)) for name, active in categories.items() if name not in current_categories]
+        changed_categories = [
+            (int(active), current_categories[name][0]) for name, active in categories.items()
+            if name in current_categories and current_categories[name][1] != active
+        ]
+        missing_categories = []
+        if deactivate_missing:
+            missing_categories = [
+                (category_id,) for name, (category_id, active) in current_categories.items()
+                if name not in categories and active
+            ]
+        connection.executemany("INSERT INTO categories (name, is_active) VALUES (?, ?)", new_categories)
+        connection.executemany("UPDATE categories SET is_active = ? WHERE id = ?", changed_categories)
+        connection.executemany("UPDATE categories SET is_active = 0 WHERE id = ?", missing_categories)
+        summary['categories_added'] = len(new_categories)
+        summary['categories_updated'] = len(changed_categories)
+        summary['categories_deactivated'] = len(missing_categories)
+
+        category_ids = {row['name']: row['id'] for row in connection.execute("SELECT id, name FROM categories")}
+        category_names = {category_id: name for name, category_id in category_ids.items()}
+
+        # Products are matched on (category name, product name); older duplicate rows are deactivated
+        current_products = {}
+        duplicates = []
+        for row in connection.execute(
+            "SELECT id, category_id, name, price, image_path, is_active FROM products ORDER BY id"
+        ):
+            key = (category_names.get(row['category_id']), row['name'])
+            if key in current_products:
+                if row['is_active']:
+                    duplicates.append((row['id'],))
+                continue
+            current_products[key] = (row['id'], row['price'], row['image_path'] or '', bool(row['is_active']))
+
+        inserts = []
+        updates = []
+        for (category_name, product_name), (price, image_path, active) in products.items():
+            current = current_products.get((category_name, product_name))
+            if current is None:
+                inserts.append((category_ids[category_name], product_name, price, image_path, int(active)))
+            elif current[1:] != (price, image_path, active):
+                updates.append((price, image_path, int(active), current[0]))
+            else:
+                summary['products_unchanged'] += 1
+
+        missing_products = duplicates
+        if deactivate_missing:
+            missing_products = duplicates + [
+                (product_id,) for key, (product_id, _, _, active) in current_products.items()
+                if key not in products and active
+            ]
+
+        connection.executemany(
+            "INSERT INTO products (category_id, name, price, image_path, is_active) VALUES (?, ?, ?, ?, ?)",
+            inserts
+        )
+        connection.executemany(
+            "UPDATE products SET price = ?, image_path = ?, is_active = ? WHERE id = ?", updates
+        )
+        connection.executemany("UPDATE products SET is_active = 0 WHERE id = ?", missing_products)
+        summary['products_added'] = len(inserts)
+        summary['products_updated'] = len(updates)
+        summary['products_deactivated'] = len(missing_products)
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return summary
+
+
+def import_menu(json_path="menu.json", deactivate_missing=True):
+    """Import menu.json into the catalog
+
+    The menu is diffed against the current categories and products (matched
+    by name): new items are inserted, changed prices/images/status updated,
+    and items no longer in the menu deactivated (never deleted, old orders
+    keep their names). Everything is applied in one transaction, so the
+    import can be re-run safely.
+
+    Returns a dict of counts, or None if the file could not be read.
+    """
     if not os.path.exists(json_path):
         print(f"JSON file not found: {json_path}")
-        return False
+        return None
 
     try:
         with open(json_path, "r", encoding="utf-8") as f:
             data = json.load(f)
     except Exception as e:
         print(f"Error reading JSON file: {e}")
-        return False
+        return None
 
-    # Initialize database
-    db = get_db()
-
-    print("Starting migration...")
-
-    # Check if data has "categories" key (new format)
-    categories_list = data.get("categories", [])
-
-    if not categories_list:
+    categories, products = _menu_rows(data.get("categories", []))
+    if not categories:
         print("No categories found in JSON file")
-        return False
-
-    # Iterate through categories
-    for category_data in categories_list:
-        category_name = category_data.get("name", "")
-        if not category_name:
-            continue
-
-        is_active = category_data.get("status", "Active") == "Active"
-
-        # Create or get category
-        category = Category.get_by_name(category_name)
-        if not category:
-            category = Category(name=category_name, is_active=is_active)
-            category.save()
-            print(f"Created category: {category_name}")
-        else:
-            print(f"Category already exists: {category_name}")
+        return None
 
-        # Get products list
-        products_list = category_data.get("products", [])
+    return get_db().submit_write(_apply_menu, categories, products, deactivate_missing).result()
 
-        # Iterate through products
-        for product_data in products_list:
-            product_name = product_data.get("name", "")
-            if not product_name:
-                continue
 
-            try:
-                is_product_active = product_data.get("status", "Active") == "Active"
-                price = float(product_data.get("price", 0.0))
-                image_path = product_data.get("image", "")
-
-                # Create product
-                product = Product(
-                    category_id=category.id,
-                    name=product_name,
-                    price=price,
-                    image_path=image_path,
-                    is_active=is_product_active
-                )
-                product.save()
-                print(f"  Created product: {product_name} ({price}dt)")
-
-            except Exception as e:
-                print(f"  Error creating product {product_name}: {e}")
-                continue
+def migrate_from_json(json_path="menu.json"):
+    """Migrate menu data from JSON file to database"""
+    print("Starting migration...")
+    try:
+        summary = import_menu(json_path)
+    except Exception as e:
+        print(f"Error importing menu: {e}")
+        return False
+    if summary is None:
+        return False
 
+    print(f"Categories: {summary['categories_added']} added, {summary['categories_updated']} updated, "
+          f"{summary['categories_deactivated']} deactivated")
+    print(f"Products: {summary['products_added']} added, {summary['products_updated']} updated, "
+          f"{summary['products_deactivated']} deactivated, {summary['products_unchanged']} unchanged")
     print("Migration completed!")
     return True
 
@@ -2,6 +2,7 @@
 Receipt printing utilities
 """
 import config
+from utils.spans import timed
 
 try:
     import win32print
@@ -11,6 +12,7 @@ except ImportError:
     print("Warning: win32print not available. Printing disabled.")
 
 
+@timed()
 def print_customer_receipt(order):
     """Print customer receipt"""
     if not config.ENABLE_PRINTING or not PRINTING_AVAILABLE:
@@ -98,6 +100,7 @@ def print_customer_receipt(order):
         print(f"Error printing customer receipt: {e}")
 
 
+@timed()
 def print_kitchen_receipt(order):
     """Print kitchen receipt"""
     if not config.ENABLE_PRINTING or not PRINTING_AVAILABLE:
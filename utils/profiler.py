@@ -0,0 +1,167 @@
+"""
+On-demand profiling of the running POS
+
+A capture runs cProfile on the UI thread together with a sampling thread
+that records the UI thread's stack every PROFILE_SAMPLE_MS. It lasts N
+seconds, or until the next checkout or screen opening, and writes to
+data/profiles/:
+
+- profile-<time>-<trigger>.prof    pstats data (python -m pstats, snakeviz)
+- profile-<time>-<trigger>.txt     the 40 functions with the most cumulative time
+- profile-<time>-<trigger>.folded  collapsed stacks for flamegraph.pl / speedscope
+
+Started with PROFILE_HOTKEY (Ctrl+Shift+P) on the order screen or from
+Settings > Diagnostics.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from PyQt5.QtCore import QTimer
+import config
+import config_lowmem
+
+PROFILES_DIR = Path(config.DATABASE_PATH).parent / "profiles"
+SCREEN_SETTLE_MS = 1000  # A screen capture also covers the data the screen loads in the background
+logger = logging.getLogger('pos.profiler')
+
+
+def frame_stack(frame):
+    """Collapsed-stack entry of a frame: "file:function;..." from the outermost call"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class ProfileCapture:
+    """One profiling session at a time, stopped by a timer, a checkout or a screen opening"""
+
+    def __init__(self):
+        self.ui_thread_id = threading.get_ident()
+        self.running = False
+        self.trigger = None
+        self.until = None  # 'checkout' or 'screen' when stopped by that event
+        self.last_files = []
+        self._profile = None
+        self._samples = Counter()
+        self._sampling = threading.Event()
+        self._sampler = None
+        self._started = None
+        self._session = 0  # Timers of an earlier capture must not stop a later one
+
+    def start(self, seconds=None, until=None):
+        """Start a capture for seconds, or until the next 'checkout' or 'screen'; False if one is running"""
+        if self.running:
+            return False
+        self.ui_thread_id = threading.get_ident()  # Called on the UI thread
+        self.running = True
+        self.until = until
+        self.trigger = until or f"{seconds}s"
+        self._started = datetime.now()
+        self._session += 1
+        session = self._session
+
+        self._profile = cProfile.Profile()
+        try:
+            self._profile.enable()
+        except ValueError as e:  # Another profiler (e.g. a debugger) is active: keep the samples only
+            print(f"cProfile unavailable, sampling only: {e}")
+            self._profile = None
+
+        self._samples = Counter()
+        self._sampling.set()
+        self._sampler = threading.Thread(target=self._sample, name='profiler-sampler', daemon=True)
+        self._sampler.start()
+
+        limit = seconds or config_lowmem.PROFILE_MAX_SECONDS
+        QTimer.singleShot(int(limit * 1000), lambda: self._session == session and self.stop())
+        logger.warning("Profiling started (%s)", self.trigger)
+        return True
+
+    def notify(self, event):
+        """A checkout or screen opening happened: stop the capture waiting for it"""
+        if not self.running or self.until != event:
+            return
+        if event == 'screen':
+            session = self._session
+            QTimer.singleShot(SCREEN_SETTLE_MS, lambda: self._session == session and self.stop())
+            self.until = None  # Later screen openings are part of this capture
+        else:
+            self.stop()
+
+    def _sample(self):
+        """Sampler thread: count the UI thread's stacks"""
+        interval = config_lowmem.PROFILE_SAMPLE_MS / 1000
+        while self._sampling.is_set():
+            frame = sys._current_frames().get(self.ui_thread_id)
+            if frame is not None:
+                self._samples[frame_stack(frame)] += 1
+            time.sleep(interval)
+
+    def stop(self):
+        """Stop the capture and write its files; returns their paths"""
+        if not self.running:
+            return []
+        if self._profile:
+            self._profile.disable()
+        self._sampling.clear()
+        self._sampler.join()
+        self.running = False
+        self._session += 1
+
+        try:
+            self.last_files = self.write(PROFILES_DIR / f"profile-{self._started:%Y%m%d-%H%M%S}-{self.trigger}")
+        except OSError as e:
+            print(f"Error writing profile: {e}")
+            self.last_files = []
+        self._profile = None
+        logger.warning("Profile written: %s", ", ".join(str(path) for path in self.last_files))
+        return self.last_files
+
+    def write(self, base):
+        """Write the .prof, .txt and .folded files for a base path"""
+        base.parent.mkdir(parents=True, exist_ok=True)
+        files = []
+        if self._profile:
+            prof_path = base.with_suffix('.prof')
+            self._profile.dump_stats(prof_path)
+            summary = io.StringIO()
+            pstats.Stats(self._profile, stream=summary).sort_stats('cumulative').print_stats(40)
+            txt_path = base.with_suffix('.txt')
+            txt_path.write_text(summary.getvalue(), encoding='utf-8')
+            files += [prof_path, txt_path]
+        folded_path = base.with_suffix('.folded')
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, count in self._samples.most_common():
+                f.write(f"{stack} {count}\n")
+        files.append(folded_path)
+        return files
+
+    def status(self):
+        """Whether a capture is running, and the files of the last one"""
+        return {
+            'running': self.running,
+            'trigger': self.trigger if self.running else None,
+            'last_files': [str(path) for path in self.last_files],
+        }
+
+
+_capture = None
+
+
+def get_profiler():
+    """Get the global profile capture (create it on the UI thread)"""
+    global _capture
+    if _capture is None:
+        _capture = ProfileCapture()
+    return _capture
@@ -0,0 +1,146 @@
+"""
+Runtime performance profiles
+
+config_lowmem.py holds the settings every module reads; they are tuned
+for 2GB tills (the "lowmem" profile). apply_profile() overrides them at
+startup with the PROFILE_OVERRIDES of the chosen profile, then pushes the
+values that are read only once (query cache size, logging) to where they
+are used. Everything else reads config_lowmem at call time.
+"""
+import logging
+import logging.handlers
+import os
+import sys
+from pathlib import Path
+import config
+import config_lowmem
+
+PROFILE_NAMES = tuple(config_lowmem.PROFILE_OVERRIDES)
+_active = {'name': 'lowmem', 'source': 'default', 'ram_gb': None, 'overrides': {}}
+# config_lowmem values of every overridable setting, so a profile can be applied again
+_base = {
+    setting: getattr(config_lowmem, setting)
+    for overrides in config_lowmem.PROFILE_OVERRIDES.values()
+    for setting in overrides
+}
+
+
+def total_ram_gb():
+    """Installed RAM in GB, or None if it cannot be determined"""
+    try:
+        import psutil
+        return psutil.virtual_memory().total / 1024 ** 3
+    except ImportError:
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) / 1024 ** 2  # kB
+    except (OSError, ValueError):
+        pass
+    if sys.platform == 'win32':
+        import ctypes
+
+        class MemoryStatusEx(ctypes.Structure):
+            _fields_ = [
+                ('dwLength', ctypes.c_ulong),
+                ('dwMemoryLoad', ctypes.c_ulong),
+                ('ullTotalPhys', ctypes.c_ulonglong),
+                ('ullAvailPhys', ctypes.c_ulonglong),
+                ('ullTotalPageFile', ctypes.c_ulonglong),
+                ('ullAvailPageFile', ctypes.c_ulonglong),
+                ('ullTotalVirtual', ctypes.c_ulonglong),
+                ('ullAvailVirtual', ctypes.c_ulonglong),
+                ('ullAvailExtendedVirtual', ctypes.c_ulonglong),
+            ]
+
+        status = MemoryStatusEx()
+        status.dwLength = ctypes.sizeof(status)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys / 1024 ** 3
+    return None
+
+
+def profile_for_ram(ram_gb):
+    """Profile "auto" picks for an amount of RAM"""
+    if ram_gb is None:
+        return 'lowmem'  # Unknown: assume the smallest till
+    for name, limit in config_lowmem.AUTO_PROFILE_MAX_RAM_GB.items():
+        if ram_gb < limit:
+            return name
+    return 'high-throughput'
+
+
+def profile_from_args(argv):
+    """Take --profile NAME (or --profile=NAME) out of argv; returns (name or None, remaining argv)"""
+    remaining = []
+    name = None
+    args = iter(argv)
+    for arg in args:
+        if arg == '--profile':
+            name = next(args, None)
+        elif arg.startswith('--profile='):
+            name = arg.split('=', 1)[1]
+        else:
+            remaining.append(arg)
+    return name, remaining
+
+
+def apply_profile(name=None):
+    """Apply a profile (None: PERFORMANCE_PROFILE, "auto": by RAM); returns the active profile info"""
+    global _active
+    source = 'command line' if name else 'config_lowmem.py'
+    name = name or config_lowmem.PERFORMANCE_PROFILE
+    ram_gb = total_ram_gb()
+    if name == 'auto':
+        name = profile_for_ram(ram_gb)
+        source = 'auto' + (f" ({ram_gb:.1f} GB RAM)" if ram_gb else " (RAM unknown)")
+    if name not in config_lowmem.PROFILE_OVERRIDES:
+        print(f"Unknown profile '{name}', using lowmem (choose from {', '.join(PROFILE_NAMES)})")
+        name, source = 'lowmem', 'default'
+
+    overrides = config_lowmem.PROFILE_OVERRIDES[name]
+    for setting, value in {**_base, **overrides}.items():
+        setattr(config_lowmem, setting, value)
+    _active = {'name': name, 'source': source, 'ram_gb': ram_gb, 'overrides': dict(overrides)}
+
+    from utils.cache import get_cache
+    get_cache().configure(config_lowmem.CACHE_MAX_SIZE, config_lowmem.CACHE_TTL_SECONDS)
+    configure_logging()
+    return _active
+
+
+def active_profile():
+    """Name, source, detected RAM and overrides of the profile in use"""
+    return _active
+
+
+def configure_logging():
+    """Set up the logging module from LOG_LEVEL and LOG_TO_FILE (data/pos.log, rotated)"""
+    handlers = [logging.StreamHandler()]
+    if config_lowmem.LOG_TO_FILE:
+        log_path = Path(config.DATABASE_PATH).parent / "pos.log"
+        os.makedirs(log_path.parent, exist_ok=True)
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_path, maxBytes=config_lowmem.LOG_FILE_MAX_MB * 1024 * 1024,
+            backupCount=config_lowmem.LOG_FILE_COUNT, encoding='utf-8'
+        ))
+    # Replace the handlers of an earlier call (basicConfig's force=True needs Python 3.8)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    logging.basicConfig(
+        level=getattr(logging, str(config_lowmem.LOG_LEVEL).upper(), logging.WARNING),
+        format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+        handlers=handlers,
+    )
+
+
+def apply_qt_settings(app):
+    """Qt settings that depend on the profile (call once the QApplication exists)"""
+    from PyQt5.QtCore import Qt
+    for effect in (Qt.UI_AnimateMenu, Qt.UI_FadeMenu, Qt.UI_AnimateCombo,
+                   Qt.UI_AnimateTooltip, Qt.UI_FadeTooltip, Qt.UI_AnimateToolBox):
+        app.setEffectEnabled(effect, config_lowmem.ENABLE_ANIMATIONS)
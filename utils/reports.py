@@ -0,0 +1,330 @@
+"""
+Multi-month report generation across month shards
+
+A date range is split into month shards: archived months read their
+data/archive/orders-YYYY-MM.db file, live months read restaurant.db for
+that month's dates. Each shard's partial aggregates are computed in a
+ProcessPoolExecutor worker with its own read-only connection, then merged.
+Reports take seconds, so views run build_product_report() in the background
+(models.run_async) rather than on the UI thread.
+Live months can instead be read from a ReportingSnapshot, an in-memory
+copy taken at one point in time.
+
+Product filtering keeps the custom register report semantics: category and
+keyword filters are applied to each shard's products, and keyword TOTAL
+lines are added once after merging.
+"""
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+import config_lowmem
+
+
+def apply_product_filters(products, filter_config):
+    """Apply category and keyword filters to a {product_name: quantity} dict
+
+    If keywords are provided, shows both individual products AND totals by keyword
+    to track ingredient/stock usage across all product types.
+    """
+    selected_categories = filter_config['categories']
+    keywords = filter_config['keywords']
+    all_categories = filter_config['all_categories']
+    skip_totals = filter_config.get('skip_totals', False)  # Flag to skip adding total lines
+
+    filtered_products = {}
+
+    # If keywords are provided, show individual products + totals by keyword
+    if keywords:
+        # Track totals for each keyword
+        keyword_totals = {kw: 0 for kw in keywords}
+
+        # First pass: add individual products that match keywords
+        for product_display, quantity in products.items():
+            # Check if product matches any keyword
+            matches_keyword = any(kw.lower() in product_display.lower() for kw in keywords)
+
+            if matches_keyword:
+                # Check category filter
+                parts = product_display.split(' ', 1)
+                if len(parts) == 2:
+                    category_name = parts[0]
+                else:
+                    category_name = ''
+
+                category_match = all_categories or (category_name in selected_categories) or (not category_name and len(selected_categories) > 0)
+
+                if category_match:
+                    # Add individual product
+                    filtered_products[product_display] = quantity
+
+                    # Add to keyword totals
+                    for kw in keywords:
+                        if kw.lower() in product_display.lower():
+                            keyword_totals[kw] += quantity
+
+        # Second pass: add total lines for each keyword (if there were matches)
+        # Only add totals if skip_totals is False (for single register or final combined report)
+        if not skip_totals:
+            for keyword, total in keyword_totals.items():
+                if total > 0:
+                    # Add a summary line with the keyword total
+                    filtered_products[f"TOTAL {keyword.upper()}: "] = total
+
+    else:
+        # No keywords - use normal category filtering (show all products in category)
+        for product_display, quantity in products.items():
+            parts = product_display.split(' ', 1)
+
+            if len(parts) == 2:
+                category_name = parts[0]
+            else:
+                category_name = ''
+
+            # Check category filter
+            category_match = all_categories or (category_name in selected_categories) or (not category_name and len(selected_categories) > 0)
+
+            if category_match:
+                filtered_products[product_display] = quantity
+
+    return filtered_products
+
+
+def add_keyword_totals(products, keywords):
+    """Add 'TOTAL KEYWORD: ' lines to a combined products dict"""
+    keyword_totals = {kw: 0 for kw in keywords}
+    for product_name, quantity in products.items():
+        for kw in keywords:
+            if kw.lower() in product_name.lower():
+                keyword_totals[kw] += quantity
+
+    for keyword, total in keyword_totals.items():
+        if total > 0:
+            products[f"TOTAL {keyword.upper()}: "] = total
+    return products
+
+
+def month_shards(start_date, end_date, db=None):
+    """Split a YYYY/MM/DD date range into (db_file, first_day, last_day) month shards"""
+    if db is None:
+        from models import get_db
+        db = get_db()
+
+    archived = set(db.archive_months(start_date, end_date))
+    shards = []
+    year, month = int(start_date[:4]), int(start_date[5:7])
+    while f"{year:04d}/{month:02d}" <= end_date[:7]:
+        first_day = max(start_date, f"{year:04d}/{month:02d}/01")
+        last_day = min(end_date, f"{year:04d}/{month:02d}/31")
+        key = f"{year:04d}-{month:02d}"
+        # Archived months may still have live stragglers (orders of a register still open)
+        shards.append((str(db.db_path), first_day, last_day))
+        if key in archived:
+            shards.append((str(db.archive_path(key)), first_day, last_day))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return shards
+
+
+class ReportingSnapshot:
+    """Point-in-time, in-memory copy of the database for heavy reports
+
+    The copy is taken with the SQLite backup API in a single step: in WAL
+    mode this only holds a read snapshot of the live file, so checkouts keep
+    committing while it is taken, and every report query then sees the same
+    consistent data. Extra indexes that only reports need are built on the
+    copy. Use as a context manager; the memory is released on exit.
+    """
+
+    # Covering indexes for the report queries (not worth their write cost on the live file)
+    REPORT_INDEXES = (
+        "CREATE INDEX IF NOT EXISTS report_orders_date_register ON orders(order_date, register_id, total_amount)",
+        "CREATE INDEX IF NOT EXISTS report_items_order_product ON order_items(order_id, product_name, quantity)",
+    )
+
+    def __init__(self, db_path=None, indexes=REPORT_INDEXES):
+        if db_path is None:
+            from models import get_db
+            db_path = get_db().db_path
+        self.db_path = db_path
+        self.indexes = indexes
+        self.connection = None
+
+    def open(self):
+        """Copy the database into memory and build the report indexes"""
+        source = sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True, timeout=30)
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.row_factory = sqlite3.Row
+        try:
+            source.backup(self.connection)
+        finally:
+            source.close()
+
+        for index_sql in self.indexes:
+            self.connection.execute(index_sql)
+        self.connection.execute("ANALYZE")
+        return self
+
+    def close(self):
+        """Drop the in-memory copy"""
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def execute(self, query, params=()):
+        """Execute a query on the snapshot and return the cursor"""
+        return self.connection.execute(query, params)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def shard_aggregates(connection, first_day, last_day, register_ids=None, filter_config=None):
+    """Compute a date range's partial aggregates on an open connection
+
+    Returns {'products': {name: quantity}, 'registers': {register_id: [orders, sales]}}.
+    """
+    if register_ids is None:
+        chunks = [None]
+    else:
+        # Keep the IN (...) list within SQLite's parameter limit
+        chunks = [register_ids[start:start + config_lowmem.BATCH_SIZE]
+                  for start in range(0, len(register_ids), config_lowmem.BATCH_SIZE)]
+
+    products = {}
+    registers = {}
+    for chunk in chunks:
+        conditions = ["o.order_date BETWEEN ? AND ?"]
+        params = [first_day, last_day]
+        if chunk is not None:
+            conditions.append(f"o.register_id IN ({', '.join('?' for _ in chunk)})")
+            params.extend(chunk)
+        where = ' AND '.join(conditions)
+
+        for product_name, quantity in connection.execute(f"""
+            SELECT oi.product_name, SUM(oi.quantity)
+            FROM order_items oi
+            JOIN orders o ON oi.order_id = o.id
+            WHERE {where}
+            GROUP BY oi.product_name
+        """, params):
+            products[product_name] = products.get(product_name, 0) + quantity
+
+        # Chunks hold different registers, so each register is counted once
+        for register_id, orders, sales in connection.execute(f"""
+            SELECT o.register_id, COUNT(*), SUM(o.total_amount)
+            FROM orders o
+            WHERE {where}
+            GROUP BY o.register_id
+        """, params):
+            registers[register_id] = [orders, sales or 0.0]
+
+    if filter_config:
+        products = apply_product_filters(products, dict(filter_config, skip_totals=True))
+    return {'products': products, 'registers': registers}
+
+
+def shard_partial(shard, register_ids=None, filter_config=None):
+    """Compute one shard's partial aggregates (runs in a worker process)"""
+    db_file, first_day, last_day = shard
+    connection = sqlite3.connect(f"{Path(db_file).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        return shard_aggregates(connection, first_day, last_day, register_ids, filter_config)
+    finally:
+        connection.close()
+
+
+def _run_shard(args):
+    """Unpack arguments for ProcessPoolExecutor.map"""
+    return shard_partial(*args)
+
+
+def _init_worker(settings):
+    """Give a worker process the settings of the app's active profile"""
+    for name, value in settings.items():
+        setattr(config_lowmem, name, value)
+
+
+def build_product_report(start_date, end_date=None, register_ids=None, filter_config=None, workers=None,
+                         snapshot=None):
+    """Build a product mix / sales report over a date range
+
+    Args:
+        start_date, end_date: YYYY/MM/DD (end defaults to today)
+        register_ids: Only orders of these registers (None for all)
+        filter_config: CustomReportDialog filter config (categories/keywords), or None
+        workers: Worker processes (defaults to config_lowmem.REPORT_WORKERS; 1 runs inline)
+        snapshot: Open ReportingSnapshot; live-database shards are then read from it
+            (consistent, no reads on the live file) and only archives use workers
+
+    Returns:
+        Dict with 'products', 'total_orders', 'total_sales', 'by_register'
+        ({register_id: {'orders', 'sales'}}) and 'by_employee' ({name: sales})
+    """
+    from models import get_db
+    db = get_db()
+    end_date = end_date or datetime.now().strftime("%Y/%m/%d")
+    workers = workers or config_lowmem.REPORT_WORKERS or os.cpu_count() or 1
+
+    register_ids = list(register_ids) if register_ids is not None else None
+    shards = month_shards(start_date, end_date, db)
+
+    partials = []
+    if snapshot:
+        live_file = str(db.db_path)
+        for db_file, first_day, last_day in shards:
+            if db_file == live_file:
+                partials.append(shard_aggregates(snapshot.connection, first_day, last_day, register_ids, filter_config))
+        shards = [shard for shard in shards if shard[0] != live_file]
+
+    tasks = [(shard, register_ids, filter_config) for shard in shards]
+    if workers <= 1 or len(tasks) <= 1:
+        partials.extend(_run_shard(task) for task in tasks)
+    else:
+        # Spawned, not forked: a fork would copy the Qt app and its threads.
+        # Spawned workers import this module and the entry script, not the views
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(tasks)),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=({'BATCH_SIZE': config_lowmem.BATCH_SIZE},)
+        ) as executor:
+            partials.extend(executor.map(_run_shard, tasks))
+
+    # Merge partial aggregates
+    products = {}
+    by_register = {}
+    for partial in partials:
+        for product_name, quantity in partial['products'].items():
+            products[product_name] = products.get(product_name, 0) + quantity
+        for register_id, (orders, sales) in partial['registers'].items():
+            totals = by_register.setdefault(register_id, {'orders': 0, 'sales': 0.0})
+            totals['orders'] += orders
+            totals['sales'] += sales
+
+    if filter_config and filter_config.get('keywords'):
+        add_keyword_totals(products, filter_config['keywords'])
+
+    # Per-employee sales (registers stay in the live database)
+    by_employee = {}
+    known_ids = [register_id for register_id in by_register if register_id is not None]
+    for start in range(0, len(known_ids), config_lowmem.BATCH_SIZE):
+        chunk = known_ids[start:start + config_lowmem.BATCH_SIZE]
+        cursor = (snapshot or db).execute(
+            f"SELECT id, employee_name FROM registers WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+        )
+        for row in cursor.fetchall():
+            name = row['employee_name']
+            by_employee[name] = by_employee.get(name, 0.0) + by_register[row['id']]['sales']
+
+    return {
+        'products': dict(sorted(products.items())),
+        'total_orders': sum(totals['orders'] for totals in by_register.values()),
+        'total_sales': sum(totals['sales'] for totals in by_register.values()),
+        'by_register': by_register,
+        'by_employee': by_employee,
+    }
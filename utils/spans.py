@@ -0,0 +1,174 @@
+"""
+Timing spans for the hot paths
+
+span("name") (context manager) and @timed() (decorator) time a block or
+a call into an in-memory histogram per name; Database.execute feeds the
+timing it already takes in with record(). Histograms use fixed
+log-scale buckets, so their memory stays constant however long the POS
+runs. They are shown in Settings > Diagnostics and its JSON export.
+
+A sample of spans (SPAN_TRACE_SAMPLE) is logged at DEBUG and spans over
+SPAN_SLOW_MS at INFO on the "pos.spans" logger, so with LOG_LEVEL and
+LOG_TO_FILE set they are written to the rotating data/pos.log. With
+SPANS_ENABLED off, span() returns a shared no-op and decorated functions
+are called directly.
+"""
+import bisect
+import functools
+import inspect
+import logging
+import random
+import threading
+import time
+import config_lowmem
+
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+logger = logging.getLogger('pos.spans')
+
+
+class Histogram:
+    """Counts of timings per bucket, with their total and maximum"""
+
+    __slots__ = ('counts', 'count', 'total_ms', 'max_ms')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)  # Last bucket: over 10 s
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of timings (capped at the maximum)"""
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                bound = BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max_ms
+                return round(min(bound, self.max_ms), 2)
+        return round(self.max_ms, 2)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 1),
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max_ms, 2),
+        }
+
+
+_histograms = {}
+_lock = threading.Lock()  # Spans are recorded from background threads too
+
+
+def record(name, seconds):
+    """Add a timing to the histogram of name (and log it if slow or sampled)"""
+    if not config_lowmem.SPANS_ENABLED:
+        return
+    ms = seconds * 1000
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.add(ms)
+    if ms >= config_lowmem.SPAN_SLOW_MS:
+        logger.info("slow %s: %.1f ms", name, ms)
+    elif config_lowmem.SPAN_TRACE_SAMPLE and random.random() < config_lowmem.SPAN_TRACE_SAMPLE:
+        logger.debug("%s: %.2f ms", name, ms)
+
+
+class _Span:
+    """Times the with-block it is used in"""
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoSpan:
+    """Stand-in for _Span while spans are disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """Context manager timing a block under name"""
+    if not config_lowmem.SPANS_ENABLED:
+        return _NO_SPAN
+    return _Span(name)
+
+
+def timed(name=None):
+    """Decorator timing each call under name (default: the function's qualified name)
+
+    Extra positional arguments are dropped like Qt does for plain methods,
+    so decorated methods can still be connected to signals such as clicked(bool).
+    """
+    def decorator(func):
+        span_name = name or func.__qualname__
+        code = func.__code__
+        max_args = None if code.co_flags & inspect.CO_VARARGS else code.co_argcount
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if max_args is not None and len(args) > max_args:
+                args = args[:max_args]
+            if not config_lowmem.SPANS_ENABLED:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(span_name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def histograms():
+    """Summary of every span, most total time first"""
+    with _lock:
+        summaries = {name: histogram.summary() for name, histogram in _histograms.items()}
+    return dict(sorted(summaries.items(), key=lambda item: item[1]['total_ms'], reverse=True))
+
+
+def export():
+    """Bucket counts, count and total ms of every span (for the metrics endpoint)"""
+    with _lock:
+        return {
+            name: (list(histogram.counts), histogram.count, histogram.total_ms)
+            for name, histogram in _histograms.items()
+        }
+
+
+def reset():
+    """Forget all recorded spans"""
+    with _lock:
+        _histograms.clear()
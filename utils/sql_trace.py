@@ -0,0 +1,341 @@
+"""
+SQL workload recorder and replayer
+
+When SQL_TRACE_ENABLED is set, Database.execute() and Database.commit()
+log every statement to data/traces/sql-trace.jsonl: its parameters
+(anonymized), how long it took and which model and view issued it. The
+file rotates at SQL_TRACE_MAX_MB, keeping SQL_TRACE_FILES old files.
+
+Trace format, one JSON value per line, compact so a shift stays small:
+    {"trace": 1, "started": ..., "db": ...}    file header
+    {"s": 3, "sql": "SELECT ..."}               statement 3 (first use in the file)
+    {"c": 2, "name": "models.order.Order.get"}  caller 2 (first use in the file)
+    [time, statement, ms, params, caller, view] one execution
+
+Parameters keep numbers, dates and times (they decide which rows a query
+reads); other text is replaced by a stable pseudonym of the same length
+with LIKE wildcards kept, so names, phones and addresses never reach the
+trace while repeated values still repeat. Pseudonyms are keyed with a
+random secret kept in data/sql-trace.key (never written to the trace), so
+they cannot be reversed by hashing a list of likely names or phones.
+
+Replay a captured shift against a copy of a database with the current
+build's schema and compare per-query latency:
+    python -m utils.sql_trace replay data/traces --db data/restaurant.db
+    python -m utils.sql_trace replay data/traces --db data/restaurant.db --output new.json --baseline old.json
+"""
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+import config_lowmem
+
+TRACE_NAME = "sql-trace.jsonl"
+KEY_NAME = "sql-trace.key"  # Next to the traces directory, not in it
+TRACE_VERSION = 1
+CALLER_DEPTH = 40  # Stack frames searched for the calling model and view
+SKIPPED_MODULES = ('models.database', 'models.db_workers', 'utils.cache', 'utils.sql_trace')
+VIEW_MODULES = ('views.', 'controllers.', '__main__')
+KEPT_TEXT = re.compile(r'^(\d{4}[/-]\d{2}([/-]\d{2})?)?( ?\d{2}:\d{2}(:\d{2})?)?$')
+WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(query):
+    """Collapse whitespace so the same statement is stored once"""
+    return WHITESPACE.sub(' ', query).strip()
+
+
+def load_key(path):
+    """Secret for the pseudonyms of this install, created on first use"""
+    path = Path(path)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # Readable by the POS user only
+            with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), 'wb') as key_file:
+                key_file.write(os.urandom(32))
+        except FileExistsError:
+            pass  # Created by another process in the meantime
+    return path.read_bytes()
+
+
+def _pseudonym(text, key):
+    """Stable text of the same length derived from a keyed hash of text"""
+    digest = hashlib.blake2s(text.encode('utf-8'), digest_size=16, key=key).hexdigest()
+    return (digest * (len(text) // len(digest) + 1))[:len(text)]
+
+
+def anonymize(value, key):
+    """Anonymize one query parameter (see the module docstring)"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {'b': len(value)}
+    text = str(value)
+    if KEPT_TEXT.match(text):
+        return text
+    return '%'.join(_pseudonym(part, key) for part in text.split('%'))
+
+
+def anonymize_params(params, key):
+    """Anonymize a statement's positional or named parameters"""
+    if not params:
+        return None
+    if isinstance(params, dict):
+        return {name: anonymize(value, key) for name, value in params.items()}
+    return [anonymize(value, key) for value in params]
+
+
+def restore_params(params):
+    """Turn traced parameters back into values sqlite3 accepts"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: bytes(value['b']) if isinstance(value, dict) else value
+                for name, value in params.items()}
+    return [bytes(value['b']) if isinstance(value, dict) else value for value in params]
+
+
+def find_callers(frame):
+    """(caller, view) for a stack: the first frame outside the database layer and the first view/controller frame"""
+    caller = view = None
+    depth = 0
+    while frame is not None and depth < CALLER_DEPTH and view is None:
+        module = frame.f_globals.get('__name__', '')
+        if not module.startswith(SKIPPED_MODULES):
+            code = frame.f_code
+            name = f"{module}.{getattr(code, 'co_qualname', code.co_name)}"  # co_qualname: Python 3.11+
+            if caller is None:
+                caller = name
+            if module.startswith(VIEW_MODULES):
+                view = name
+        frame = frame.f_back
+        depth += 1
+    return caller, view
+
+
+class SqlTracer:
+    """Appends executed statements to a rotating trace file (thread-safe)"""
+
+    def __init__(self, trace_dir, max_bytes=None, backup_count=None, db_name='', key_path=None):
+        self.path = Path(trace_dir) / TRACE_NAME
+        self.key = load_key(key_path or Path(trace_dir).parent / KEY_NAME)
+        self.max_bytes = int((max_bytes or config_lowmem.SQL_TRACE_MAX_MB * 1024 * 1024))
+        self.backup_count = config_lowmem.SQL_TRACE_FILES if backup_count is None else backup_count
+        self.db_name = db_name
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._statements = {}  # Normalized SQL -> id, per file
+        self._callers = {}  # Caller name -> id, per file
+        atexit.register(self.close)
+
+    def _open(self):
+        """Open the current trace file, rotating it first if it is full"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size >= self.max_bytes:
+            self._rotate()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._size = self.path.stat().st_size
+        self._statements = {}
+        self._callers = {}
+        self._write({'trace': TRACE_VERSION, 'started': datetime.now().isoformat(timespec='seconds'),
+                     'db': self.db_name})
+
+    def _rotate(self):
+        """sql-trace.jsonl -> .1 -> .2 ...; the oldest file beyond backup_count is deleted"""
+        for index in range(self.backup_count, 0, -1):
+            source = self.path if index == 1 else self.path.with_name(f"{TRACE_NAME}.{index - 1}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{TRACE_NAME}.{index}"))
+        if self.path.exists():
+            self.path.unlink()
+
+    def _write(self, value):
+        line = json.dumps(value, separators=(',', ':'), default=str) + '\n'
+        self._file.write(line)
+        self._size += len(line)
+
+    def _intern(self, table, key, value):
+        """Id of a statement or caller, writing its definition on first use in this file"""
+        index = table.get(value)
+        if index is None:
+            index = table[value] = len(table) + 1
+            self._write({key: index, ('sql' if key == 's' else 'name'): value})
+        return index
+
+    def record(self, query, params, seconds):
+        """Log one execution; called right after the statement ran"""
+        caller, view = find_callers(sys._getframe(1))
+        event_params = anonymize_params(params, self.key)
+        with self._lock:
+            if self._file is None or self._size >= self.max_bytes:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._open()
+            statement = self._intern(self._statements, 's', normalize_sql(query))
+            caller_id = self._intern(self._callers, 'c', caller) if caller else None
+            view_id = self._intern(self._callers, 'c', view) if view else None
+            self._write([round(time.time(), 3), statement, round(seconds * 1000, 3),
+                         event_params, caller_id, view_id])
+
+    def close(self):
+        """Flush and close the trace file"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def trace_files(paths):
+    """Trace files to replay, oldest first; a directory means all its rotated files"""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            rotated = sorted(path.glob(f"{TRACE_NAME}.*"), key=lambda p: int(p.suffix[1:]), reverse=True)
+            files.extend(rotated + ([path / TRACE_NAME] if (path / TRACE_NAME).exists() else []))
+        else:
+            files.append(path)
+    return files
+
+
+def read_trace(files):
+    """Yield (sql, params, recorded_ms, caller, view) from trace files, in order"""
+    for path in files:
+        statements, callers = {}, {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    value = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn last line of a trace written when the app stopped
+                if isinstance(value, list):
+                    _, statement, ms, params, caller, view = value
+                    yield statements[statement], params, ms, callers.get(caller), callers.get(view)
+                elif 'trace' in value:
+                    statements, callers = {}, {}  # The app restarted and appended a new header
+                elif 's' in value:
+                    statements[value['s']] = value['sql']
+                elif 'c' in value:
+                    callers[value['c']] = value['name']
+
+
+def prepare_copy(db_path, target):
+    """Copy a database for replay and bring it to the current build's schema"""
+    from models.database import Database
+
+    source = sqlite3.connect(f"file:{Path(db_path).as_posix()}?mode=ro", uri=True)
+    destination = sqlite3.connect(target)
+    source.backup(destination)
+    source.close()
+    destination.close()
+    database = Database(target)
+    database.initialize_schema()  # New tables, columns and indexes of this build
+    database.close()
+
+
+def replay(files, db_path, reads_only=False):
+    """Run a trace's statements on a copy of db_path; returns per-statement results"""
+    results = {}
+    errors = 0
+    with tempfile.TemporaryDirectory(prefix="pos-replay-") as temp_dir:
+        copy_path = os.path.join(temp_dir, "replay.db")
+        prepare_copy(db_path, copy_path)
+        connection = sqlite3.connect(copy_path)
+        connection.row_factory = sqlite3.Row
+        for sql, params, recorded_ms, caller, view in read_trace(files):
+            is_read = sql[:6].upper() in ('SELECT', 'PRAGMA')
+            if reads_only and not is_read:
+                continue
+            entry = results.setdefault(sql, {'caller': caller, 'views': set(), 'recorded': [], 'replayed': []})
+            if view:
+                entry['views'].add(view)
+            start = time.perf_counter()
+            try:
+                if sql.upper() == 'COMMIT':
+                    connection.commit()
+                else:
+                    # Like the app, reads are timed to the first row (callers fetch lazily)
+                    cursor = connection.execute(sql, restore_params(params) or ())
+                    if not is_read:
+                        cursor.fetchall()
+            except sqlite3.Error:
+                errors += 1
+                continue
+            entry['replayed'].append((time.perf_counter() - start) * 1000)
+            entry['recorded'].append(recorded_ms)
+        connection.commit()
+        connection.close()
+
+    statements = []
+    for sql, entry in results.items():
+        if not entry['replayed']:
+            continue
+        statements.append({
+            'sql': sql,
+            'caller': entry['caller'],
+            'views': sorted(entry['views']),
+            'count': len(entry['replayed']),
+            'recorded_ms': round(statistics.median(entry['recorded']), 4),
+            'replay_ms': round(statistics.median(entry['replayed']), 4),
+            'replay_total_ms': round(sum(entry['replayed']), 2),
+        })
+    statements.sort(key=lambda s: s['replay_total_ms'], reverse=True)
+    return {'errors': errors, 'statements': statements}
+
+
+def print_report(result, baseline=None, limit=30):
+    """Print per-statement latency, compared with the recorded timings or a baseline replay"""
+    base = {s['sql']: s['replay_ms'] for s in baseline['statements']} if baseline else None
+    label = 'baseline' if base is not None else 'recorded'
+    print(f"{'count':>7} {label:>10} {'replay ms':>10} {'change':>8}  statement (caller)")
+    for statement in result['statements'][:limit]:
+        before = base.get(statement['sql']) if base is not None else statement['recorded_ms']
+        change = f"{statement['replay_ms'] / before - 1:+.0%}" if before else '-'
+        before_text = f"{before:.3f}" if before is not None else '-'
+        print(f"{statement['count']:>7} {before_text:>10} {statement['replay_ms']:>10.3f} {change:>8}  "
+              f"{statement['sql'][:70]} ({statement['caller']})")
+    if result['errors']:
+        print(f"{result['errors']} statements failed on the copy (e.g. unique values that were anonymized)")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a recorded SQL trace against a copy of a database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    replay_parser = subparsers.add_parser("replay", help="Re-run a trace and report per-query latency")
+    replay_parser.add_argument("traces", nargs="+", help="Trace files or a trace directory (data/traces)")
+    replay_parser.add_argument("--db", required=True, help="Database to copy (it is not modified)")
+    replay_parser.add_argument("--reads-only", action="store_true", help="Skip INSERT/UPDATE/DELETE")
+    replay_parser.add_argument("--baseline", help="Replay results (--output of an earlier build) to compare with")
+    replay_parser.add_argument("--output", help="Write the replay results as JSON")
+    replay_parser.add_argument("--limit", type=int, default=30, help="Statements shown (by total replay time)")
+    args = parser.parse_args()
+
+    files = trace_files(args.traces)
+    if not files:
+        sys.exit("No trace files found")
+    result = replay(files, args.db, args.reads_only)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(result, baseline, args.limit)
+
+
+if __name__ == "__main__":
+    main()
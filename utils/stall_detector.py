@@ -0,0 +1,149 @@
+"""
+UI event-loop stall detector
+
+A watchdog thread sends a queued signal to the UI thread every 50 ms and
+waits for it to be handled. When the event loop does not answer within
+STALL_THRESHOLD_MS, the UI thread's Python stack is captured with
+sys._current_frames(), so the synchronous query, print call or table
+rebuild holding it is known. Once the loop answers, the stall's duration,
+screen and stack are recorded (counted per screen, shown in Settings >
+Diagnostics) and logged on the "pos.stalls" logger, at most once per
+STALL_LOG_INTERVAL_SECONDS.
+"""
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime
+from PyQt5.QtCore import QObject, pyqtSignal
+import config_lowmem
+from utils.diagnostics import get_diagnostics
+
+PING_INTERVAL_SECONDS = 0.05  # Stalls are timed from the first unanswered ping (undercounted by at most this)
+STALL_HISTORY = 20  # Most recent stalls kept with their stacks
+STACK_DEPTH = 12  # Innermost frames kept per stack
+LONG_STALL_SECONDS = 5  # A stall still going after this is logged right away
+logger = logging.getLogger('pos.stalls')
+
+
+class StallDetector(QObject):
+    """Watches the Qt event loop from a background thread"""
+
+    _ping = pyqtSignal()  # Emitted by the watchdog, handled on the UI thread
+
+    def __init__(self, threshold_ms=None):
+        super().__init__()  # Created on the UI thread, so _pong runs there
+        self.threshold = (threshold_ms or config_lowmem.STALL_THRESHOLD_MS) / 1000
+        self.ui_thread_id = threading.get_ident()
+        self.lock = threading.Lock()
+        self.stalls = deque(maxlen=STALL_HISTORY)
+        self.screens = {}  # Screen name -> {'count', 'total_ms', 'max_ms'}
+        self.count = 0
+        self.max_ms = 0.0
+        self.suppressed = 0  # Stalls not logged since the last logged one
+        self._last_log = None
+        self._answered = threading.Event()
+        self._answered_at = 0.0
+        self._stopping = threading.Event()
+        self._thread = None
+        self._ping.connect(self._pong)
+
+    def start(self):
+        """Start the watchdog thread"""
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='stall-detector', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the watchdog thread"""
+        self._stopping.set()
+        self._answered.set()
+        if self._thread is not None:
+            self._thread.join(1)
+            self._thread = None
+
+    def _pong(self):
+        self._answered_at = time.perf_counter()
+        self._answered.set()
+
+    def _run(self):
+        """Watchdog loop: ping, and capture the UI stack when the answer is late"""
+        while not self._stopping.is_set():
+            self._answered.clear()
+            sent = time.perf_counter()
+            self._ping.emit()
+            if self._answered.wait(self.threshold):
+                self._stopping.wait(PING_INTERVAL_SECONDS)
+                continue
+
+            stack = self.capture_stack()
+            screen = get_diagnostics().screen
+            reported = False
+            while not self._answered.wait(0.5):
+                if not reported and time.perf_counter() - sent >= LONG_STALL_SECONDS:
+                    logger.warning("UI blocked for over %d s on %s:\n%s", LONG_STALL_SECONDS, screen, "".join(stack))
+                    reported = True
+            if self._stopping.is_set():
+                return
+            self.record((self._answered_at - sent) * 1000, screen, stack)
+
+    def capture_stack(self):
+        """Current Python stack of the UI thread, innermost frames last"""
+        frame = sys._current_frames().get(self.ui_thread_id)
+        if frame is None:
+            return []
+        return traceback.format_stack(frame)[-STACK_DEPTH:]
+
+    def record(self, ms, screen, stack):
+        """Count a stall and log it unless one was logged less than STALL_LOG_INTERVAL_SECONDS ago"""
+        now = time.monotonic()
+        with self.lock:
+            self.count += 1
+            self.max_ms = max(self.max_ms, ms)
+            totals = self.screens.setdefault(screen, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            totals['count'] += 1
+            totals['total_ms'] += ms
+            totals['max_ms'] = max(totals['max_ms'], ms)
+            self.stalls.append({
+                'time': datetime.now().strftime('%H:%M:%S'),
+                'ms': round(ms, 1),
+                'screen': screen,
+                'stack': [line.rstrip() for line in stack],
+            })
+            if self._last_log is not None and now - self._last_log < config_lowmem.STALL_LOG_INTERVAL_SECONDS:
+                self.suppressed += 1
+                return
+            suppressed, self.suppressed = self.suppressed, 0
+            self._last_log = now
+        logger.warning(
+            "UI stalled %.0f ms on %s (%d other stall(s) since the last report):\n%s",
+            ms, screen, suppressed, "".join(stack)
+        )
+
+    def summary(self):
+        """Stall counts per screen and the most recent stalls with their stacks"""
+        with self.lock:
+            return {
+                'threshold_ms': round(self.threshold * 1000),
+                'count': self.count,
+                'max_ms': round(self.max_ms, 1),
+                'screens': {
+                    screen: {**totals, 'total_ms': round(totals['total_ms'], 1), 'max_ms': round(totals['max_ms'], 1)}
+                    for screen, totals in self.screens.items()
+                },
+                'recent': list(self.stalls),
+            }
+
+
+_detector = None
+
+
+def get_stall_detector():
+    """Get the global stall detector (create it on the UI thread)"""
+    global _detector
+    if _detector is None:
+        _detector = StallDetector()
+    return _detector
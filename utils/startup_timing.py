@@ -0,0 +1,62 @@
+"""
+Startup timing report
+
+main.py marks each startup phase (imports, database, main window, first
+paint, deferred startup work). The report is printed and appended to
+data/startup_times.jsonl, one line per start, so cold starts on the tills
+can be compared across versions.
+"""
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from PyQt5.QtCore import QEvent, QObject, QTimer
+import config
+
+
+class StartupTimer(QObject):
+    """Records the time of each startup phase since the process started main.py"""
+
+    def __init__(self, started=None):
+        super().__init__()
+        self.started = started or time.perf_counter()
+        self.last = self.started
+        self.phases = []  # (name, ms for this phase)
+        self._on_paint = None
+
+    def mark(self, name):
+        """End a phase"""
+        now = time.perf_counter()
+        self.phases.append((name, (now - self.last) * 1000))
+        self.last = now
+
+    def total_ms(self):
+        return (self.last - self.started) * 1000
+
+    def on_first_paint(self, widget, callback):
+        """Call callback once widget has been painted for the first time"""
+        self._on_paint = callback
+        widget.installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and self._on_paint:
+            watched.removeEventFilter(self)
+            callback, self._on_paint = self._on_paint, None
+            QTimer.singleShot(0, callback)  # Runs after this paint has finished
+        return False
+
+    def report(self):
+        """Print the phases and append them to the startup log"""
+        print("Startup: " + ", ".join(f"{name} {ms:.0f} ms" for name, ms in self.phases)
+              + f" (total {self.total_ms():.0f} ms)")
+        entry = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'phases_ms': {name: round(ms, 1) for name, ms in self.phases},
+            'total_ms': round(self.total_ms(), 1),
+        }
+        try:
+            path = Path(config.DATABASE_PATH).parent / "startup_times.jsonl"
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"Error writing startup times: {e}")
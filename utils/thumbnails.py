@@ -0,0 +1,167 @@
+"""
+Pre-scaled product thumbnails decoded off the UI thread
+
+Product images are scaled once to the grid cell size and saved under
+data/thumbnails/, keyed by the image's path, modification time and the
+thumbnail size, so later runs never decode the full-size file again.
+Decoding (QImageReader, scaled while reading) happens on a worker
+thread; the UI thread only turns the finished QImage into a QPixmap,
+which is kept in the bounded QPixmapCache.
+"""
+import hashlib
+import os
+import queue
+import threading
+from pathlib import Path
+from PyQt5.QtCore import QObject, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader, QPixmap, QPixmapCache
+import config
+import config_lowmem
+
+THUMBNAIL_DIR = Path(config.DATABASE_PATH).parent / "thumbnails"
+
+
+def cache_key(path, size):
+    """QPixmapCache key of a thumbnail"""
+    return f"thumb:{size.width()}x{size.height()}:{path}"
+
+
+def thumbnail_file(path, mtime_ns, size):
+    """On-disk thumbnail for an image version and size"""
+    digest = hashlib.sha1(f"{os.path.abspath(path)}|{mtime_ns}|{size.width()}x{size.height()}".encode('utf-8'))
+    return THUMBNAIL_DIR / f"{digest.hexdigest()}.png"
+
+
+def decode_thumbnail(path, size):
+    """Read an image scaled to fit size (worker thread); returns a QImage or None
+
+    Uses the on-disk thumbnail when it is up to date, otherwise decodes the
+    original at the reduced size and saves the result.
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    cached = thumbnail_file(path, mtime_ns, size)
+    if cached.exists():
+        image = QImageReader(str(cached)).read()
+        if not image.isNull():
+            return image
+
+    reader = QImageReader(path)
+    reader.setAutoTransform(True)
+    original = reader.size()
+    if original.isValid():
+        # JPEG and others decode directly at the smaller size, much cheaper than a full decode
+        reader.setScaledSize(original.scaled(size, Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        print(f"Error loading image {path}: {reader.errorString()}")
+        return None
+    if image.width() > size.width() or image.height() > size.height():
+        image = image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    try:
+        THUMBNAIL_DIR.mkdir(parents=True, exist_ok=True)
+        image.save(str(cached), "PNG")
+    except OSError as e:
+        print(f"Error saving thumbnail for {path}: {e}")
+    return image
+
+
+class ThumbnailCache(QObject):
+    """Serves product thumbnails from QPixmapCache, decoding misses in the background"""
+
+    thumbnail_ready = pyqtSignal(str)  # Image path whose thumbnail is now cached
+    _decoded = pyqtSignal(str, QSize, QImage)  # Worker -> UI thread
+
+    def __init__(self, cache_kb=None):
+        super().__init__()
+        QPixmapCache.setCacheLimit(cache_kb or config_lowmem.THUMBNAIL_CACHE_KB)
+        self._decoded.connect(self._on_decoded)
+        self._queue = queue.Queue()
+        self._requested = set()  # (path, size) queued or being decoded
+        self._missing = set()  # (path, size) that could not be loaded
+        self._sizes = set()  # Thumbnail sizes in use, for forget()
+        self._cached = {}  # QPixmapCache key -> bytes, for usage()
+        self._thread = None
+
+    def pixmap(self, path, size):
+        """Cached thumbnail for path, or None (it is then decoded in the background)"""
+        pixmap = QPixmapCache.find(cache_key(path, size))
+        if pixmap is not None and not pixmap.isNull():
+            return pixmap
+        self.request(path, size)
+        return None
+
+    def request(self, path, size):
+        """Queue a thumbnail for decoding unless it is already queued or known missing"""
+        key = (path, size.width(), size.height())
+        if key in self._requested or key in self._missing:
+            return
+        self._requested.add(key)
+        self._sizes.add((size.width(), size.height()))
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='thumbnails', daemon=True)
+            self._thread.start()
+        self._queue.put((path, QSize(size)))
+
+    def preload(self, paths, size):
+        """Decode thumbnails for many images (e.g. the whole menu) in the background"""
+        for path in paths:
+            if path and QPixmapCache.find(cache_key(path, size)) is None:
+                self.request(path, size)
+
+    def _run(self):
+        """Worker loop: decode queued thumbnails one at a time"""
+        while True:
+            path, size = self._queue.get()
+            try:
+                image = decode_thumbnail(path, size)
+            except Exception as e:
+                print(f"Error decoding thumbnail {path}: {e}")
+                image = None
+            self._decoded.emit(path, size, image if image is not None else QImage())
+
+    def _on_decoded(self, path, size, image):
+        """Store a decoded thumbnail (UI thread, where QPixmaps may be created)"""
+        key = (path, size.width(), size.height())
+        self._requested.discard(key)
+        if image.isNull():
+            self._missing.add(key)
+            return
+        pixmap = QPixmap.fromImage(image)
+        QPixmapCache.insert(cache_key(path, size), pixmap)
+        self._cached[cache_key(path, size)] = pixmap.width() * pixmap.height() * pixmap.depth() // 8
+        self.thumbnail_ready.emit(path)
+
+    def usage(self):
+        """Thumbnails still in QPixmapCache, their approximate size and the cache limit"""
+        for key in list(self._cached):
+            pixmap = QPixmapCache.find(key)
+            if pixmap is None or pixmap.isNull():
+                del self._cached[key]  # Evicted by QPixmapCache
+        return {
+            'thumbnails': len(self._cached),
+            'used_kb': sum(self._cached.values()) // 1024,
+            'limit_kb': QPixmapCache.cacheLimit(),
+            'decoding': len(self._requested),
+            'missing': len(self._missing),
+        }
+
+    def forget(self, path):
+        """Drop an image's thumbnails (it was changed or replaced) so they are loaded again"""
+        for width, height in self._sizes:
+            QPixmapCache.remove(cache_key(path, QSize(width, height)))
+            self._missing.discard((path, width, height))
+
+
+_thumbnails = None
+
+
+def get_thumbnails():
+    """Get the global thumbnail cache (create it on the UI thread)"""
+    global _thumbnails
+    if _thumbnails is None:
+        _thumbnails = ThumbnailCache()
+    return _thumbnails
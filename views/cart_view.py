@@ -10,6 +10,97 @@ from PyQt5.QtGui import QFont
 import config
 from models import Client
 from translations import CART, COMMON
+from utils.spans import timed
+
+
+class CartItemWidget(QPushButton):
+    """A cart line; rebound to other items instead of being rebuilt"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.item = None
+        self.shown = None  # Values on display, to skip unchanged updates
+
+        self.setProperty("class", "cart-item")
+        self.setMinimumHeight(70)
+        self.setMaximumHeight(70)
+
+        # Create layout
+        main_layout = QVBoxLayout(self)
+        main_layout.setContentsMargins(10, 5, 10, 5)
+        main_layout.setSpacing(2)
+
+        # Top row: category+name, quantity, price, delete
+        top_layout = QHBoxLayout()
+        top_layout.setSpacing(5)
+
+        # Name with category
+        self.name_label = QLabel()
+        self.name_label.setProperty("class", "cart-item-name")
+        font = QFont()
+        font.setPointSize(10)
+        font.setBold(True)
+        self.name_label.setFont(font)
+        self.name_label.setWordWrap(True)
+        top_layout.addWidget(self.name_label, stretch=1)
+
+        # Quantity
+        self.qty_label = QLabel()
+        self.qty_label.setProperty("class", "cart-item-quantity")
+        font.setPointSize(13)
+        self.qty_label.setFont(font)
+        top_layout.addWidget(self.qty_label)
+
+        # Price
+        self.price_label = QLabel()
+        self.price_label.setProperty("class", "cart-item-price")
+        font.setPointSize(11)
+        self.price_label.setFont(font)
+        self.price_label.setAlignment(Qt.AlignRight)
+        self.price_label.setMinimumWidth(70)
+        top_layout.addWidget(self.price_label)
+
+        # Delete button
+        self.delete_btn = QPushButton("×")
+        self.delete_btn.setProperty("class", "delete-button")
+        font.setPointSize(20)
+        font.setBold(True)
+        self.delete_btn.setFont(font)
+        self.delete_btn.setMaximumWidth(30)
+        top_layout.addWidget(self.delete_btn)
+
+        main_layout.addLayout(top_layout)
+
+        # Notes row (hidden when the item has none)
+        self.notes_label = QLabel()
+        notes_font = QFont()
+        notes_font.setPointSize(8)
+        notes_font.setItalic(True)
+        self.notes_label.setFont(notes_font)
+        self.notes_label.setStyleSheet("color: #aaaaaa;")
+        self.notes_label.hide()
+        main_layout.addWidget(self.notes_label)
+
+    def bind(self, item):
+        """Show a cart item, updating only what changed"""
+        self.item = item
+        category_name = item.get('category_name', '')
+        full_name = f"{category_name} {item['name']}" if category_name else item['name']
+        shown = (full_name, item['quantity'], item['final_price'], item.get('notes') or '')
+        if shown == self.shown:
+            return
+        old = self.shown or (None, None, None, None)
+        self.shown = shown
+
+        if full_name != old[0]:
+            self.name_label.setText(full_name)
+        if item['quantity'] != old[1]:
+            self.qty_label.setText(f"×{item['quantity']}")
+        if item['final_price'] != old[2]:
+            self.price_label.setText(f"{item['final_price']:.2f}dt")
+        if shown[3] != old[3]:
+            self.notes_label.setText(f"{COMMON['notes']}: {shown[3]}")
+            self.notes_label.setVisible(bool(shown[3]))
 
 
 class CartView(QWidget):
@@ -21,6 +112,8 @@ class CartView(QWidget):
         super().__init__(parent)
         self.order_controller = order_controller
         self.delivery_data = {"place": "", "num": "", "price": 0}
+        self.item_widgets = []  # Line widgets in cart order
+        self.spare_widgets = []  # Line widgets of removed items, reused for new ones
 
         self.setup_ui()
 
@@ -94,22 +187,35 @@ class CartView(QWidget):
         self.checkout_btn.clicked.connect(self.on_checkout_clicked)
         layout.addWidget(self.checkout_btn)
 
+    @timed()
     def refresh(self):
-        """Refresh cart display"""
-        # Clear current items
-        while self.scroll_layout.count():
-            item = self.scroll_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-
-        # Get cart items
-        cart_items = self.order_controller.get_cart_items()
+        """Refresh cart display
 
-        # Add cart item widgets
-        for idx, item in enumerate(cart_items):
-            item_widget = self.create_cart_item_widget(item, idx)
-            self.scroll_layout.addWidget(item_widget)
+        Applies the cart's changes to the existing line widgets: removed
+        items give their widget back to a spare pool, new items take one
+        from it, and lines are only updated when what they show changed.
+        """
+        cart_items = self.order_controller.get_cart_items()
+        current = {id(item) for item in cart_items}
+
+        # Removals (widgets hold their item, so ids are not reused while bound)
+        for widget in [w for w in self.item_widgets if id(w.item) not in current]:
+            self.item_widgets.remove(widget)
+            self.scroll_layout.removeWidget(widget)
+            widget.hide()
+            widget.item = None
+            self.spare_widgets.append(widget)
+
+        # Inserts and updates, in cart order
+        for index, item in enumerate(cart_items):
+            if index < len(self.item_widgets) and self.item_widgets[index].item is item:
+                widget = self.item_widgets[index]
+            else:
+                widget = self.spare_widgets.pop() if self.spare_widgets else self.create_cart_item_widget()
+                self.item_widgets.insert(index, widget)
+                self.scroll_layout.insertWidget(index, widget)
+                widget.show()
+            widget.bind(item)
 
         # Update total
         total = self.order_controller.get_total()
@@ -118,77 +224,20 @@ class CartView(QWidget):
         # Update order number
         self.order_label.setText(f"Commande N°: {self.order_controller.get_current_order_number()}")
 
-    def create_cart_item_widget(self, item, index):
-        """Create widget for a cart item"""
-        widget = QPushButton()
-        widget.setProperty("class", "cart-item")
-        widget.setMinimumHeight(70)
-        widget.setMaximumHeight(70)
-
-        # Create layout
-        main_layout = QVBoxLayout(widget)
-        main_layout.setContentsMargins(10, 5, 10, 5)
-        main_layout.setSpacing(2)
-
-        # Top row: category+name, quantity, price, delete
-        top_layout = QHBoxLayout()
-        top_layout.setSpacing(5)
-
-        # Name with category
-        category_name = item.get('category_name', '')
-        full_name = f"{category_name} {item['name']}" if category_name else item['name']
-        name_label = QLabel(full_name)
-        name_label.setProperty("class", "cart-item-name")
-        font = QFont()
-        font.setPointSize(10)
-        font.setBold(True)
-        name_label.setFont(font)
-        name_label.setWordWrap(True)
-        top_layout.addWidget(name_label, stretch=1)
-
-        # Quantity
-        qty_label = QLabel(f"×{item['quantity']}")
-        qty_label.setProperty("class", "cart-item-quantity")
-        font.setPointSize(13)
-        qty_label.setFont(font)
-        top_layout.addWidget(qty_label)
-
-        # Price
-        price_label = QLabel(f"{item['final_price']:.2f}dt")
-        price_label.setProperty("class", "cart-item-price")
-        font.setPointSize(11)
-        price_label.setFont(font)
-        price_label.setAlignment(Qt.AlignRight)
-        price_label.setMinimumWidth(70)
-        top_layout.addWidget(price_label)
-
-        # Delete button
-        delete_btn = QPushButton("×")
-        delete_btn.setProperty("class", "delete-button")
-        font.setPointSize(20)
-        font.setBold(True)
-        delete_btn.setFont(font)
-        delete_btn.setMaximumWidth(30)
-        delete_btn.clicked.connect(lambda: self.remove_item(index))
-        top_layout.addWidget(delete_btn)
-
-        main_layout.addLayout(top_layout)
-
-        # Notes row (if any)
-        if item.get('notes'):
-            notes_label = QLabel(f"{COMMON['notes']}: {item['notes']}")
-            notes_font = QFont()
-            notes_font.setPointSize(8)
-            notes_font.setItalic(True)
-            notes_label.setFont(notes_font)
-            notes_label.setStyleSheet("color: #aaaaaa;")
-            main_layout.addWidget(notes_label)
-
-        # Click to edit
-        widget.clicked.connect(lambda: self.edit_item(index))
-
+    def create_cart_item_widget(self):
+        """Create a cart line widget (bound to an item by refresh)"""
+        widget = CartItemWidget()
+        widget.delete_btn.clicked.connect(lambda: self.remove_item(self.item_index(widget)))
+        widget.clicked.connect(lambda: self.edit_item(self.item_index(widget)))
         return widget
 
+    def item_index(self, widget):
+        """Current cart index of the item shown by a line widget, or -1"""
+        for index, item in enumerate(self.order_controller.get_cart_items()):
+            if item is widget.item:
+                return index
+        return -1
+
     def remove_item(self, index):
         """Remove item from cart"""
         self.order_controller.remove_item(index)
@@ -218,6 +267,7 @@ class CartView(QWidget):
 
                 self.refresh()
 
+    @timed()
     def load_clients(self):
         """Load clients from database"""
         try:
@@ -227,6 +277,7 @@ class CartView(QWidget):
         except Exception as e:
             print(f"Error loading clients: {e}")
 
+    @timed()
     def refresh_clients(self):
         """Refresh the client dropdown list"""
         # Save current selection
@@ -15,7 +15,8 @@ class CategoryView(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.categories = []
-        self.category_buttons = {}
+        self.category_buttons = {}  # Category id -> button showing it
+        self.button_pool = []  # Buttons in grid order, reused across set_categories
         self.selected_category = None
 
         self.setup_ui()
@@ -28,41 +29,65 @@ class CategoryView(QWidget):
         self.setMaximumHeight(150)
 
     def set_categories(self, categories):
-        """Set and display categories"""
+        """Set and display categories
+
+        Buttons are kept and relabelled; new ones are only created when
+        there are more categories than ever before, extra ones are hidden.
+        """
         self.categories = categories
-        self.clear_layout()
+        self.category_buttons.clear()
 
         cols = config.CATEGORY_GRID_COLUMNS
-        row = 0
-        col = 0
-
-        for category in categories:
-            btn = QPushButton(category.name)
-            btn.setProperty("class", "category-button")
-            btn.setCursor(QCursor(Qt.PointingHandCursor))
-
-            font = QFont()
-            font.setPointSize(16)
-            font.setBold(True)
-            btn.setFont(font)
-
-            btn.setMinimumHeight(40)
-            btn.clicked.connect(lambda checked, c=category: self.on_category_clicked(c))
-
+        while len(self.button_pool) < len(categories):
+            index = len(self.button_pool)
+            btn = self.create_category_button()
+            self.button_pool.append(btn)
+            self.layout.addWidget(btn, index // cols, index % cols)
+
+        for btn, category in zip(self.button_pool, categories):
+            btn.category = category
+            if btn.text() != category.name:
+                btn.setText(category.name)
+            self.set_button_class(btn, "category-button")
             self.category_buttons[category.id] = btn
-            self.layout.addWidget(btn, row, col)
-
-            col += 1
-            if col >= cols:
-                col = 0
-                row += 1
+            btn.show()
+        for btn in self.button_pool[len(categories):]:
+            btn.category = None
+            btn.hide()
 
         # Set column stretch
         for i in range(cols):
             self.layout.setColumnStretch(i, 1)
 
+    def create_category_button(self):
+        """Create a category button (bound to a category by set_categories)"""
+        btn = QPushButton()
+        btn.category = None
+        btn.setProperty("class", "category-button")
+        btn.setCursor(QCursor(Qt.PointingHandCursor))
+
+        font = QFont()
+        font.setPointSize(16)
+        font.setBold(True)
+        btn.setFont(font)
+
+        btn.setMinimumHeight(40)
+        btn.clicked.connect(lambda checked, b=btn: self.on_category_clicked(b.category))
+        return btn
+
+    @staticmethod
+    def set_button_class(btn, css_class):
+        """Change a button's style class, repolishing only when it changes"""
+        if btn.property("class") == css_class:
+            return
+        btn.setProperty("class", css_class)
+        btn.style().unpolish(btn)
+        btn.style().polish(btn)
+
     def on_category_clicked(self, category):
         """Handle category button click"""
+        if category is None:
+            return
         self.select_category(category)
         self.category_selected.emit(category)
 
@@ -70,23 +95,10 @@ class CategoryView(QWidget):
         """Visually select a category"""
         # Reset all buttons
         for btn in self.category_buttons.values():
-            btn.setProperty("class", "category-button")
-            btn.style().unpolish(btn)
-            btn.style().polish(btn)
+            self.set_button_class(btn, "category-button")
 
         # Highlight selected
         if category and category.id in self.category_buttons:
             btn = self.category_buttons[category.id]
-            btn.setProperty("class", "category-button-selected")
-            btn.style().unpolish(btn)
-            btn.style().polish(btn)
+            self.set_button_class(btn, "category-button-selected")
             self.selected_category = category
-
-    def clear_layout(self):
-        """Clear all widgets from layout"""
-        while self.layout.count():
-            item = self.layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
-        self.category_buttons.clear()
@@ -6,9 +6,12 @@ from PyQt5.QtWidgets import (
     QTableWidget, QTableWidgetItem, QHeaderView, QDialog, QFormLayout,
     QLineEdit, QDoubleSpinBox, QTextEdit, QMessageBox, QCheckBox
 )
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont
 from models import Client
+import config_lowmem
+from views.pagination_bar import PaginationBar
+from utils.spans import timed
 
 
 class AddClientDialog(QDialog):
@@ -138,7 +141,11 @@ class ClientView(QWidget):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.clients = []
+        self.clients = []  # Clients shown on the current page
+        self.search_filters = {}  # Matched in SQL by Client.page
+        self.search_timer = QTimer()
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.apply_search_filter)
         self.setup_ui()
         self.load_clients()
 
@@ -170,6 +177,28 @@ class ClientView(QWidget):
 
         layout.addLayout(header_layout)
 
+        # Search box
+        search_layout = QHBoxLayout()
+        search_label = QLabel("Search:")
+        search_label.setFont(font)
+        search_layout.addWidget(search_label)
+
+        self.search_input = QLineEdit()
+        self.search_input.setFont(font)
+        self.search_input.setPlaceholderText("Search by client name or phone...")
+        self.search_input.textChanged.connect(self.on_search_text_changed)
+        self.search_input.setMinimumWidth(300)
+        search_layout.addWidget(self.search_input)
+
+        clear_search_btn = QPushButton("Clear")
+        clear_search_btn.setFont(font)
+        clear_search_btn.setMinimumHeight(35)
+        clear_search_btn.clicked.connect(self.clear_search)
+        search_layout.addWidget(clear_search_btn)
+
+        search_layout.addStretch()
+        layout.addLayout(search_layout)
+
         # Summary section
         self.summary_label = QLabel()
         self.summary_label.setFont(font)
@@ -192,6 +221,11 @@ class ClientView(QWidget):
         self.clients_table.setSelectionBehavior(QTableWidget.SelectRows)
         layout.addWidget(self.clients_table)
 
+        # Pagination controls
+        self.pagination = PaginationBar(config_lowmem.CLIENT_PAGE_SIZE, "clients", font)
+        self.pagination.page_requested.connect(self.load_page)
+        layout.addWidget(self.pagination)
+
         # Action buttons layout
         action_buttons_layout = QHBoxLayout()
 
@@ -217,12 +251,45 @@ class ClientView(QWidget):
 
         layout.addLayout(action_buttons_layout)
 
+    @timed()
     def load_clients(self):
-        """Load clients from database"""
-        self.clients = Client.get_all(active_only=True)
-        self.refresh_table()
+        """Load the first page of active clients matching the search"""
+        self.search_filters = {'active_only': True, 'search': self.search_input.text().strip()}
+        self.pagination.reset()
+        self.load_page()
         self.update_summary()
 
+    @timed()
+    def load_page(self, after_key=None, backward=False, limit=None):
+        """Load one page of clients"""
+        result = Client.page(
+            after_key=after_key,
+            limit=limit or self.pagination.page_size,
+            filters=self.search_filters,
+            backward=backward
+        )
+        self.clients = result['items']
+        self.pagination.show_result(result)
+        self.refresh_table()
+
+    def on_search_text_changed(self):
+        """Handle search text change with debouncing"""
+        self.search_timer.stop()
+        self.search_timer.start(300)
+
+    def apply_search_filter(self):
+        """Show the first page of clients matching the search"""
+        self.load_clients()
+
+    def clear_search(self):
+        """Clear search input and show all clients"""
+        self.search_timer.stop()
+        self.search_input.blockSignals(True)
+        self.search_input.clear()
+        self.search_input.blockSignals(False)
+        self.load_clients()
+
+    @timed()
     def refresh_table(self):
         """Refresh the clients table"""
         self.clients_table.setRowCount(len(self.clients))
@@ -243,17 +310,15 @@ class ClientView(QWidget):
             self.clients_table.setItem(row, 3, credit_limit_item)
 
     def update_summary(self):
-        """Update summary statistics"""
-        if not self.clients:
+        """Update summary statistics (SQL totals over every matching client)"""
+        totals = Client.totals(self.search_filters)
+        if not totals['count']:
             self.summary_label.setText("No clients found")
             return
 
-        total_clients = len(self.clients)
-        total_credit_limit = sum(client.credit_limit for client in self.clients)
-
         summary_text = (
-            f"Total Clients: {total_clients}  |  "
-            f"Total Credit Limit: {total_credit_limit:.2f} dt"
+            f"Total Clients: {totals['count']}  |  "
+            f"Total Credit Limit: {totals['credit_limit']:.2f} dt"
         )
         self.summary_label.setText(summary_text)
 
@@ -14,17 +14,17 @@ from translations import STATISTICS, COMMON
 class CustomReportDialog(QDialog):
     """Dialog for customizing register reports with filters"""
 
-    def __init__(self, register=None, registers=None, parent=None):
+    def __init__(self, register=None, register_count=None, parent=None):
         super().__init__(parent)
         self.register = register
-        self.registers = registers
+        self.register_count = register_count  # Registers of a combined report
         self.category_checkboxes = {}
 
         title = STATISTICS['custom_report']
         if register:
             title += f" - Register #{register.id}"
-        elif registers:
-            title += f" - {len(registers)} Registers"
+        elif register_count:
+            title += f" - {register_count} Registers"
 
         self.setWindowTitle(title)
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowContextHelpButtonHint)
@@ -9,7 +9,10 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import Qt, QDate, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont, QColor
 from models import Employee, EmployeeExpense, EmployeeDayOff
+from views.pagination_bar import PaginationBar
+from utils.spans import timed
 from datetime import datetime
+import config_lowmem
 
 
 class AddEmployeeDialog(QDialog):
@@ -308,8 +311,8 @@ class EmployeeView(QWidget):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.employees = []
-        self.all_employees = []  # Store all employees for filtering
+        self.employees = []  # Employees shown on the current page
+        self.search_filters = {}  # Matched in SQL by Employee.page
         self.search_timer = QTimer()
         self.search_timer.setSingleShot(True)
         self.search_timer.timeout.connect(self.apply_search_filter)
@@ -376,7 +379,7 @@ class EmployeeView(QWidget):
         self.start_date = QDateEdit()
         self.start_date.setFont(font)
         self.start_date.setCalendarPopup(True)
-        self.start_date.setDate(QDate.currentDate().addDays(-30))
+        self.start_date.setDate(QDate.currentDate().addDays(-config_lowmem.DEFAULT_DATE_RANGE_DAYS))
         self.start_date.setDisplayFormat("yyyy/MM/dd")
         filter_layout.addWidget(self.start_date)
 
@@ -387,7 +390,9 @@ class EmployeeView(QWidget):
         self.end_date.setCalendarPopup(True)
         self.end_date.setDate(QDate.currentDate())
         self.end_date.setDisplayFormat("yyyy/MM/dd")
+        self.end_date.dateChanged.connect(self.limit_date_range)
         filter_layout.addWidget(self.end_date)
+        self.limit_date_range(self.end_date.date())
 
         calculate_btn = QPushButton("Calculate")
         calculate_btn.setFont(font)
@@ -419,6 +424,11 @@ class EmployeeView(QWidget):
         self.employees_table.setSelectionBehavior(QTableWidget.SelectRows)
         layout.addWidget(self.employees_table)
 
+        # Pagination controls
+        self.pagination = PaginationBar(config_lowmem.EMPLOYEE_PAGE_SIZE, "employees", font)
+        self.pagination.page_requested.connect(self.load_page)
+        layout.addWidget(self.pagination)
+
         # Action buttons
         action_buttons_layout = QHBoxLayout()
 
@@ -462,10 +472,28 @@ class EmployeeView(QWidget):
 
         layout.addLayout(action_buttons_layout)
 
+    def limit_date_range(self, end_date):
+        """Keep the balance range within config_lowmem.MAX_DATE_RANGE_DAYS of the end date"""
+        self.start_date.setDateRange(end_date.addDays(-config_lowmem.MAX_DATE_RANGE_DAYS), end_date)
+
+    @timed()
     def load_employees(self):
-        """Load employees from database"""
-        self.all_employees = Employee.get_all()
-        self.employees = self.all_employees.copy()
+        """Load the first page of employees matching the search"""
+        self.search_filters = {'search': self.search_input.text().strip()}
+        self.pagination.reset()
+        self.load_page()
+
+    @timed()
+    def load_page(self, after_key=None, backward=False, limit=None):
+        """Load one page of employees"""
+        result = Employee.page(
+            after_key=after_key,
+            limit=limit or self.pagination.page_size,
+            filters=self.search_filters,
+            backward=backward
+        )
+        self.employees = result['items']
+        self.pagination.show_result(result)
         self.refresh_table()
 
     def on_search_text_changed(self):
@@ -476,27 +504,18 @@ class EmployeeView(QWidget):
         self.search_timer.start(300)
 
     def apply_search_filter(self):
-        """Apply search filter to employee list"""
-        search_text = self.search_input.text().strip().lower()
-
-        if not search_text:
-            # No search text, show all employees
-            self.employees = self.all_employees.copy()
-        else:
-            # Filter employees by name
-            self.employees = [
-                emp for emp in self.all_employees
-                if search_text in emp.name.lower()
-            ]
-
-        self.refresh_table()
+        """Show the first page of employees whose name matches the search (in SQL)"""
+        self.load_employees()
 
     def clear_search(self):
         """Clear search input and show all employees"""
+        self.search_timer.stop()
+        self.search_input.blockSignals(True)
         self.search_input.clear()
-        self.employees = self.all_employees.copy()
-        self.refresh_table()
+        self.search_input.blockSignals(False)
+        self.load_employees()
 
+    @timed()
     def refresh_table(self):
         """Refresh the employees table"""
         start = self.start_date.date().toString("yyyy/MM/dd")
@@ -607,7 +626,8 @@ class EmployeeView(QWidget):
 
     def add_expense(self):
         """Add expense for an employee"""
-        active_employees = [e for e in self.employees if e.is_active]
+        # Any active employee, not only the ones on this page
+        active_employees = Employee.get_all(active_only=True)
 
         if not active_employees:
             QMessageBox.warning(self, "No Employees", "No active employees found. Please add employees first.")
@@ -634,7 +654,8 @@ class EmployeeView(QWidget):
 
     def add_day_off(self):
         """Add day off for an employee"""
-        active_employees = [e for e in self.employees if e.is_active]
+        # Any active employee, not only the ones on this page
+        active_employees = Employee.get_all(active_only=True)
 
         if not active_employees:
             QMessageBox.warning(self, "No Employees", "No active employees found. Please add employees first.")
@@ -796,11 +817,13 @@ class EmployeeExpensesDialog(QDialog):
 
         layout.addLayout(button_layout)
 
+    @timed()
     def load_expenses(self):
         """Load expenses for employee"""
         self.expenses = self.employee.get_expenses()
         self.refresh_table()
 
+    @timed()
     def refresh_table(self):
         """Refresh expenses table"""
         self.expenses_table.setRowCount(len(self.expenses))
@@ -919,11 +942,13 @@ class EmployeeDaysOffDialog(QDialog):
 
         layout.addLayout(button_layout)
 
+    @timed()
     def load_days_off(self):
         """Load days off for employee"""
         self.days_off = self.employee.get_days_off()
         self.refresh_table()
 
+    @timed()
     def refresh_table(self):
         """Refresh days off table"""
         self.daysoff_table.setRowCount(len(self.days_off))
@@ -8,8 +8,11 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont, QColor
-from models import Order, Register
+from models import Order, Register, get_db
+import config_lowmem
+from views.pagination_bar import PaginationBar
 from translations import HISTORY, COMMON
+from utils.spans import timed
 
 
 class ReprintDialog(QDialog):
@@ -224,9 +227,10 @@ class HistoryView(QWidget):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.orders = []
-        self.all_orders = []  # Store all orders for filtering
+        self.orders = []  # Orders shown on the current page
+        self.search_filters = {}  # Register and search text, matched in SQL by Order.page
         self.current_register = None
+        self.change_seq = None  # Change log position of the last load (see refresh_orders)
         self.search_timer = QTimer()
         self.search_timer.setSingleShot(True)
         self.search_timer.timeout.connect(self.apply_search_filter)
@@ -310,6 +314,11 @@ class HistoryView(QWidget):
         self.orders_table.doubleClicked.connect(self.show_order_details)
         layout.addWidget(self.orders_table)
 
+        # Pagination controls
+        self.pagination = PaginationBar(config_lowmem.HISTORY_PAGE_SIZE, "orders", font)
+        self.pagination.page_requested.connect(self.load_page)
+        layout.addWidget(self.pagination)
+
         # Action buttons layout
         action_buttons_layout = QHBoxLayout()
 
@@ -341,23 +350,83 @@ class HistoryView(QWidget):
 
         layout.addLayout(action_buttons_layout)
 
+    @timed()
     def load_orders(self):
-        """Load orders for current register"""
+        """Load the first page of orders for current register"""
+        # Remember the change log position first so changes made meanwhile are merged later
+        self.change_seq = get_db().change_seq()
+
         # Get current register
         self.current_register = Register.get_current_register()
 
         if self.current_register:
-            # Load orders for this register only
-            self.all_orders = Order.get_by_register(self.current_register.id)
-            self.orders = self.all_orders.copy()
             self.update_register_info()
         else:
             # No register open
-            self.all_orders = []
-            self.orders = []
             self.register_info_label.setText("No register is currently open")
 
+        self.set_search_filters()
+        self.pagination.reset()
+        self.load_page()
+        self.update_summary()
+
+    def set_search_filters(self):
+        """Build the Order.page filters from the current register and search text"""
+        self.search_filters = {
+            'register_id': self.current_register.id if self.current_register else None,
+            'search': self.search_input.text().strip(),
+        }
+
+    @timed()
+    def load_page(self, after_key=None, backward=False, limit=None):
+        """Load one page of the current register's orders matching the search"""
+        if not self.current_register:
+            self.orders = []
+            self.pagination.show_result({'total': 0, 'first_key': None, 'last_key': None})
+        else:
+            result = Order.page(
+                after_key=after_key,
+                limit=limit or self.pagination.page_size,
+                filters=self.search_filters,
+                backward=backward,
+                load_items=True
+            )
+            self.orders = result['items']
+            self.pagination.show_result(result)
         self.refresh_table()
+
+    @timed()
+    def refresh_orders(self):
+        """Merge only the orders inserted, updated or deleted since the last load"""
+        current_register = Register.get_current_register()
+        same_register = (
+            current_register is not None and self.current_register is not None
+            and current_register.id == self.current_register.id
+        )
+        changes = get_db().changes_since(self.change_seq, ('orders', 'order_items')) if same_register else None
+        if changes is None:
+            self.load_orders()
+            return
+
+        self.change_seq = changes['seq']
+        changed_ids = changes['tables']['orders'] | changes['tables']['order_items']
+        if not changed_ids:
+            return
+
+        if self.pagination.current_page == 1:
+            # New orders sort first, so the first page is simply fetched again
+            self.load_page()
+        else:
+            # Other pages keep their position: update shown rows in place, drop deleted ones
+            changed = {
+                order.id: order
+                for order in Order.get_by_ids(changed_ids, register_id=self.current_register.id)
+            }
+            self.orders = [
+                changed.get(order.id, order) for order in self.orders
+                if order.id not in changed_ids or order.id in changed
+            ]
+            self.refresh_table()
         self.update_summary()
 
     def on_search_text_changed(self):
@@ -368,37 +437,21 @@ class HistoryView(QWidget):
         self.search_timer.start(300)
 
     def apply_search_filter(self):
-        """Apply search filter to order list"""
-        search_text = self.search_input.text().strip().lower()
-
-        if not search_text:
-            # No search text, show all orders
-            self.orders = self.all_orders.copy()
-        else:
-            # Filter orders by order number or product name
-            self.orders = []
-            for order in self.all_orders:
-                # Check order number
-                if search_text in str(order.order_number).lower():
-                    self.orders.append(order)
-                    continue
-
-                # Check product names in order items
-                for item in order.items:
-                    if search_text in item.product_name.lower():
-                        self.orders.append(order)
-                        break
-
-        self.refresh_table()
+        """Show the first page of orders matching the search (order number or product name, in SQL)"""
+        self.set_search_filters()
+        self.pagination.reset()
+        self.load_page()
         self.update_summary()
 
     def clear_search(self):
         """Clear search input and show all orders"""
+        self.search_timer.stop()
+        self.search_input.blockSignals(True)
         self.search_input.clear()
-        self.orders = self.all_orders.copy()
-        self.refresh_table()
-        self.update_summary()
+        self.search_input.blockSignals(False)
+        self.apply_search_filter()
 
+    @timed()
     def refresh_table(self):
         """Refresh the orders table"""
         self.orders_table.setRowCount(len(self.orders))
@@ -458,19 +511,18 @@ class HistoryView(QWidget):
             self.register_info_label.setText(info_text)
 
     def update_summary(self):
-        """Update summary statistics"""
-        if not self.orders:
+        """Update summary statistics (SQL totals over every matching order, not just this page)"""
+        totals = Order.totals(self.search_filters) if self.current_register else None
+        if not totals or not totals['orders']:
             self.summary_label.setText("No orders for this register")
+            self.pagination.set_total(0)
             return
 
-        total_orders = len(self.orders)
-        total_items = sum(sum(item.quantity for item in order.items) for order in self.orders)
-        delivery_orders = sum(1 for order in self.orders if order.is_delivery)
-
+        self.pagination.set_total(totals['orders'])
         summary_text = (
-            f"Total Orders: {total_orders}  |  "
-            f"Total Items Sold: {total_items}  |  "
-            f"Delivery Orders: {delivery_orders}"
+            f"Total Orders: {totals['orders']}  |  "
+            f"Total Items Sold: {totals['items']}  |  "
+            f"Delivery Orders: {totals['delivery_orders']}"
         )
         self.summary_label.setText(summary_text)
 
@@ -542,8 +594,8 @@ class HistoryView(QWidget):
         # Show reprint dialog to choose which ticket to print
         dialog = ReprintDialog(order, self)
         if dialog.exec_() == dialog.Accepted:
-            # Reload orders to update reprint count
-            self.load_orders()
+            # Merge the order to update reprint count
+            self.refresh_orders()
 
     def delete_order(self):
         """Delete selected order (requires admin auth)"""
@@ -578,7 +630,7 @@ class HistoryView(QWidget):
             try:
                 order.delete()
                 QMessageBox.information(self, "Success", f"Order #{order.order_number} has been deleted.")
-                # Reload orders
-                self.load_orders()
+                # Drop the deleted order from the list
+                self.refresh_orders()
             except Exception as e:
                 QMessageBox.critical(self, "Delete Error", f"Failed to delete order:\n{str(e)}")
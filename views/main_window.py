@@ -3,27 +3,41 @@ Main window for the POS application
 """
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
-    QPushButton, QLabel, QScrollArea, QGridLayout, QStackedWidget, QMessageBox
+    QPushButton, QLabel, QScrollArea, QGridLayout, QStackedWidget, QMessageBox, QShortcut
 )
 from PyQt5.QtCore import Qt, pyqtSignal, QTimer
-from PyQt5.QtGui import QFont, QIcon, QPixmap
+from PyQt5.QtGui import QFont, QIcon, QPixmap, QKeySequence
+import importlib
+import time
 import config
+import config_lowmem
 from models import Category, Product, Register
 from views.category_view import CategoryView
-from views.product_view import ProductView
+from views.product_view import ProductView, THUMBNAIL_SIZE
 from views.cart_view import CartView
-from views.settings_view import SettingsView
-from views.history_view import HistoryView
-from views.statistics_view import StatisticsView
-from views.employee_view import EmployeeView
-from views.client_view import ClientView
-from views.toppings_view import ToppingsView
 from views.topping_selection_dialog import ToppingSelectionDialog
 from views.register_dialog import OpenRegisterDialog, CloseRegisterDialog
 from views.admin_auth_dialog import AdminAuthDialog
 from controllers.order_controller import OrderController
-from utils.memory_optimizer import get_optimizer
+from utils.memory_optimizer import get_optimizer, get_governor
+from utils.checkout_journal import get_journal
+from utils import backup
+from utils.thumbnails import get_thumbnails
+from utils.diagnostics import get_diagnostics
+from utils.profiler import get_profiler
 from translations import MAIN_WINDOW
+from utils.spans import timed
+
+# Screens built on first use (their modules are imported then too):
+# name -> (module, class, closed signal, close handler)
+LAZY_VIEWS = {
+    'settings': ('views.settings_view', 'SettingsView', 'settings_closed', 'close_settings'),
+    'history': ('views.history_view', 'HistoryView', 'history_closed', 'close_history'),
+    'statistics': ('views.statistics_view', 'StatisticsView', 'statistics_closed', 'close_statistics'),
+    'employees': ('views.employee_view', 'EmployeeView', 'employee_view_closed', 'close_employees'),
+    'clients': ('views.client_view', 'ClientView', 'client_view_closed', 'close_clients'),
+    'toppings': ('views.toppings_view', 'ToppingsView', 'toppings_closed', 'close_toppings'),
+}
 
 
 class MainWindow(QMainWindow):
@@ -50,16 +64,36 @@ class MainWindow(QMainWindow):
         # Current register
         self.current_register = None
 
+        # Lazily built screens (see LAZY_VIEWS) and when each was last left
+        self.views = {}
+        self.view_closed_at = {}
+
         # Setup UI
         self.setup_ui()
 
         # Check for open register on startup
         self.check_register()
+        get_diagnostics().screen_opened('orders')  # SQL time is counted per screen visit
+
+        # Decode the whole menu's thumbnails in the background
+        if config_lowmem.PRELOAD_IMAGES:
+            get_thumbnails().preload([product.image_path for product in Product.get_all()], THUMBNAIL_SIZE)
 
-        # Setup periodic memory cleanup (every 5 minutes)
+        # Sample memory regularly; full collections only run when idle or over budget
+        self.last_activity = time.monotonic()
+        self.memory_governor = get_governor()
         self.cleanup_timer = QTimer()
         self.cleanup_timer.timeout.connect(self.periodic_memory_cleanup)
-        self.cleanup_timer.start(300000)  # 5 minutes in milliseconds
+        self.cleanup_timer.start(config_lowmem.MEMORY_CHECK_SECONDS * 1000)
+
+        # Hidden hotkey for an on-site profile capture
+        self.profile_shortcut = QShortcut(QKeySequence(config_lowmem.PROFILE_HOTKEY), self)
+        self.profile_shortcut.activated.connect(self.toggle_profiling)
+
+        # Take a backup when the POS has been idle for a while (checked every minute)
+        self.backup_timer = QTimer()
+        self.backup_timer.timeout.connect(self.check_idle_backup)
+        self.backup_timer.start(60000)
 
     def setup_ui(self):
         """Setup the main user interface"""
@@ -196,43 +230,13 @@ class MainWindow(QMainWindow):
         # Add main view to stacked widget
         self.stacked_widget.addWidget(main_view)
 
-        # Settings view
-        self.settings_view = SettingsView()
-        self.settings_view.settings_closed.connect(self.close_settings)
-        self.settings_view.open_toppings_requested.connect(self.open_toppings)
-        self.stacked_widget.addWidget(self.settings_view)
-
-        # History view
-        self.history_view = HistoryView()
-        self.history_view.history_closed.connect(self.close_history)
-        self.stacked_widget.addWidget(self.history_view)
-
-        # Statistics view
-        self.statistics_view = StatisticsView()
-        self.statistics_view.statistics_closed.connect(self.close_statistics)
-        self.stacked_widget.addWidget(self.statistics_view)
-
-        # Employee view
-        self.employee_view = EmployeeView()
-        self.employee_view.employee_view_closed.connect(self.close_employees)
-        self.stacked_widget.addWidget(self.employee_view)
-
-        # Client view
-        self.client_view = ClientView()
-        self.client_view.client_view_closed.connect(self.close_clients)
-        self.stacked_widget.addWidget(self.client_view)
-
-        # Toppings view
-        self.toppings_view = ToppingsView()
-        self.toppings_view.toppings_closed.connect(self.close_toppings)
-        self.stacked_widget.addWidget(self.toppings_view)
-
         # Show main view by default
         self.stacked_widget.setCurrentIndex(0)
 
         # Load initial data
         self.load_categories()
 
+    @timed()
     def load_categories(self):
         """Load categories from database"""
         categories = Category.get_all(active_only=True)
@@ -245,12 +249,14 @@ class MainWindow(QMainWindow):
 
     def on_category_selected(self, category):
         """Handle category selection"""
+        self.last_activity = time.monotonic()
         self.current_category = category
         products = Product.get_by_category(category.id, active_only=True)
         self.product_view.set_products(products, category.name)
 
     def on_product_selected(self, product):
         """Handle product selection"""
+        self.last_activity = time.monotonic()
         category_name = self.current_category.name if hasattr(self, 'current_category') else ''
 
         # Check if product or its category has topping groups
@@ -284,6 +290,7 @@ class MainWindow(QMainWindow):
 
     def on_checkout(self, is_delivery, delivery_data):
         """Handle checkout"""
+        self.last_activity = time.monotonic()
         try:
             # Get selected client ID from cart view
             client_id = self.cart_view.get_selected_client_id()
@@ -296,16 +303,60 @@ class MainWindow(QMainWindow):
             if "No register" in str(e):
                 self.toggle_register()
 
+    def view(self, name):
+        """Get a screen, building it (and importing its module) on first use"""
+        view = self.views.get(name)
+        if view is None:
+            module_name, class_name, closed_signal, close_handler = LAZY_VIEWS[name]
+            view = getattr(importlib.import_module(module_name), class_name)()
+            getattr(view, closed_signal).connect(getattr(self, close_handler))
+            if name == 'settings':
+                view.open_toppings_requested.connect(self.open_toppings)
+            self.stacked_widget.addWidget(view)
+            self.views[name] = view
+        return view
+
+    def show_view(self, name):
+        """Switch to a screen"""
+        self.view_closed_at.pop(name, None)
+        get_diagnostics().screen_opened(name)
+        self.stacked_widget.setCurrentWidget(self.view(name))
+        get_profiler().notify('screen')
+
+    def show_main_view(self):
+        """Return to the order screen from the current screen"""
+        for name, view in self.views.items():
+            if view is self.stacked_widget.currentWidget():
+                self.view_closed_at[name] = time.monotonic()
+        get_diagnostics().screen_opened('orders')
+        self.stacked_widget.setCurrentIndex(0)
+
+    def release_idle_views(self):
+        """Destroy screens left unused for RELEASE_VIEWS_AFTER_MINUTES (rebuilt when opened again)"""
+        minutes = config_lowmem.RELEASE_VIEWS_AFTER_MINUTES
+        if not minutes:
+            return
+        now = time.monotonic()
+        for name, closed_at in list(self.view_closed_at.items()):
+            view = self.views.get(name)
+            if view is None or view is self.stacked_widget.currentWidget():
+                continue
+            if now - closed_at >= minutes * 60:
+                self.stacked_widget.removeWidget(view)
+                view.deleteLater()
+                del self.views[name]
+                del self.view_closed_at[name]
+
     def open_settings(self):
         """Open settings page with admin authentication"""
         auth_dialog = AdminAuthDialog(self)
         if auth_dialog.exec_() == auth_dialog.Accepted:
             # Switch to settings view
-            self.stacked_widget.setCurrentIndex(1)
+            self.show_view('settings')
 
     def close_settings(self):
         """Close settings and return to main view"""
-        self.stacked_widget.setCurrentIndex(0)
+        self.show_main_view()
         # Reload categories in case settings changed
         self.load_categories()
         # Refresh current products view if category is selected
@@ -315,72 +366,87 @@ class MainWindow(QMainWindow):
 
     def open_history(self):
         """Open history page (no auth required for employees)"""
-        # Refresh history data before showing
-        self.history_view.load_orders()
+        # Merge orders changed since the history was last shown
+        self.flush_journal()
+        self.view('history').refresh_orders()
         # Switch to history view
-        self.stacked_widget.setCurrentIndex(2)
+        self.show_view('history')
 
     def close_history(self):
         """Close history and return to main view"""
-        self.stacked_widget.setCurrentIndex(0)
+        self.show_main_view()
 
     def open_statistics(self):
         """Open statistics page (admin only)"""
         auth_dialog = AdminAuthDialog(self)
         if auth_dialog.exec_() == auth_dialog.Accepted:
-            # Refresh statistics data before showing
-            self.statistics_view.load_data()
+            # Merge registers and orders changed since the statistics were last shown
+            self.flush_journal()
+            self.view('statistics').refresh_data()
             # Switch to statistics view
-            self.stacked_widget.setCurrentIndex(3)
+            self.show_view('statistics')
 
     def close_statistics(self):
         """Close statistics and return to main view"""
-        self.stacked_widget.setCurrentIndex(0)
+        self.show_main_view()
 
     def open_employees(self):
         """Open employee management page (admin only)"""
         auth_dialog = AdminAuthDialog(self)
         if auth_dialog.exec_() == auth_dialog.Accepted:
             # Refresh employee data before showing
-            self.employee_view.load_employees()
+            self.view('employees').load_employees()
             # Switch to employee view
-            self.stacked_widget.setCurrentIndex(4)
+            self.show_view('employees')
 
     def close_employees(self):
         """Close employees and return to main view"""
-        self.stacked_widget.setCurrentIndex(0)
+        self.show_main_view()
 
     def open_clients(self):
         """Open client management page (admin only)"""
         auth_dialog = AdminAuthDialog(self)
         if auth_dialog.exec_() == auth_dialog.Accepted:
-            # Refresh client data before showing
-            self.client_view.load_clients()
+            # Refresh client data (with balances of journaled credit sales) before showing
+            self.flush_journal()
+            self.view('clients').load_clients()
             # Switch to client view
-            self.stacked_widget.setCurrentIndex(5)
+            self.show_view('clients')
 
     def close_clients(self):
         """Close clients and return to main view"""
-        self.stacked_widget.setCurrentIndex(0)
+        self.show_main_view()
         # Refresh client list in cart view
         self.cart_view.refresh_clients()
 
     def open_toppings(self):
         """Open toppings management page"""
         # Refresh topping data before showing
-        self.toppings_view.load_groups()
+        self.view('toppings').load_groups()
         # Switch to toppings view
-        self.stacked_widget.setCurrentIndex(6)
+        self.show_view('toppings')
 
     def close_toppings(self):
         """Close toppings and return to main view"""
-        self.stacked_widget.setCurrentIndex(0)
+        self.show_main_view()
 
     def check_register(self):
         """Check if a register is open and update UI accordingly"""
         self.current_register = Register.get_current_register()
         self.update_register_ui()
 
+    def flush_journal(self):
+        """Wait for journaled sales to reach the database; warns and returns False if they do not in time"""
+        journal = get_journal()
+        if journal.flush(config_lowmem.JOURNAL_FLUSH_TIMEOUT_SECONDS):
+            return True
+        QMessageBox.warning(
+            self,
+            MAIN_WINDOW['journal_error'],
+            MAIN_WINDOW['journal_not_written'].format(count=journal.pending_count())
+        )
+        return False
+
     def update_register_ui(self):
         """Update register-related UI elements"""
         if self.current_register:
@@ -397,7 +463,10 @@ class MainWindow(QMainWindow):
     def toggle_register(self):
         """Open or close register"""
         if self.current_register:
-            # Close register
+            # Close register: sales must be in the database before the expected cash is computed
+            if not self.flush_journal():
+                return
+            self.current_register = Register.get_by_id(self.current_register.id)
             dialog = CloseRegisterDialog(self.current_register, self)
             if dialog.exec_() == dialog.Accepted:
                 data = dialog.get_data()
@@ -409,6 +478,8 @@ class MainWindow(QMainWindow):
                 )
                 self.current_register = None
                 self.update_register_ui()
+                # Back up the day's sales in the background
+                backup.start_backup('close')
         else:
             # Open register
             dialog = OpenRegisterDialog(self)
@@ -437,5 +508,19 @@ class MainWindow(QMainWindow):
                 )
 
     def periodic_memory_cleanup(self):
-        """Periodically clean up memory"""
-        self.memory_optimizer.periodic_cleanup()
+        """Free idle screens and let the memory governor collect if the till is idle or over budget"""
+        self.release_idle_views()
+        self.memory_governor.check(time.monotonic() - self.last_activity)
+
+    def toggle_profiling(self):
+        """Start a PROFILE_CAPTURE_SECONDS profile capture, or stop the running one"""
+        profiler = get_profiler()
+        if profiler.running:
+            profiler.stop()
+        else:
+            profiler.start(seconds=config_lowmem.PROFILE_CAPTURE_SECONDS)
+
+    def check_idle_backup(self):
+        """Start a background backup if the POS is idle and one is due"""
+        if backup.backup_due(time.monotonic() - self.last_activity):
+            backup.start_backup('idle')
@@ -0,0 +1,127 @@
+"""
+Pagination controls for lists loaded one page at a time with keyset pagination
+"""
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QLabel, QPushButton
+from PyQt5.QtCore import pyqtSignal
+
+
+class PaginationBar(QWidget):
+    """First / previous / next / last buttons and a "Showing x-y of n" label
+
+    The owning view connects page_requested(after_key, backward, limit) to
+    its loader, which calls the model's page() method and passes the result
+    to show_result(). Keys are the 'first_key'/'last_key' of that result.
+    """
+
+    page_requested = pyqtSignal(object, bool, int)
+
+    def __init__(self, page_size, noun, font, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self.noun = noun  # Shown in "Showing 1-20 of 57 <noun>"
+        self.current_page = 1
+        self.total = 0
+        self.first_key = None  # Keyset bounds of the current page
+        self.last_key = None
+        self.setup_ui(font)
+
+    def setup_ui(self, font):
+        """Setup pagination controls"""
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.page_info_label = QLabel()
+        self.page_info_label.setFont(font)
+        layout.addWidget(self.page_info_label)
+
+        layout.addStretch()
+
+        self.first_page_btn = QPushButton("⏮ First")
+        self.first_page_btn.setFont(font)
+        self.first_page_btn.setMinimumHeight(35)
+        self.first_page_btn.clicked.connect(self.go_to_first_page)
+        layout.addWidget(self.first_page_btn)
+
+        self.prev_page_btn = QPushButton("◀ Previous")
+        self.prev_page_btn.setFont(font)
+        self.prev_page_btn.setMinimumHeight(35)
+        self.prev_page_btn.clicked.connect(self.go_to_previous_page)
+        layout.addWidget(self.prev_page_btn)
+
+        self.page_label = QLabel()
+        self.page_label.setFont(font)
+        self.page_label.setStyleSheet("font-weight: bold; padding: 0 20px;")
+        layout.addWidget(self.page_label)
+
+        self.next_page_btn = QPushButton("Next ▶")
+        self.next_page_btn.setFont(font)
+        self.next_page_btn.setMinimumHeight(35)
+        self.next_page_btn.clicked.connect(self.go_to_next_page)
+        layout.addWidget(self.next_page_btn)
+
+        self.last_page_btn = QPushButton("Last ⏭")
+        self.last_page_btn.setFont(font)
+        self.last_page_btn.setMinimumHeight(35)
+        self.last_page_btn.clicked.connect(self.go_to_last_page)
+        layout.addWidget(self.last_page_btn)
+
+        self.update_controls()
+
+    def reset(self):
+        """Go back to the first page (before loading it, e.g. for a new search)"""
+        self.current_page = 1
+
+    def show_result(self, result):
+        """Take the total and keyset bounds of a page() result"""
+        self.total = result['total']
+        self.first_key = result['first_key']
+        self.last_key = result['last_key']
+        self.update_controls()
+
+    def set_total(self, total):
+        """Update the total after rows of the current page changed in place"""
+        self.total = total
+        self.update_controls()
+
+    def get_total_pages(self):
+        """Get number of pages for the current total"""
+        return max(1, (self.total + self.page_size - 1) // self.page_size)
+
+    def update_controls(self):
+        """Update pagination button states and labels"""
+        total_pages = self.get_total_pages()
+        start_idx = min((self.current_page - 1) * self.page_size + 1, self.total)
+        end_idx = min(self.current_page * self.page_size, self.total)
+
+        self.page_label.setText(f"Page {self.current_page} of {total_pages}")
+        self.page_info_label.setText(f"Showing {start_idx}-{end_idx} of {self.total} {self.noun}")
+
+        self.first_page_btn.setEnabled(self.current_page > 1)
+        self.prev_page_btn.setEnabled(self.current_page > 1)
+        self.next_page_btn.setEnabled(self.current_page < total_pages)
+        self.last_page_btn.setEnabled(self.current_page < total_pages)
+
+    def go_to_first_page(self):
+        """Go to first page"""
+        self.current_page = 1
+        self.page_requested.emit(None, False, self.page_size)
+
+    def go_to_previous_page(self):
+        """Go to previous page"""
+        if self.current_page > 1:
+            self.current_page -= 1
+            self.page_requested.emit(self.first_key, True, self.page_size)
+
+    def go_to_next_page(self):
+        """Go to next page"""
+        if self.current_page < self.get_total_pages():
+            self.current_page += 1
+            self.page_requested.emit(self.last_key, False, self.page_size)
+
+    def go_to_last_page(self):
+        """Go to last page"""
+        total_pages = self.get_total_pages()
+        self.current_page = total_pages
+        # The last page holds the remainder so page boundaries match walking forward
+        last_page_size = self.total - (total_pages - 1) * self.page_size
+        self.page_requested.emit(None, True, max(1, last_page_size))
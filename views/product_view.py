@@ -2,10 +2,16 @@
 Product selection view
 """
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QGridLayout, QLabel, QPushButton, QHBoxLayout
-from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtGui import QFont, QPixmap, QCursor
+from PyQt5.QtCore import Qt, pyqtSignal, QSize
+from PyQt5.QtGui import QFont, QCursor
 import config
-import os
+from utils.thumbnails import get_thumbnails
+from utils.spans import timed
+
+# Product cell size; images are shown in the top three quarters
+CELL_MIN_SIZE = QSize(150, 100)
+CELL_MAX_SIZE = QSize(250, 100)
+THUMBNAIL_SIZE = QSize(CELL_MAX_SIZE.width(), int(CELL_MAX_SIZE.height() * 0.75))
 
 
 class ProductView(QWidget):
@@ -19,6 +25,11 @@ class ProductView(QWidget):
         self.current_category = ""
         self.current_page = 1
         self.total_pages = 1
+        self.waiting_for_image = {}  # Image path -> product cells showing a placeholder
+        self.cells = []  # One reusable widget per grid position
+
+        self.thumbnails = get_thumbnails()
+        self.thumbnails.thumbnail_ready.connect(self.on_thumbnail_ready)
 
         self.setup_ui()
 
@@ -67,6 +78,20 @@ class ProductView(QWidget):
         self.grid_layout.setContentsMargins(5, 5, 5, 5)
         layout.addWidget(self.grid_widget)
 
+        # The cells are created once and rebound to the products of each page
+        cols = config.PRODUCT_GRID_COLUMNS
+        for index in range(config.PRODUCTS_PER_PAGE):
+            cell = self.create_product_widget()
+            cell.hide()
+            self.cells.append(cell)
+            self.grid_layout.addWidget(cell, index // cols, index % cols)
+
+        # Set column and row stretching
+        for i in range(cols):
+            self.grid_layout.setColumnStretch(i, 1)
+        for i in range(config.PRODUCT_GRID_ROWS):
+            self.grid_layout.setRowStretch(i, 1)
+
     def set_products(self, products, category_name=""):
         """Set and display products"""
         self.products = products
@@ -80,79 +105,51 @@ class ProductView(QWidget):
 
         self.refresh_display()
 
+    @timed()
     def refresh_display(self):
         """Refresh the product grid display"""
-        # Clear grid
-        while self.grid_layout.count():
-            item = self.grid_layout.takeAt(0)
-            widget = item.widget()
-            if widget:
-                widget.deleteLater()
+        self.waiting_for_image = {}
 
         # Update pagination
         self.page_label.setText(f"Page: {self.current_page}/{self.total_pages}")
         self.prev_btn.setEnabled(self.current_page > 1)
         self.next_btn.setEnabled(self.current_page < self.total_pages)
 
-        # Show products for current page
+        # Show products for current page; unused cells are hidden
         active_products = [p for p in self.products if p.is_active]
         start_idx = (self.current_page - 1) * config.PRODUCTS_PER_PAGE
         end_idx = start_idx + config.PRODUCTS_PER_PAGE
         page_products = active_products[start_idx:end_idx]
 
-        cols = config.PRODUCT_GRID_COLUMNS
-        rows = config.PRODUCT_GRID_ROWS
-
-        row = 0
-        col = 0
+        for index, cell in enumerate(self.cells):
+            if index < len(page_products):
+                self.bind_product_widget(cell, page_products[index])
+                cell.show()
+            else:
+                cell.product = None
+                cell.hide()
 
-        for product in page_products:
-            product_widget = self.create_product_widget(product)
-            self.grid_layout.addWidget(product_widget, row, col)
-
-            col += 1
-            if col >= cols:
-                col = 0
-                row += 1
-
-        # Set column and row stretching
-        for i in range(cols):
-            self.grid_layout.setColumnStretch(i, 1)
-        for i in range(rows):
-            self.grid_layout.setRowStretch(i, 1)
-
-    def create_product_widget(self, product):
-        """Create a widget for a single product"""
+    def create_product_widget(self):
+        """Create a product cell (bound to a product by bind_product_widget)"""
         widget = QLabel()
+        widget.product = None
         widget.setProperty("class", "product-item")
         widget.setCursor(QCursor(Qt.PointingHandCursor))
         widget.setAlignment(Qt.AlignCenter)
-        widget.setMaximumSize(250, 100)
-        widget.setMinimumSize(150, 100)
-
-        # Try to load product image
-        if product.image_path and os.path.exists(product.image_path):
-            pixmap = QPixmap(product.image_path)
-            scaled_pixmap = pixmap.scaled(
-                widget.width(),
-                int(widget.height() * 0.75),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation
-            )
-            widget.setPixmap(scaled_pixmap)
-        else:
-            # Placeholder if no image - show product name centered
-            widget.setText(product.name)
-            font = QFont()
-            font.setPointSize(14)
-            font.setBold(True)
-            widget.setFont(font)
+        widget.setMaximumSize(CELL_MAX_SIZE)
+        widget.setMinimumSize(CELL_MIN_SIZE)
+
+        # Font of the product name shown when there is no image
+        font = QFont()
+        font.setPointSize(14)
+        font.setBold(True)
+        widget.setFont(font)
 
         # Price label at the bottom (replaces the name banner)
-        price_label = QLabel(f"{product.price}dt", widget)
-        price_label.setProperty("class", "product-price")
-        price_label.setAlignment(Qt.AlignCenter)
-        price_label.setGeometry(
+        widget.price_label = QLabel(widget)
+        widget.price_label.setProperty("class", "product-price")
+        widget.price_label.setAlignment(Qt.AlignCenter)
+        widget.price_label.setGeometry(
             0,
             widget.height() - 22,
             widget.width(),
@@ -160,12 +157,38 @@ class ProductView(QWidget):
         )
 
         # Click event
-        widget.mousePressEvent = lambda event, p=product: self.on_product_clicked(p)
+        widget.mousePressEvent = lambda event, w=widget: self.on_product_clicked(w.product)
 
         return widget
 
+    def bind_product_widget(self, widget, product):
+        """Show a product in a cell"""
+        widget.product = product
+        widget.price_label.setText(f"{product.price}dt")
+
+        # Pre-scaled thumbnail from the cache; until it is decoded in the
+        # background (or if there is no image) show the product name
+        pixmap = self.thumbnails.pixmap(product.image_path, THUMBNAIL_SIZE) if product.image_path else None
+        if pixmap is not None:
+            widget.setPixmap(pixmap)
+        else:
+            widget.setText(product.name)
+            if product.image_path:
+                self.waiting_for_image.setdefault(product.image_path, []).append(widget)
+
+    def on_thumbnail_ready(self, path):
+        """Show a thumbnail that finished decoding on the widgets waiting for it"""
+        pixmap = self.thumbnails.pixmap(path, THUMBNAIL_SIZE)
+        if pixmap is None:
+            return
+        for widget in self.waiting_for_image.pop(path, []):
+            if widget.product is not None and widget.product.image_path == path:
+                widget.setPixmap(pixmap)
+
     def on_product_clicked(self, product):
         """Handle product click"""
+        if product is None:
+            return
         self.product_selected.emit(product)
 
     def next_page(self):
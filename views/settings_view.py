@@ -7,11 +7,16 @@ from PyQt5.QtWidgets import (
     QSpinBox, QMessageBox, QGroupBox, QScrollArea, QTableWidget,
     QTableWidgetItem, QComboBox, QDoubleSpinBox, QHeaderView, QDialog
 )
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont
+import os
 import config
+import config_lowmem
 from models import Category, Product
-from translations import SETTINGS, COMMON, TOPPINGS
+from translations import SETTINGS, COMMON, TOPPINGS, DIAGNOSTICS
+from utils.spans import timed
+
+DIAGNOSTICS_SPAN_ROWS = 12  # Spans with the most total time shown in the diagnostics table
 
 
 class SettingsView(QWidget):
@@ -72,6 +77,13 @@ class SettingsView(QWidget):
         self.data_tab = self.create_data_tab()
         self.tab_widget.addTab(self.data_tab, SETTINGS['data'])
 
+        # Diagnostics tab (refreshed every 2 seconds while it is shown)
+        self.diagnostics_tab = self.create_diagnostics_tab()
+        self.tab_widget.addTab(self.diagnostics_tab, DIAGNOSTICS['diagnostics'])
+        self.diagnostics_timer = QTimer(self)
+        self.diagnostics_timer.timeout.connect(self.refresh_diagnostics)
+        self.tab_widget.currentChanged.connect(self.on_tab_changed)
+
         layout.addWidget(self.tab_widget)
 
     def create_general_tab(self):
@@ -116,6 +128,21 @@ class SettingsView(QWidget):
         group2.setLayout(group2_layout)
         layout.addWidget(group2)
 
+        # Performance profile (read-only: chosen at startup)
+        from utils.profiles import active_profile
+        profile = active_profile()
+        group3 = QGroupBox(SETTINGS['performance_profile'])
+        group3.setFont(font)
+        group3_layout = QFormLayout()
+        group3_layout.addRow(f"{SETTINGS['profile_name']}:", QLabel(f"{profile['name']} ({profile['source']})"))
+        overrides = ", ".join(f"{name}={value}" for name, value in profile['overrides'].items())
+        overrides_label = QLabel(overrides or SETTINGS['profile_no_overrides'])
+        overrides_label.setWordWrap(True)
+        group3_layout.addRow(f"{SETTINGS['profile_overrides']}:", overrides_label)
+        group3_layout.addRow(QLabel(SETTINGS['profile_hint']))
+        group3.setLayout(group3_layout)
+        layout.addWidget(group3)
+
         layout.addStretch()
 
         # Save button
@@ -314,6 +341,7 @@ class SettingsView(QWidget):
 
         return tab
 
+    @timed()
     def refresh_categories(self):
         """Refresh category dropdown"""
         self.category_combo.clear()
@@ -325,6 +353,7 @@ class SettingsView(QWidget):
         if self.category_combo.count() > 0:
             self.load_products_for_category()
 
+    @timed()
     def load_products_for_category(self):
         """Load products for selected category"""
         if self.category_combo.count() == 0:
@@ -460,6 +489,9 @@ class SettingsView(QWidget):
             product.name = data['name']
             product.price = data['price']
             product.is_active = data['is_active']
+            if product.image_path:
+                from utils.thumbnails import get_thumbnails
+                get_thumbnails().forget(product.image_path)  # The file may have been replaced
             product.image_path = data['image_path']
             product.save()
             # Save topping group associations
@@ -587,6 +619,124 @@ class SettingsView(QWidget):
 
         return tab
 
+    def create_diagnostics_tab(self):
+        """Create performance diagnostics tab"""
+        tab = QWidget()
+        layout = QVBoxLayout(tab)
+
+        font = QFont()
+        font.setPointSize(11)
+
+        self.metrics_table = QTableWidget(0, 2)
+        self.metrics_table.setFont(font)
+        self.metrics_table.setHorizontalHeaderLabels([DIAGNOSTICS['metric'], DIAGNOSTICS['value']])
+        self.metrics_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.metrics_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.metrics_table.verticalHeader().setVisible(False)
+        self.metrics_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.metrics_table, 3)
+
+        slowest_label = QLabel(DIAGNOSTICS['slowest'])
+        slowest_label.setFont(font)
+        layout.addWidget(slowest_label)
+
+        self.statements_table = QTableWidget(0, 4)
+        self.statements_table.setHorizontalHeaderLabels([
+            DIAGNOSTICS['statement'], DIAGNOSTICS['count'], DIAGNOSTICS['avg_ms'], DIAGNOSTICS['max_ms']
+        ])
+        self.statements_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.statements_table.verticalHeader().setVisible(False)
+        self.statements_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.statements_table, 2)
+
+        buttons_layout = QHBoxLayout()
+        refresh_btn = QPushButton(DIAGNOSTICS['refresh'])
+        refresh_btn.setFont(font)
+        refresh_btn.setMinimumHeight(40)
+        refresh_btn.clicked.connect(self.refresh_diagnostics)
+        buttons_layout.addWidget(refresh_btn)
+
+        export_btn = QPushButton(DIAGNOSTICS['export'])
+        export_btn.setProperty("class", "primary-button")
+        export_btn.setFont(font)
+        export_btn.setMinimumHeight(40)
+        export_btn.clicked.connect(self.export_diagnostics)
+        buttons_layout.addWidget(export_btn)
+        layout.addLayout(buttons_layout)
+
+        # Profile captures (files in data/profiles/)
+        profile_layout = QHBoxLayout()
+        for label, seconds, until in (
+            (DIAGNOSTICS['profile_seconds'].format(seconds=config_lowmem.PROFILE_CAPTURE_SECONDS),
+             config_lowmem.PROFILE_CAPTURE_SECONDS, None),
+            (DIAGNOSTICS['profile_checkout'], None, 'checkout'),
+            (DIAGNOSTICS['profile_screen'], None, 'screen'),
+        ):
+            profile_btn = QPushButton(label)
+            profile_btn.setFont(font)
+            profile_btn.setMinimumHeight(40)
+            profile_btn.clicked.connect(lambda checked, seconds=seconds, until=until: self.start_profiling(seconds, until))
+            profile_layout.addWidget(profile_btn)
+        layout.addLayout(profile_layout)
+
+        return tab
+
+    def on_tab_changed(self, index):
+        """Refresh the diagnostics while their tab is shown"""
+        if self.tab_widget.widget(index) is self.diagnostics_tab:
+            self.refresh_diagnostics()
+            self.diagnostics_timer.start(2000)
+        else:
+            self.diagnostics_timer.stop()
+
+    def hideEvent(self, event):
+        """Stop refreshing diagnostics when the settings screen is left"""
+        self.diagnostics_timer.stop()
+        super().hideEvent(event)
+
+    def showEvent(self, event):
+        """Resume refreshing diagnostics if their tab is still selected"""
+        super().showEvent(event)
+        if self.tab_widget.currentWidget() is self.diagnostics_tab:
+            self.on_tab_changed(self.tab_widget.currentIndex())
+
+    def refresh_diagnostics(self):
+        """Show a fresh diagnostics snapshot"""
+        from utils.diagnostics import get_diagnostics
+        snapshot = get_diagnostics().snapshot()
+
+        rows = diagnostics_rows(snapshot)
+        self.metrics_table.setRowCount(len(rows))
+        for row, (metric, value) in enumerate(rows):
+            self.metrics_table.setItem(row, 0, QTableWidgetItem(metric))
+            self.metrics_table.setItem(row, 1, QTableWidgetItem(value))
+
+        slowest = snapshot['sql']['slowest']
+        self.statements_table.setRowCount(len(slowest))
+        for row, statement in enumerate(slowest):
+            self.statements_table.setItem(row, 0, QTableWidgetItem(statement['statement']))
+            self.statements_table.setItem(row, 1, QTableWidgetItem(str(statement['count'])))
+            self.statements_table.setItem(row, 2, QTableWidgetItem(f"{statement['avg_ms']:.2f}"))
+            self.statements_table.setItem(row, 3, QTableWidgetItem(f"{statement['max_ms']:.2f}"))
+
+    def start_profiling(self, seconds=None, until=None):
+        """Start a profile capture for seconds or until the next checkout/screen opening"""
+        from utils.profiler import get_profiler
+        if get_profiler().start(seconds=seconds, until=until):
+            QMessageBox.information(self, COMMON['info'], DIAGNOSTICS['profile_started'])
+        else:
+            QMessageBox.warning(self, COMMON['warning'], DIAGNOSTICS['profile_running'])
+        self.refresh_diagnostics()
+
+    def export_diagnostics(self):
+        """Save a diagnostics snapshot as JSON"""
+        from utils.diagnostics import get_diagnostics
+        try:
+            path = get_diagnostics().export()
+            QMessageBox.information(self, COMMON['success'], DIAGNOSTICS['exported'].format(path=path))
+        except OSError as e:
+            QMessageBox.critical(self, COMMON['error'], str(e))
+
     def save_general_settings(self):
         """Save general settings to config file"""
         try:
@@ -738,3 +888,63 @@ os.makedirs(ICONS_DIR, exist_ok=True)
     def open_toppings_management(self):
         """Emit signal to open toppings management"""
         self.open_toppings_requested.emit()
+
+
+def diagnostics_rows(snapshot):
+    """(metric, value) rows of the diagnostics table"""
+    checkout = snapshot['checkout']
+    sql = snapshot['sql']
+    cache = snapshot['query_cache']
+    memory = snapshot['memory']
+    pauses = memory['gc_pauses']
+    queues = snapshot['queues']
+    files = snapshot['files']
+    journal = queues['checkout_journal']
+
+    rows = [
+        (DIAGNOSTICS['profile'], f"{snapshot['profile']['name']} ({snapshot['profile']['source']})"),
+        (DIAGNOSTICS['checkout'], f"{checkout['p50_ms']:.1f} / {checkout['p95_ms']:.1f} / {checkout['p99_ms']:.1f} ms "
+                                  f"({checkout['count']})"),
+        (DIAGNOSTICS['printing'], f"{checkout['printing']['p50_ms']:.1f} / {checkout['printing']['p95_ms']:.1f} ms"),
+        (DIAGNOSTICS['orders_per_minute'], f"{checkout['per_minute']:.1f} ({checkout['print_failures']})"),
+        (DIAGNOSTICS['queries'], f"{sql['queries']} ({sql['total_ms']:.0f} ms)"),
+    ]
+    for name, visits in sql['screens'].items():
+        rows.append((
+            DIAGNOSTICS['screen'].format(name=name),
+            DIAGNOSTICS['screen_value'].format(**visits)
+        ))
+    for name, summary in list(snapshot['spans'].items())[:DIAGNOSTICS_SPAN_ROWS]:
+        rows.append((
+            DIAGNOSTICS['span'].format(name=name),
+            f"{summary['p50_ms']} / {summary['p95_ms']} / {summary['max_ms']} ms ({summary['count']})"
+        ))
+    stalls = snapshot['stalls']
+    if stalls:
+        screens = ", ".join(f"{name} {totals['count']}" for name, totals in stalls['screens'].items())
+        rows.append((
+            DIAGNOSTICS['stalls'].format(threshold=stalls['threshold_ms']),
+            f"{stalls['count']}, max {stalls['max_ms']:.0f} ms" + (f" ({screens})" if screens else "")
+        ))
+    profiler = snapshot['profiler']
+    if profiler:
+        if profiler['running']:
+            value = DIAGNOSTICS['profile_in_progress'].format(trigger=profiler['trigger'])
+        else:
+            value = ", ".join(os.path.basename(path) for path in profiler['last_files']) or "-"
+        rows.append((DIAGNOSTICS['profiler'], value))
+    hit_ratio = f"{cache['hit_ratio']:.0%}" if cache['hit_ratio'] is not None else "-"
+    rows.append((DIAGNOSTICS['query_cache'], f"{cache['size']}/{cache['max_size']}, {hit_ratio}"))
+    thumbnails = snapshot['thumbnails']
+    if thumbnails:
+        rows.append((DIAGNOSTICS['thumbnails'],
+                     f"{thumbnails['thumbnails']} ({thumbnails['used_kb']}/{thumbnails['limit_kb']} Ko)"))
+    rows += [
+        (DIAGNOSTICS['memory'], f"{memory['rss_mb']:.0f} Mo / {memory['budget_mb']} Mo"),
+        (DIAGNOSTICS['gc_pauses'], f"{pauses['p50_ms']:.1f} / {pauses['max_ms']:.1f} ms, "
+                                   f"{pauses['full_collections']} x gen2 (max {pauses['full_max_ms']:.1f} ms)"),
+        (DIAGNOSTICS['write_queues'], f"{queues['db_writer']} / {'-' if journal is None else journal}"),
+        (DIAGNOSTICS['files'], f"{files['database_mb']} Mo, WAL {files['wal_mb']} Mo, "
+                               f"{files['archives']} archives ({files['archives_mb']} Mo)"),
+    ]
+    return rows
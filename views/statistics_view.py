@@ -5,11 +5,14 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QTableWidget, QTableWidgetItem, QHeaderView, QDialog
 )
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont, QColor
-from models import Order, Register, get_db
+from models import Register, get_db, run_async
+import config_lowmem
 from views.custom_report_dialog import CustomReportDialog
-from translations import STATISTICS
+from utils.reports import ReportingSnapshot, apply_product_filters, build_product_report
+from translations import STATISTICS, COMMON
+from utils.spans import timed
 
 
 class RegisterDetailDialog(QDialog):
@@ -112,14 +115,23 @@ class StatisticsView(QWidget):
     """Admin view for comprehensive statistics and reports"""
 
     statistics_closed = pyqtSignal()
+    _report_done = pyqtSignal(object, object)  # Finished report future, callback (worker -> UI thread)
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.orders = []
-        self.registers = []
-        self.all_registers = []  # Store all registers for pagination
+        self._report_done.connect(self.on_report_done)
+        self.report_future = None  # Combined report being built in the background
+        self.registers = []  # Registers shown on the current page
+        self.total_registers = 0  # Registers matching the current search
+        self.search_filters = {}
+        self.first_key = None  # Keyset bounds of the current page
+        self.last_key = None
+        self.change_seq = None  # Change log position of the last load (see refresh_data)
         self.current_page = 1
-        self.items_per_page = 7  # Reduced for low-memory systems
+        self.items_per_page = config_lowmem.STATISTICS_PAGE_SIZE
+        self.search_timer = QTimer()
+        self.search_timer.setSingleShot(True)
+        self.search_timer.timeout.connect(self.apply_search)
         self.setup_ui()
         self.load_data()
 
@@ -167,7 +179,7 @@ class StatisticsView(QWidget):
         self.search_input = QLineEdit()
         self.search_input.setFont(font)
         self.search_input.setPlaceholderText("Search by employee name, shift type, or date...")
-        self.search_input.textChanged.connect(self.apply_search)
+        self.search_input.textChanged.connect(self.on_search_text_changed)
         search_layout.addWidget(self.search_input, stretch=1)
 
         clear_search_btn = QPushButton("Clear")
@@ -281,20 +293,80 @@ class StatisticsView(QWidget):
 
         layout.addLayout(action_buttons_layout)
 
+    @timed()
     def load_data(self):
-        """Load orders and registers from database"""
-        # Load all orders (without items to save memory)
-        self.orders = Order.get_all(load_items=False)
-
-        # Load all registers
-        self.original_registers = Register.get_all()
-        self.all_registers = self.original_registers.copy()
+        """Load the first page of registers and the summary from database"""
+        # Remember the change log position first so changes made meanwhile are merged later
+        self.change_seq = get_db().change_seq()
 
         # Reset to first page when loading new data
         self.current_page = 1
-        self.apply_pagination()
+        self.load_page()
         self.update_summary()
 
+    @timed()
+    def refresh_data(self):
+        """Apply only the register and order changes made since the last load"""
+        changes = get_db().changes_since(self.change_seq, ('registers', 'orders', 'order_items'))
+        if changes is None:
+            self.load_data()
+            return
+
+        self.change_seq = changes['seq']
+        changed = changes['tables']
+        if not any(changed.values()):
+            return
+
+        if changed['registers']:
+            self.merge_registers(changed['registers'])
+
+        # Summary totals are SQL aggregates, recomputed only when something changed
+        self.update_summary()
+
+    def merge_registers(self, register_ids):
+        """Merge changed registers into the current page"""
+        if self.current_page == 1:
+            # New registers sort first, so the first page is simply fetched again
+            self.load_page()
+            return
+
+        # Other pages keep their position: update shown rows in place, drop deleted ones
+        changed = {register.id: register for register in Register.get_by_ids(register_ids)}
+        self.registers = [
+            changed.get(register.id, register) for register in self.registers
+            if register.id not in register_ids or register.id in changed
+        ]
+        self.total_registers = Register.count(self.search_filters)
+        self.refresh_registers_table()
+        self.update_pagination_controls(self.get_total_pages())
+
+    @timed()
+    def load_page(self, after_key=None, backward=False, limit=None):
+        """Load one page of registers matching the current search"""
+        result = Register.page(
+            after_key=after_key,
+            limit=limit or self.items_per_page,
+            filters=self.search_filters,
+            backward=backward
+        )
+        self.registers = result['items']
+        self.total_registers = result['total']
+        self.first_key = result['first_key']
+        self.last_key = result['last_key']
+
+        # Update table and pagination controls
+        self.refresh_registers_table()
+        self.update_pagination_controls(self.get_total_pages())
+
+    def get_total_pages(self):
+        """Get number of pages for the current search"""
+        return max(1, (self.total_registers + self.items_per_page - 1) // self.items_per_page)
+
+    def get_shown_registers(self):
+        """Stream every register matching the current search (for combined reports)"""
+        return Register.iter_all(filters=self.search_filters)
+
+    @timed()
     def refresh_registers_table(self):
         """Refresh the registers table"""
         self.registers_table.setRowCount(len(self.registers))
@@ -329,32 +401,10 @@ class StatisticsView(QWidget):
                 status_item.setForeground(Qt.green)
             self.registers_table.setItem(row, 6, status_item)
 
-    def apply_pagination(self):
-        """Apply pagination to registers list"""
-        total_registers = len(self.all_registers)
-        total_pages = (total_registers + self.items_per_page - 1) // self.items_per_page
-
-        if total_pages == 0:
-            total_pages = 1
-
-        # Ensure current page is within bounds
-        self.current_page = max(1, min(self.current_page, total_pages))
-
-        # Calculate start and end indices
-        start_idx = (self.current_page - 1) * self.items_per_page
-        end_idx = min(start_idx + self.items_per_page, total_registers)
-
-        # Get registers for current page
-        self.registers = self.all_registers[start_idx:end_idx]
-
-        # Update table and pagination controls
-        self.refresh_registers_table()
-        self.update_pagination_controls(total_pages)
-
     def update_pagination_controls(self, total_pages):
         """Update pagination button states and labels"""
-        total_registers = len(self.all_registers)
-        start_idx = (self.current_page - 1) * self.items_per_page + 1
+        total_registers = self.total_registers
+        start_idx = min((self.current_page - 1) * self.items_per_page + 1, total_registers)
         end_idx = min(self.current_page * self.items_per_page, total_registers)
 
         # Update page label
@@ -372,45 +422,58 @@ class StatisticsView(QWidget):
     def go_to_first_page(self):
         """Go to first page"""
         self.current_page = 1
-        self.apply_pagination()
+        self.load_page()
 
     def go_to_previous_page(self):
         """Go to previous page"""
         if self.current_page > 1:
             self.current_page -= 1
-            self.apply_pagination()
+            self.load_page(after_key=self.first_key, backward=True)
 
     def go_to_next_page(self):
         """Go to next page"""
-        total_pages = (len(self.all_registers) + self.items_per_page - 1) // self.items_per_page
-        if self.current_page < total_pages:
+        if self.current_page < self.get_total_pages():
             self.current_page += 1
-            self.apply_pagination()
+            self.load_page(after_key=self.last_key)
 
     def go_to_last_page(self):
         """Go to last page"""
-        total_pages = (len(self.all_registers) + self.items_per_page - 1) // self.items_per_page
-        self.current_page = max(1, total_pages)
-        self.apply_pagination()
+        total_pages = self.get_total_pages()
+        self.current_page = total_pages
+        # The last page holds the remainder so page boundaries match walking forward
+        last_page_size = self.total_registers - (total_pages - 1) * self.items_per_page
+        self.load_page(backward=True, limit=max(1, last_page_size))
 
     def update_summary(self):
         """Update summary statistics"""
-        if not self.orders and not self.all_registers:
+        # Aggregate orders in SQL instead of loading every order into memory
+        # Archived months return one row each, so the partial sums are added up
+        db = get_db()
+        total_orders = 0
+        total_sales = 0.0
+        delivery_orders = 0
+        for order_stats in db.iter_archived_rows("""
+            SELECT COUNT(*) as total_orders,
+                   SUM(total_amount) as total_sales,
+                   SUM(is_delivery) as delivery_orders
+            FROM {orders}
+        """):
+            total_orders += order_stats['total_orders']
+            total_sales += order_stats['total_sales'] or 0.0
+            delivery_orders += order_stats['delivery_orders'] or 0
+
+        if not total_orders and not self.total_registers:
             self.summary_label.setText("No data found")
             return
 
-        total_orders = len(self.orders)
-        total_sales = sum(order.total_amount for order in self.orders)
-
         # Calculate total items efficiently using SQL instead of loading all items
-        db = get_db()
-        cursor = db.execute("SELECT SUM(quantity) as total FROM order_items")
-        result = cursor.fetchone()
-        total_items = result['total'] if result['total'] else 0
+        total_items = sum(
+            row['total'] or 0
+            for row in db.iter_archived_rows("SELECT SUM(quantity) as total FROM {order_items}")
+        )
 
-        delivery_orders = sum(1 for order in self.orders if order.is_delivery)
-        total_registers = len(self.all_registers)
-        open_registers = sum(1 for reg in self.all_registers if reg.is_open)
+        total_registers = self.total_registers
+        open_registers = Register.count(dict(self.search_filters, is_open=True))
 
         summary_text = (
             f"Total Registers: {total_registers} ({open_registers} Open)  |  "
@@ -421,34 +484,30 @@ class StatisticsView(QWidget):
         )
         self.summary_label.setText(summary_text)
 
-    def apply_search(self):
-        """Apply search filter"""
-        search_text = self.search_input.text().strip().lower()
+    def on_search_text_changed(self):
+        """Handle search text change with debouncing"""
+        # Stop any existing timer
+        self.search_timer.stop()
+        # Start new timer (300ms delay)
+        self.search_timer.start(300)
 
-        if not search_text:
-            # No search, show all
-            self.all_registers = self.original_registers.copy()
-        else:
-            # Filter registers based on search text
-            self.all_registers = [
-                reg for reg in self.original_registers
-                if (search_text in reg.employee_name.lower() or
-                    search_text in reg.shift_type.lower() or
-                    search_text in reg.opened_at.lower() or
-                    (reg.closed_at and search_text in reg.closed_at.lower()))
-            ]
+    def apply_search(self):
+        """Apply search filter (matched in SQL by Register.page)"""
+        search_text = self.search_input.text().strip()
+        self.search_filters = {'search': search_text} if search_text else {}
 
         # Reset to first page and update display
         self.current_page = 1
-        self.apply_pagination()
+        self.load_page()
         self.update_summary()
 
     def clear_search(self):
         """Clear search filter"""
+        self.search_timer.stop()
         self.search_input.clear()
-        self.all_registers = self.original_registers.copy()
+        self.search_filters = {}
         self.current_page = 1
-        self.apply_pagination()
+        self.load_page()
         self.update_summary()
 
     def view_selected_register(self):
@@ -486,24 +545,79 @@ class StatisticsView(QWidget):
 
         # Get all order items for orders in this register
         # Simply group by the product_name as stored in order_items
-        cursor = db.execute("""
+        start_date, end_date = register.get_date_range()
+        rows = db.iter_archived_rows("""
             SELECT oi.product_name,
                    SUM(oi.quantity) as total_quantity
-            FROM order_items oi
-            JOIN orders o ON oi.order_id = o.id
+            FROM {order_items} oi
+            JOIN {orders} o ON oi.order_id = o.id
             WHERE o.register_id = ?
             GROUP BY oi.product_name
             ORDER BY oi.product_name
-        """, (register.id,))
+        """, (register.id,), start_date, end_date)
 
+        # Registers spanning archive groups get one partial sum per group
         products = {}
-        for row in cursor.fetchall():
+        for row in rows:
             product_name = row['product_name']
-            total_quantity = row['total_quantity']
-            products[product_name] = total_quantity
+            products[product_name] = products.get(product_name, 0) + row['total_quantity']
 
         return products
 
+    def start_registers_report(self, registers, filter_config, on_ready):
+        """Build a combined report in the background; on_ready(report) then runs on the UI thread"""
+        from PyQt5.QtWidgets import QMessageBox
+
+        if self.report_future is not None:
+            QMessageBox.information(self, COMMON['info'], STATISTICS['report_running'])
+            return
+
+        self.report_future = run_async(self.build_registers_report, registers, filter_config)
+        self.report_future.add_done_callback(lambda future: self._report_done.emit(future, on_ready))
+
+    def on_report_done(self, future, on_ready):
+        """Hand a finished background report to its callback (UI thread)"""
+        from PyQt5.QtWidgets import QMessageBox
+
+        self.report_future = None
+        try:
+            report = future.result()
+        except Exception as e:
+            print(f"Error building registers report: {e}")
+            QMessageBox.warning(self, COMMON['error'], STATISTICS['report_failed'].format(error=e))
+            return
+        on_ready(report)
+
+    def build_registers_report(self, registers, filter_config=None):
+        """Aggregate products, sales and orders of several registers over month shards
+
+        registers may be a stream (get_shown_registers): only their ids and
+        date range are kept. The report's 'registers' is how many there were.
+        """
+        start_date = end_date = None
+        any_open = False
+        register_ids = []
+        for register in registers:
+            opened = register.opened_at[:10]
+            closed = (register.closed_at or register.opened_at)[:10]
+            start_date = min(start_date or opened, opened)
+            end_date = max(end_date or closed, closed)
+            any_open = any_open or register.is_open
+            register_ids.append(register.id)
+
+        if not register_ids:
+            return {'products': {}, 'total_orders': 0, 'total_sales': 0.0, 'by_register': {},
+                    'by_employee': {}, 'registers': 0}
+        if any_open:
+            end_date = None  # Up to today
+
+        # Live data is read from one in-memory snapshot so totals are consistent
+        # while the till keeps taking orders
+        with ReportingSnapshot() as snapshot:
+            report = build_product_report(start_date, end_date, register_ids, filter_config, snapshot=snapshot)
+        report['registers'] = len(register_ids)
+        return report
+
     def print_selected_register(self):
         """Print report for selected register"""
         from PyQt5.QtWidgets import QMessageBox
@@ -532,7 +646,7 @@ class StatisticsView(QWidget):
         """Print combined report for all currently displayed registers (respects search filter)"""
         from PyQt5.QtWidgets import QMessageBox
 
-        if not self.all_registers:
+        if not self.total_registers:
             QMessageBox.warning(self, "No Data", "No registers to print.")
             return
 
@@ -540,34 +654,27 @@ class StatisticsView(QWidget):
         reply = QMessageBox.question(
             self,
             "Confirm Print",
-            f"Print combined report for all {len(self.all_registers)} shown registers?",
+            f"Print combined report for all {self.total_registers} shown registers?",
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
         )
 
         if reply == QMessageBox.Yes:
-            # Combine products from all registers
-            combined_products = {}
-            total_sales = 0
-            total_orders = 0
-
-            for register in self.all_registers:
-                products = self.get_register_product_summary(register)
-                # Sum up products
-                for product_name, quantity in products.items():
-                    combined_products[product_name] = combined_products.get(product_name, 0) + quantity
-
-                # Sum up sales and orders
-                total_sales += register.get_total_sales()
-                total_orders += register.get_orders_count()
-
-            if not combined_products:
-                QMessageBox.information(self, "No Data", "No products sold in the selected registers.")
-                return
+            def print_report(report):
+                combined_products = report['products']
+                total_sales = report['total_sales']
+                total_orders = report['total_orders']
+
+                if not combined_products:
+                    QMessageBox.information(self, "No Data", "No products sold in the selected registers.")
+                    return
+
+                # Print combined report
+                self.print_combined_registers_report(report['registers'], combined_products, total_sales, total_orders)
+                QMessageBox.information(self, "Success", f"Combined report for {report['registers']} registers sent to printer.")
 
-            # Print combined report
-            self.print_combined_registers_report(self.all_registers, combined_products, total_sales, total_orders)
-            QMessageBox.information(self, "Success", f"Combined report for {len(self.all_registers)} registers sent to printer.")
+            # Combine products from all registers (streamed, month shards aggregated in the background)
+            self.start_registers_report(self.get_shown_registers(), None, print_report)
 
     def print_register_report(self, register, products):
         """Print a register report with product summary"""
@@ -678,7 +785,7 @@ class StatisticsView(QWidget):
         except Exception as e:
             print(f"Error printing register report: {e}")
 
-    def print_combined_registers_report(self, registers, combined_products, total_sales, total_orders):
+    def print_combined_registers_report(self, register_count, combined_products, total_sales, total_orders):
         """Print a combined report for multiple registers with product summary"""
         import config
 
@@ -703,7 +810,7 @@ class StatisticsView(QWidget):
             title_command + f"REGISTERS REPORT",
             "",
             set_font_command + bold_command,
-            f"Number of Registers: {len(registers)}",
+            f"Number of Registers: {register_count}",
             "",
             "_____________________________________________",
         ]
@@ -799,128 +906,35 @@ class StatisticsView(QWidget):
 
         else:
             # No selection - use all shown registers
-            if not self.all_registers:
+            if not self.total_registers:
                 QMessageBox.warning(self, "No Data", "No registers to print.")
                 return
 
             # Show dialog for all registers
-            dialog = CustomReportDialog(registers=self.all_registers, parent=self)
+            dialog = CustomReportDialog(register_count=self.total_registers, parent=self)
             if dialog.exec_() != QDialog.Accepted:
                 return
 
             # Get filter configuration
             filter_config = dialog.get_filter_config()
 
-            # Combine products from all registers - FILTER FIRST, THEN COMBINE
-            combined_products = {}
-            total_sales = 0
-            total_orders = 0
+            def print_report(report):
+                combined_products = report['products']
+                total_sales = report['total_sales']
+                total_orders = report['total_orders']
 
-            for register in self.all_registers:
-                # Get products for this register
-                products = self.get_register_product_summary(register)
+                if not combined_products:
+                    QMessageBox.information(self, "No Data", "No products match the selected filters.")
+                    return
 
-                # Apply filters WITHOUT adding total lines yet (pass skip_totals flag)
-                filter_config_no_totals = filter_config.copy()
-                filter_config_no_totals['skip_totals'] = True
-                filtered_products_for_register = self.apply_product_filters(products, filter_config_no_totals)
+                # Print filtered combined report
+                self.print_combined_registers_report(report['registers'], combined_products, total_sales, total_orders)
+                QMessageBox.information(self, "Success", f"Custom combined report for {report['registers']} registers sent to printer.")
 
-                # Sum up only the filtered products
-                for product_name, quantity in filtered_products_for_register.items():
-                    combined_products[product_name] = combined_products.get(product_name, 0) + quantity
-
-                # Sum up sales and orders (still sum all, as we want total register stats)
-                total_sales += register.get_total_sales()
-                total_orders += register.get_orders_count()
-
-            if not combined_products:
-                QMessageBox.information(self, "No Data", "No products match the selected filters.")
-                return
-
-            # Now add the TOTAL lines for keywords AFTER combining
-            if filter_config.get('keywords'):
-                keywords = filter_config['keywords']
-                keyword_totals = {kw: 0 for kw in keywords}
-
-                # Calculate totals from combined products
-                for product_name, quantity in combined_products.items():
-                    for kw in keywords:
-                        if kw.lower() in product_name.lower():
-                            keyword_totals[kw] += quantity
-
-                # Add total lines
-                for keyword, total in keyword_totals.items():
-                    if total > 0:
-                        combined_products[f"TOTAL {keyword.upper()}: "] = total
-
-            # Print filtered combined report
-            self.print_combined_registers_report(self.all_registers, combined_products, total_sales, total_orders)
-            QMessageBox.information(self, "Success", f"Custom combined report for {len(self.all_registers)} registers sent to printer.")
+            # Filter each shard's products first, then combine; keyword TOTAL lines
+            # are added after combining. Sales and orders still count every product.
+            self.start_registers_report(self.get_shown_registers(), filter_config, print_report)
 
     def apply_product_filters(self, products, filter_config):
-        """Apply category and keyword filters to products dict
-
-        If keywords are provided, shows both individual products AND totals by keyword
-        to track ingredient/stock usage across all product types.
-        """
-        selected_categories = filter_config['categories']
-        keywords = filter_config['keywords']
-        all_categories = filter_config['all_categories']
-        skip_totals = filter_config.get('skip_totals', False)  # Flag to skip adding total lines
-
-        filtered_products = {}
-
-        # If keywords are provided, show individual products + totals by keyword
-        if keywords:
-            # Track totals for each keyword
-            keyword_totals = {kw: 0 for kw in keywords}
-
-            # First pass: add individual products that match keywords
-            for product_display, quantity in products.items():
-                # Check if product matches any keyword
-                matches_keyword = any(kw.lower() in product_display.lower() for kw in keywords)
-
-                if matches_keyword:
-                    # Check category filter
-                    parts = product_display.split(' ', 1)
-                    if len(parts) == 2:
-                        category_name = parts[0]
-                    else:
-                        category_name = ''
-
-                    category_match = all_categories or (category_name in selected_categories) or (not category_name and len(selected_categories) > 0)
-
-                    if category_match:
-                        # Add individual product
-                        filtered_products[product_display] = quantity
-
-                        # Add to keyword totals
-                        for kw in keywords:
-                            if kw.lower() in product_display.lower():
-                                keyword_totals[kw] += quantity
-
-            # Second pass: add total lines for each keyword (if there were matches)
-            # Only add totals if skip_totals is False (for single register or final combined report)
-            if not skip_totals:
-                for keyword, total in keyword_totals.items():
-                    if total > 0:
-                        # Add a summary line with the keyword total
-                        filtered_products[f"TOTAL {keyword.upper()}: "] = total
-
-        else:
-            # No keywords - use normal category filtering (show all products in category)
-            for product_display, quantity in products.items():
-                parts = product_display.split(' ', 1)
-
-                if len(parts) == 2:
-                    category_name = parts[0]
-                else:
-                    category_name = ''
-
-                # Check category filter
-                category_match = all_categories or (category_name in selected_categories) or (not category_name and len(selected_categories) > 0)
-
-                if category_match:
-                    filtered_products[product_display] = quantity
-
-        return filtered_products
+        """Apply category and keyword filters to products dict (see utils.reports)"""
+        return apply_product_filters(products, filter_config)
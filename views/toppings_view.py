@@ -10,6 +10,7 @@ from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont
 from models import ToppingGroup, ToppingOption, get_db
 from translations import TOPPINGS, COMMON
+from utils.spans import timed
 
 
 class ToppingOptionDialog(QDialog):
@@ -309,11 +310,13 @@ class ToppingsView(QWidget):
 
         layout.addLayout(content_layout)
 
+    @timed()
     def load_groups(self):
         """Load all topping groups"""
         self.groups = ToppingGroup.get_all(active_only=False)
         self.refresh_groups_table()
 
+    @timed()
     def refresh_groups_table(self):
         """Refresh the groups table"""
         self.groups_table.setRowCount(len(self.groups))
@@ -342,6 +345,7 @@ class ToppingsView(QWidget):
         self.delete_option_btn.setEnabled(True)
         self.load_options()
 
+    @timed()
     def load_options(self):
         """Load options for current group"""
         if not self.current_group: